@@ -0,0 +1,29 @@
+"""Move old read notifications to ``notifications_archive``.
+
+    python archive_notifications.py [--days N] [--batch-size N]
+
+Runs the same job the API schedules every NOTIFICATION_ARCHIVE_INTERVAL
+seconds; useful from cron when the in-process loop is disabled.
+"""
+import argparse
+import asyncio
+
+from database import db
+from notifications import NotificationArchiver
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=30, help="archive read notifications older than this")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    archiver = NotificationArchiver(older_than=args.days * 24 * 3600, batch_size=args.batch_size, interval=0)
+    try:
+        archived = await archiver.run_once(db)
+    finally:
+        await db.aclose()
+    print(f"Archived {archived} notifications")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+"""Recompute ``grades.final_grade`` from the course weights.
+
+    python backfill_final_grades.py [--course-id ID]
+
+Runs the ``recompute_final_grades`` database function, which re-fires the
+final grade trigger for every matching row. Only the service role may run
+it: set SUPABASE_SERVICE_ROLE_KEY.
+"""
+import argparse
+import asyncio
+
+from database import service_db
+
+
+async def backfill(course_id=None) -> int:
+    response = await service_db.rpc("recompute_final_grades", {"p_course_id": course_id}).execute()
+    return response.data or 0
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--course-id", help="only recompute the grades of this course")
+    args = parser.parse_args()
+    try:
+        touched = await backfill(args.course_id)
+    finally:
+        await service_db.aclose()
+    print(f"Recomputed {touched} grades")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
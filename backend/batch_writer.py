@@ -0,0 +1,327 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from postgrest import APIError
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE classes of errors caused by the rows themselves (22 data exception,
+# 23 integrity constraint violation); retrying those rows can never succeed.
+REJECTED_SQLSTATE_CLASSES = ("22", "23")
+SIDE_FILE_SUFFIXES = (".lock", ".tmp", ".dead")
+
+
+def rows_rejected(error: Exception) -> bool:
+    return isinstance(error, APIError) and isinstance(error.code, str) and error.code[:2] in REJECTED_SQLSTATE_CLASSES
+
+
+class BatchWriter:
+    """Buffers rows in process and writes them to ``table`` as multi-row inserts.
+
+    A batch is flushed once ``batch_size`` rows are pending or every
+    ``flush_interval`` seconds. Rows need a client-generated ``id`` so a
+    retried batch does not insert them twice. A batch the database rejects
+    is split until the offending rows are isolated; those go to the
+    dead-letter file and the rest are written. Other failures keep the
+    batch for the next flush. At most ``max_pending`` rows wait; rows
+    beyond that are dropped and counted.
+
+    Rows are appended to a spool of JSON lines, and fsynced, before
+    ``append`` returns, so rows accepted before a crash are replayed after
+    the restart; appends made while a spool write is waiting share its
+    fsync. Flushes rewrite the spool once rows have been written.
+    Every process spools to its own file next to ``spool_path``
+    (``<stem>.<pid><suffix>``) and holds a lock on it; at startup a writer
+    also adopts the spools of processes that are gone. File I/O runs in a
+    thread, off the event loop.
+    """
+
+    table = ""
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.5, spool_path: Optional[Path] = None,
+                 max_pending: int = 100000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.max_pending = max_pending
+        self.client = None
+        self._pending: List[dict] = []
+        self._unspooled: List[dict] = []
+        self._spool_group: Optional[asyncio.Future] = None
+        self._spool_stale = False
+        self._spooled_rows = 0
+        self._own_spool: Optional[Path] = None
+        self._own_lock = None
+        self._adopted: List[Tuple[Path, object]] = []
+        self._overflowing = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._flush_lock = asyncio.Lock()
+        self._spool_lock = asyncio.Lock()
+        self.enqueued_total = 0
+        self.flushed_total = 0
+        self.flush_count = 0
+        self.flush_failures = 0
+        self.dead_lettered_total = 0
+        self.dropped_total = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def dead_letter_path(self) -> Optional[Path]:
+        return self.spool_path.with_suffix(".dead") if self.spool_path is not None else None
+
+    async def append(self, rows: List[dict]) -> List[dict]:
+        """Queue ``rows`` and return the ones kept; rows over ``max_pending`` are dropped."""
+        room = max(self.max_pending - len(self._pending) - len(self._unspooled), 0)
+        if len(rows) > room:
+            self.dropped_total += len(rows) - room
+            if not self._overflowing:
+                logger.warning("%s queue is full (%d rows); dropping new rows until it drains", self.table, self.max_pending)
+            self._overflowing = True
+            rows = rows[:room]
+        elif self._overflowing and len(self._pending) < self.max_pending // 2:
+            self._overflowing = False
+        if not rows:
+            return rows
+        self.enqueued_total += len(rows)
+        if self._own_spool is None and not self._unspooled:
+            self._pending.extend(rows)
+        else:
+            self._unspooled.extend(rows)
+            if self._spool_group is None:
+                self._spool_group = asyncio.ensure_future(self._spool_unspooled())
+            await asyncio.shield(self._spool_group)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return rows
+
+    async def _spool_unspooled(self):
+        # Rows appended while this group waits for the lock join it and share its fsync.
+        async with self._spool_lock:
+            self._spool_group = None
+            rows, self._unspooled = self._unspooled, []
+            if rows and self._own_spool is not None:
+                try:
+                    await asyncio.to_thread(self._append_spool, rows)
+                    self._spooled_rows += len(rows)
+                except OSError:
+                    logger.exception("Failed to write the %s spool", self.table)
+                    self._spool_stale = True
+            self._pending.extend(rows)
+
+    async def start(self, client):
+        self.client = client
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._spool_lock = asyncio.Lock()
+        self._spool_group = None
+        if self.spool_path is not None:
+            replayed = await asyncio.to_thread(self._adopt_spools)
+            if replayed:
+                logger.info("Replaying %d spooled %s rows", len(replayed), self.table)
+            self._pending = replayed + self._pending
+            await self._sync_spool(force=bool(self._pending or self._adopted))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # wait_for may swallow a cancel that lands as the wakeup fires; the flag ends the loop anyway.
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._own_spool is not None:
+            await asyncio.to_thread(self._release_spool, not self._pending)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def before_flush(self):
+        pass
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            self.before_flush()
+            if self.client is None:
+                return 0
+
+            written = 0
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                try:
+                    written += await self._write(batch)
+                except Exception:
+                    self.flush_failures += 1
+                    logger.exception("Failed to flush %d %s rows; will retry", len(batch), self.table)
+                    break
+                del self._pending[:len(batch)]
+                self._spool_stale = True
+
+            await self._sync_spool()
+            return written
+
+    async def _write(self, batch: List[dict]) -> int:
+        """Insert ``batch`` and return how many rows were written, dead-lettering the rows the database rejects."""
+        started = time.perf_counter()
+        try:
+            await self.client.table(self.table).upsert(batch, ignore_duplicates=True, returning="minimal").execute()
+        except APIError as error:
+            if not rows_rejected(error):
+                raise
+            if len(batch) == 1:
+                await self._dead_letter(batch, f"{error.code}: {error.message}")
+                return 0
+            middle = len(batch) // 2
+            return await self._write(batch[:middle]) + await self._write(batch[middle:])
+        elapsed = time.perf_counter() - started
+        self.flush_count += 1
+        self.flushed_total += len(batch)
+        self.last_flush_seconds = elapsed
+        self.flush_seconds_total += elapsed
+        self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+        return len(batch)
+
+    async def _dead_letter(self, rows: List[dict], reason: str):
+        self.dead_lettered_total += len(rows)
+        logger.error("Dead-lettering %d %s rows rejected by the database: %s", len(rows), self.table, reason)
+        if self.dead_letter_path is not None:
+            lines = "".join(json.dumps({"reason": reason, "row": row}) + "\n" for row in rows)
+            await asyncio.to_thread(self._append_text, self.dead_letter_path, lines)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "enqueued_total": self.enqueued_total,
+            "flushed_total": self.flushed_total,
+            "flush_count": self.flush_count,
+            "flush_failures": self.flush_failures,
+            "dead_lettered_total": self.dead_lettered_total,
+            "dropped_total": self.dropped_total,
+            "flush_seconds_total": self.flush_seconds_total,
+            "flush_seconds_max": self.flush_seconds_max,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+    async def _sync_spool(self, force: bool = False):
+        """Rewrite this process's spool from ``_pending`` once rows have left it (or a write to it failed)."""
+        async with self._spool_lock:
+            if self._own_spool is None or not (force or self._spool_stale):
+                return
+            try:
+                rows = list(self._pending)
+                if rows or self._spooled_rows:
+                    await asyncio.to_thread(self._rewrite_spool, rows)
+                    self._spooled_rows = len(rows)
+                if self._adopted:
+                    await asyncio.to_thread(self._release_adopted)
+                self._spool_stale = False
+            except OSError:
+                logger.exception("Failed to write the %s spool", self.table)
+                self._spool_stale = True
+
+    @staticmethod
+    def _append_text(path: Path, text: str):
+        with open(path, "a", encoding="utf-8") as spool:
+            spool.write(text)
+
+    def _append_spool(self, rows: List[dict]):
+        with open(self._own_spool, "a", encoding="utf-8") as spool:
+            spool.write("".join(json.dumps(row) + "\n" for row in rows))
+            spool.flush()
+            os.fsync(spool.fileno())
+
+    def _rewrite_spool(self, rows: List[dict]):
+        tmp_path = self._own_spool.with_suffix(self._own_spool.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as spool:
+            for row in rows:
+                spool.write(json.dumps(row) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        tmp_path.replace(self._own_spool)
+
+    @staticmethod
+    def _lock(path: Path):
+        """Open and exclusively lock ``<path>.lock``; None if another live process holds it."""
+        handle = open(path.with_suffix(path.suffix + ".lock"), "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return None
+        return handle
+
+    def _adopt_spools(self) -> List[dict]:
+        """Lock this process's spool and read it along with every spool whose owner is gone."""
+        base = self.spool_path
+        self._own_spool = base.with_name(f"{base.stem}.{os.getpid()}{base.suffix}")
+        self._own_lock = self._lock(self._own_spool)
+        others = [path for path in sorted(base.parent.glob(f"{base.stem}.*{base.suffix}")) if path.suffix not in SIDE_FILE_SUFFIXES]
+        rows: List[dict] = []
+        seen = {row["id"] for row in self._pending}
+        for path in dict.fromkeys([self._own_spool, base, *others]):
+            if not path.exists():
+                continue
+            if path != self._own_spool:
+                handle = self._lock(path)
+                if handle is None:
+                    continue
+                self._adopted.append((path, handle))
+            for row in self._read_spool(path):
+                if row["id"] not in seen:
+                    seen.add(row["id"])
+                    rows.append(row)
+        return rows
+
+    def _release_adopted(self):
+        """Delete the adopted spools, whose rows this process's spool now holds."""
+        for path, handle in self._adopted:
+            path.unlink(missing_ok=True)
+            path.with_suffix(path.suffix + ".lock").unlink(missing_ok=True)
+            handle.close()
+        self._adopted = []
+
+    def _release_spool(self, drained: bool):
+        if drained:
+            self._own_spool.unlink(missing_ok=True)
+            self._own_spool.with_suffix(self._own_spool.suffix + ".lock").unlink(missing_ok=True)
+        if self._own_lock is not None:
+            self._own_lock.close()
+            self._own_lock = None
+
+    def _read_spool(self, path: Path) -> List[dict]:
+        rows = []
+        with open(path, encoding="utf-8") as spool:
+            for line in spool:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt %s spool line", self.table)
+        return rows
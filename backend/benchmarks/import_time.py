@@ -0,0 +1,105 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded on first use (a report, a password check), never by importing the app.
+DEFERRED_MODULES = ("reportlab", "passlib")
+# Loaded by the statistics endpoints and the memory backend, never by importing the app.
+IMPORT_DEFERRED_MODULES = ("numpy",)
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+STARTUP_SCRIPT = """
+import asyncio, sys, time
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+imported_early = sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[2].split(',')))
+async def main():
+    async with server.lifespan(server.app):
+        ready = time.perf_counter()
+    return ready
+ready = asyncio.run(main())
+loaded = sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[1].split(',')))
+print(f"{imported - started:.6f} {ready - imported:.6f} {','.join(loaded) or '-'} {','.join(imported_early) or '-'}")
+"""
+
+
+def environment(prewarm: bool) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_BACKEND", "memory")
+    env.setdefault("NOTIFICATION_SPOOL_PATH", "")
+    env["PREWARM"] = "true" if prewarm else "false"
+    return env
+
+
+def profile_imports(env: dict):
+    """Cumulative import time in microseconds of each package ``server`` imports directly."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        cumulative, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 3:
+            package = module.split(".")[0]
+            packages[package] = packages.get(package, 0) + cumulative
+    return packages
+
+
+def time_startup(env: dict):
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT, ",".join(DEFERRED_MODULES), ",".join(IMPORT_DEFERRED_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    imported, started, loaded, imported_early = result.stdout.splitlines()[-1].split(" ")
+    return float(imported), float(started), [name for name in loaded.split(",") if name != "-"], [name for name in imported_early.split(",") if name != "-"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long importing and starting the API takes in a fresh interpreter.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--prewarm", action="store_true", help="Run startup with PREWARM=true (pools and connections opened before serving)")
+    parser.add_argument("--max-import-ms", type=float, default=0, help="Fail when the median import time exceeds this")
+    args = parser.parse_args()
+
+    env = environment(args.prewarm)
+    packages = profile_imports(env)
+    print(f"slowest imports of server ({sum(packages.values()) / 1000:.0f}ms total):")
+    for module, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {module:<28} {micros / 1000:8.1f}ms")
+
+    imports, startups, failures = [], [], []
+    for _ in range(args.runs):
+        imported, started, loaded, imported_early = time_startup(env)
+        imports.append(imported)
+        startups.append(started)
+        if loaded and not args.prewarm:
+            failures.append(f"deferred modules loaded at startup: {', '.join(loaded)}")
+        if imported_early:
+            failures.append(f"deferred modules loaded by importing server: {', '.join(imported_early)}")
+
+    print(f"runs: {args.runs} prewarm: {args.prewarm}")
+    print(f"import server: median={statistics.median(imports) * 1000:.1f}ms min={min(imports) * 1000:.1f}ms")
+    print(f"lifespan startup: median={statistics.median(startups) * 1000:.1f}ms min={min(startups) * 1000:.1f}ms")
+
+    if args.max_import_ms and statistics.median(imports) * 1000 > args.max_import_ms:
+        failures.append(f"median import time above {args.max_import_ms:g}ms")
+    for failure in dict.fromkeys(failures):
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
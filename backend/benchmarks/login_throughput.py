@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def seed_users(count: int, password: str):
+    password_hash = asyncio.run(server.password_hasher.hash(password))
+    server.db.transport.store.seed("users", [
+        {
+            "id": str(uuid.uuid4()),
+            "full_name": f"Estudiante {i}",
+            "email": f"student{i}@example.com",
+            "password_hash": password_hash,
+            "role": "student",
+            "created_at": "2025-01-01T00:00:00+00:00",
+            "reset_token": None,
+            "reset_token_expiry": None,
+        }
+        for i in range(count)
+    ])
+
+
+async def run(users: int, total: int, concurrency: int, password: str):
+    transport = httpx.ASGITransport(app=server.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    login_latencies, ping_latencies, statuses = [], [], {}
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/auth/login", json={
+                    "email": f"student{i % users}@example.com",
+                    "password": password,
+                })
+                login_latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def ping():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/")
+                ping_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        pinger = asyncio.create_task(ping())
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await pinger
+
+    print(f"logins: {total} concurrency: {concurrency} workers: {server.password_hasher.workers} rounds: {server.password_hasher.rounds}")
+    print(f"throughput: {total / elapsed:.1f} logins/s over {elapsed:.2f}s")
+    print(f"login latency p50={percentile(login_latencies, 0.5) * 1000:.1f}ms p95={percentile(login_latencies, 0.95) * 1000:.1f}ms p99={percentile(login_latencies, 0.99) * 1000:.1f}ms")
+    if ping_latencies:
+        print(f"concurrent GET /api/ latency p50={statistics.median(ping_latencies) * 1000:.1f}ms max={max(ping_latencies) * 1000:.1f}ms")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure login throughput under concurrency against the in-memory backend.")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    password = "benchmark-password"
+    seed_users(args.users, password)
+    asyncio.run(run(args.users, args.requests, args.concurrency, password))
+    server.password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
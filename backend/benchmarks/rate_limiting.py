@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rate_limit import Limit, MemoryRateLimitBackend, RateLimiter, RateLimitMiddleware  # noqa: E402
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def discard(message):
+    pass
+
+
+def scopes(path: str, clients: int, count: int):
+    return [
+        {"type": "http", "method": "POST", "path": path, "client": (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 50000)}
+        for i in (n % clients for n in range(count))
+    ]
+
+
+async def per_request(app, requests) -> float:
+    started = time.perf_counter()
+    for scope in requests:
+        await app(scope, receive, discard)
+    return (time.perf_counter() - started) / len(requests)
+
+
+async def per_take(backend, keys, limit) -> float:
+    started = time.perf_counter()
+    for key in keys:
+        await backend.take(key, limit)
+    return (time.perf_counter() - started) / len(keys)
+
+
+async def run(requests: int, clients: int, repeat: int):
+    limiter = RateLimiter(MemoryRateLimitBackend(maxsize=clients * 2))
+    limiter.add("login_ip", "1000000/second")
+    limited = RateLimitMiddleware(endpoint, limiter, {"POST /api/auth/login": "login_ip"})
+
+    limited_requests = scopes("/api/auth/login", clients, requests)
+    other_requests = scopes("/api/courses/teacher", clients, requests)
+
+    results = {"bare endpoint": [], "unlimited route": [], "limited route": []}
+    for _ in range(repeat):
+        results["bare endpoint"].append(await per_request(endpoint, limited_requests))
+        results["unlimited route"].append(await per_request(limited, other_requests))
+        results["limited route"].append(await per_request(limited, limited_requests))
+
+    best = {name: min(values) for name, values in results.items()}
+    print(f"requests: {requests} clients: {clients} best of {repeat}")
+    for name, seconds in best.items():
+        overhead = seconds - best["bare endpoint"]
+        print(f"{name:<18} {seconds * 1e6:7.2f}us/request  overhead {overhead * 1e6:+6.2f}us")
+
+    backend = MemoryRateLimitBackend(maxsize=clients)
+    limit = Limit.parse("10/minute")
+    keys = [f"login_email:student{n % clients}@example.com" for n in range(requests)]
+    print(f"token bucket take: {await per_take(backend, keys, limit) * 1e6:.2f}us ({len(backend)} buckets)")
+    return best["limited route"] - best["bare endpoint"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-request cost of the rate limiting middleware.")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-overhead-us", type=float, default=0, help="Fail when the limited route adds more than this")
+    args = parser.parse_args()
+
+    overhead = asyncio.run(run(args.requests, args.clients, args.repeat))
+    if args.max_overhead_us and overhead * 1e6 > args.max_overhead_us:
+        print(f"FAIL: overhead above {args.max_overhead_us:g}us")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_BACKEND", "memory")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+
+    async def __call__(self, request):
+        self.count += 1
+
+
+def seed(students: int):
+    store = server.db.transport.store
+    now = "2025-01-01T00:00:00+00:00"
+    teacher = {"id": str(uuid.uuid4()), "full_name": "Docente", "email": "teacher@example.com", "role": "teacher",
+               "password_hash": "", "created_at": now, "reset_token": None, "reset_token_expiry": None}
+    course = {"id": str(uuid.uuid4()), "name": "Cálculo", "code": "MAT101", "description": "", "teacher_id": teacher["id"],
+              "academic_period": "2025-1", "access_code": "codigo", "created_at": now}
+    users, enrollments, grades = [teacher], [], []
+    for i in range(students):
+        student = {"id": str(uuid.uuid4()), "full_name": f"Estudiante {i:04d}", "email": f"student{i}@example.com",
+                   "role": "student", "password_hash": "", "created_at": now, "reset_token": None, "reset_token_expiry": None}
+        enrollment = {"id": str(uuid.uuid4()), "student_id": student["id"], "course_id": course["id"], "enrolled_at": now}
+        users.append(student)
+        enrollments.append(enrollment)
+        grades.append({"id": str(uuid.uuid4()), "enrollment_id": enrollment["id"], "course_id": course["id"],
+                       "student_id": student["id"], "student_name": student["full_name"], "corte1": None, "corte2": None,
+                       "corte3": None, "final_grade": None, "last_updated": now})
+    store.seed("users", users)
+    store.seed("courses", [course])
+    store.seed("enrollments", enrollments)
+    store.seed("grades", grades)
+    return teacher, users[1], course, enrollments[0]
+
+
+async def run(students: int):
+    teacher, student, course, enrollment = seed(students)
+    teacher_headers = {"Authorization": f"Bearer {server.create_access_token({'sub': teacher['id']})}"}
+    student_headers = {"Authorization": f"Bearer {server.create_access_token({'sub': student['id']})}"}
+
+    endpoints = [
+        ("GET /api/courses/student", "GET", "/api/courses/student", student_headers, None),
+        ("GET /api/courses/{id} (student)", "GET", f"/api/courses/{course['id']}", student_headers, None),
+        ("GET /api/courses/{id} (teacher)", "GET", f"/api/courses/{course['id']}", teacher_headers, None),
+        ("GET /api/courses/{id}/students", "GET", f"/api/courses/{course['id']}/students", teacher_headers, None),
+        ("GET /api/courses/teacher", "GET", "/api/courses/teacher", teacher_headers, None),
+        ("GET /api/grades/course/{id}", "GET", f"/api/grades/course/{course['id']}", teacher_headers, None),
+        ("GET /api/notifications", "GET", "/api/notifications", student_headers, None),
+        ("POST /api/grades", "POST", "/api/grades", teacher_headers, {"enrollment_id": enrollment["id"], "corte1": 4.0, "corte2": 3.0, "corte3": 5.0}),
+    ]
+
+    counter = RoundTripCounter()
+    server.db.session.event_hooks["request"].append(counter)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the principal cache so only the endpoint's own queries are counted.
+        for _, method, path, headers, body in endpoints:
+            await client.request(method, path, headers=headers, json=body)
+
+        print(f"{'endpoint':<36} {'status':>6} {'round trips':>12}")
+        for name, method, path, headers, body in endpoints:
+            counter.count = 0
+            response = await client.request(method, path, headers=headers, json=body)
+            print(f"{name:<36} {response.status_code:>6} {counter.count:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count database round trips per endpoint against the in-memory backend.")
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on (cached reads then cost no round trips)")
+    args = parser.parse_args()
+
+    server.response_cache.enabled = args.cache
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run(args.students))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Replay typical workloads against the API on the in-memory backend.
+
+    python benchmarks/suite.py                  # run and compare with baseline.json
+    python benchmarks/suite.py --save-baseline  # run and store the results as the new baseline
+    python benchmarks/suite.py --only dashboards,grade_entry
+
+Each workload reports latency percentiles, throughput and database queries
+per request. Compared with the baseline, a workload fails when its p95 or
+throughput is worse than the baseline by more than --tolerance, when it
+issues more than --query-tolerance extra queries per request, or when any
+request errors. The exit status is 1 on any failure. Results are only
+compared with a baseline recorded with the same dataset and workload
+settings.
+
+Only queries issued while serving a request are counted; background loops
+(token revocation sync, period watcher, write pipeline flushes) are left
+out. Every workload draws from its own generator seeded from --seed and its
+name, so --only replays exactly the requests of a full run.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("NOTIFICATION_SPOOL_PATH", "")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from metrics import current_request  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+PASSWORD = "benchmark-password"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Dataset:
+    """Deterministic synthetic school: teachers, courses, enrolled students, grades and notifications."""
+
+    def __init__(self, students: int, courses: int, teachers: int, courses_per_student: int, notifications_per_student: int, seed: int):
+        rng = random.Random(seed)
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        password_hash = asyncio.run(server.password_hasher.hash(PASSWORD))
+
+        def user(role: str, index: int) -> dict:
+            return {
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "full_name": f"{'Docente' if role == 'teacher' else 'Estudiante'} {index:05d}",
+                "email": f"{role}{index}@example.com",
+                "password_hash": password_hash,
+                "role": role,
+                "created_at": (base + timedelta(minutes=index)).isoformat(),
+                "reset_token": None,
+                "reset_token_expiry": None,
+            }
+
+        self.teachers = [user("teacher", i) for i in range(teachers)]
+        self.students = [user("student", i) for i in range(students)]
+        self.courses = [
+            {
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "name": f"Curso {i:04d}",
+                "code": f"C{i:04d}",
+                "description": "",
+                "teacher_id": self.teachers[i % teachers]["id"],
+                "academic_period": "2025-1",
+                "access_code": f"acceso{i:04d}",
+                "created_at": (base + timedelta(hours=i)).isoformat(),
+            }
+            for i in range(courses)
+        ]
+        self.enrollments, self.grades, self.notifications = [], [], []
+        self.enrollments_by_course = {course["id"]: [] for course in self.courses}
+        self.courses_by_student = {}
+        for student in self.students:
+            chosen = rng.sample(self.courses, min(courses_per_student, len(self.courses)))
+            self.courses_by_student[student["id"]] = [course["id"] for course in chosen]
+            for course in chosen:
+                enrollment = {
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "student_id": student["id"],
+                    "course_id": course["id"],
+                    "enrolled_at": base.isoformat(),
+                }
+                self.enrollments.append(enrollment)
+                self.enrollments_by_course[course["id"]].append(enrollment["id"])
+                cortes = [round(rng.uniform(0, 5), 1) if rng.random() < 0.7 else None for _ in range(3)]
+                self.grades.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "enrollment_id": enrollment["id"],
+                    "course_id": course["id"],
+                    "student_id": student["id"],
+                    "student_name": student["full_name"],
+                    "corte1": cortes[0],
+                    "corte2": cortes[1],
+                    "corte3": cortes[2],
+                    "final_grade": None,
+                    "last_updated": base.isoformat(),
+                })
+            for n in range(notifications_per_student):
+                self.notifications.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "user_id": student["id"],
+                    "message": f"Notificación {n}",
+                    "type": "grade_update",
+                    "read": rng.random() < 0.6,
+                    "created_at": (base + timedelta(minutes=n)).isoformat(),
+                })
+
+    def install(self, store):
+        store.seed("users", self.teachers + self.students)
+        store.seed("courses", self.courses)
+        store.seed("enrollments", self.enrollments)
+        store.seed("grades", self.grades)
+        store.seed("notifications", self.notifications)
+        store.functions["recompute_final_grades"](store, {})
+
+    def token(self, user: dict) -> dict:
+        return {"Authorization": f"Bearer {server.create_access_token({'sub': user['id']})}"}
+
+
+def login_burst(data: Dataset, rng: random.Random, size: int):
+    for student in rng.sample(data.students, min(size, len(data.students))):
+        yield "POST", "/api/auth/login", None, {"email": student["email"], "password": PASSWORD}
+
+
+def dashboards(data: Dataset, rng: random.Random, size: int):
+    for student in rng.sample(data.students, min(size, len(data.students))):
+        headers = data.token(student)
+        course_id = data.courses_by_student[student["id"]][0]
+        yield "GET", "/api/courses/student", headers, None
+        yield "GET", "/api/notifications", headers, None
+        yield "GET", "/api/notifications/unread-count", headers, None
+        yield "GET", f"/api/grades/student/course/{course_id}", headers, None
+    for course in rng.sample(data.courses, min(max(size // 10, 1), len(data.courses))):
+        teacher = next(teacher for teacher in data.teachers if teacher["id"] == course["teacher_id"])
+        headers = data.token(teacher)
+        yield "GET", "/api/courses/teacher", headers, None
+        yield "GET", f"/api/grades/course/{course['id']}", headers, None
+        yield "GET", f"/api/courses/{course['id']}/students", headers, None
+
+
+def grade_entry(data: Dataset, rng: random.Random, size: int):
+    for course in rng.sample(data.courses, min(max(size // 20, 1), len(data.courses))):
+        teacher = next(teacher for teacher in data.teachers if teacher["id"] == course["teacher_id"])
+        headers = data.token(teacher)
+        for enrollment_id in data.enrollments_by_course[course["id"]]:
+            grade = {"enrollment_id": enrollment_id, "corte1": round(rng.uniform(0, 5), 1)}
+            yield "POST", "/api/grades", headers, grade
+
+
+def pdf_export(data: Dataset, rng: random.Random, size: int):
+    courses = rng.sample(data.courses, min(max(size // 10, 1), len(data.courses)))
+    # Every course twice: the first request renders, the repeat is served from the report cache.
+    for course in courses + courses:
+        teacher = next(teacher for teacher in data.teachers if teacher["id"] == course["teacher_id"])
+        yield "GET", f"/api/grades/export/{course['id']}", data.token(teacher), None
+
+
+def notification_polling(data: Dataset, rng: random.Random, size: int):
+    students = rng.sample(data.students, min(max(size // 5, 1), len(data.students)))
+    for _ in range(5):
+        for student in students:
+            yield "GET", "/api/notifications", data.token(student), None
+
+
+WORKLOADS = {
+    "login_burst": login_burst,
+    "dashboards": dashboards,
+    "grade_entry": grade_entry,
+    "pdf_export": pdf_export,
+    "notification_polling": notification_polling,
+}
+
+
+class QueryCounter:
+    """Counts database queries made on behalf of an HTTP request.
+
+    MetricsMiddleware sets ``current_request`` while a request is served;
+    background tasks run without it and are not counted.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    async def __call__(self, request):
+        if current_request.get() is not None:
+            self.count += 1
+
+
+async def replay(client: httpx.AsyncClient, requests, concurrency: int, counter: QueryCounter) -> dict:
+    requests = list(requests)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def send(method, path, headers, body):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, headers=headers, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(send(*request) for request in requests))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(requests),
+        "errors": errors,
+        "throughput": len(requests) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "queries_per_request": (counter.count - queries_before) / len(requests),
+    }
+
+
+async def run(data: Dataset, names, size: int, concurrency: int, seed: int) -> dict:
+    counter = QueryCounter()
+    server.db.session.event_hooks["request"].append(counter)
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+    async with server.lifespan(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in names:
+                rng = random.Random(f"{seed}:{name}")
+                results[name] = await replay(client, WORKLOADS[name](data, rng, size), concurrency, counter)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, query_tolerance: float) -> list:
+    failures = []
+    for name, result in results.items():
+        if result["errors"]:
+            failures.append(f"{name}: {result['errors']} requests failed")
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p95 {result['p95_ms']:.1f}ms vs baseline {expected['p95_ms']:.1f}ms")
+        if result["throughput"] < expected["throughput"] / (1 + tolerance):
+            failures.append(f"{name}: throughput {result['throughput']:.1f}/s vs baseline {expected['throughput']:.1f}/s")
+        if result["queries_per_request"] > expected["queries_per_request"] + query_tolerance:
+            failures.append(f"{name}: {result['queries_per_request']:.2f} queries/request vs baseline {expected['queries_per_request']:.2f}")
+    return failures
+
+
+def report(results: dict, baseline: dict):
+    print(f"{'workload':<22} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6} {'p95 vs base':>12}")
+    for name, result in results.items():
+        expected = baseline.get(name)
+        delta = f"{(result['p95_ms'] / expected['p95_ms'] - 1) * 100:+.0f}%" if expected and expected["p95_ms"] else "-"
+        print(f"{name:<22} {result['requests']:>8} {result['errors']:>6} {result['throughput']:>8.1f} {result['p50_ms']:>8.1f} "
+              f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['queries_per_request']:>6.2f} {delta:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against seeded in-memory data.")
+    parser.add_argument("--students", type=int, default=3000)
+    parser.add_argument("--courses", type=int, default=300)
+    parser.add_argument("--teachers", type=int, default=60)
+    parser.add_argument("--courses-per-student", type=int, default=5)
+    parser.add_argument("--notifications-per-student", type=int, default=20)
+    parser.add_argument("--size", type=int, default=100, help="scale of each workload")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="comma-separated workloads to run")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p95/throughput regression")
+    parser.add_argument("--query-tolerance", type=float, default=0.05, help="allowed extra database queries per request")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(WORKLOADS)
+    unknown = [name for name in names if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("metrics").setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    data = Dataset(args.students, args.courses, args.teachers, args.courses_per_student, args.notifications_per_student, args.seed)
+    data.install(server.db.transport.store)
+    print(f"seeded {len(data.students)} students, {len(data.courses)} courses, {len(data.grades)} grades, "
+          f"{len(data.notifications)} notifications in {time.perf_counter() - started:.1f}s")
+
+    results = asyncio.run(run(data, names, args.size, args.concurrency, args.seed))
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("baseline", "save_baseline", "only", "tolerance", "query_tolerance")}
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = stored.get("workloads", {})
+    if baseline and stored.get("settings") != settings and not args.save_baseline:
+        print("settings differ from the baseline; results are not compared")
+        baseline = {}
+    report(results, baseline)
+
+    if args.save_baseline:
+        if stored.get("settings") != settings:
+            baseline = {}
+        stored = {"settings": settings, "workloads": {**baseline, **results}}
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    failures = compare(results, baseline, args.tolerance, args.query_tolerance)
+    if not stored:
+        print("no baseline to compare with; run with --save-baseline to create one")
+    if failures:
+        print("REGRESSIONS:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from grading import GRADE_FIELDS
+
+STAT_FIELDS = GRADE_FIELDS
+MAX_GRADE = 5.0
+# Values are counted in buckets of 0.01, the precision of stored grades, so
+# statistics derived from the counts are exact.
+SCALE = 100
+BUCKETS = int(MAX_GRADE * SCALE) + 1
+PASSING_GRADE = 3.0
+HISTOGRAM_WIDTH = 0.5
+
+
+def bucket(value: float) -> int:
+    return min(max(int(round(value * SCALE)), 0), BUCKETS - 1)
+
+
+def counts_from_grades(grades: Iterable[dict]) -> np.ndarray:
+    """Bucket counts of shape ``(len(STAT_FIELDS), BUCKETS)`` built from grade rows."""
+    counts = np.zeros((len(STAT_FIELDS), BUCKETS), dtype=np.int64)
+    grades = list(grades)
+    for index, field in enumerate(STAT_FIELDS):
+        values = np.array([grade[field] for grade in grades if grade.get(field) is not None], dtype=float)
+        if values.size:
+            buckets = np.clip(np.rint(values * SCALE).astype(np.int64), 0, BUCKETS - 1)
+            counts[index] = np.bincount(buckets, minlength=BUCKETS)
+    return counts
+
+
+def stack_counts(rows: Sequence[dict]) -> np.ndarray:
+    """Stack ``course_grade_stats`` rows into an array of shape ``(len(rows), len(STAT_FIELDS), BUCKETS)``."""
+    counts = np.zeros((len(rows), len(STAT_FIELDS), BUCKETS), dtype=np.int64)
+    for row_index, row in enumerate(rows):
+        for field_index, field in enumerate(STAT_FIELDS):
+            values = row.get(field)
+            if values:
+                counts[row_index, field_index, :len(values)] = values
+    return counts
+
+
+def _value_at_rank(cumulative: np.ndarray, rank: np.ndarray) -> np.ndarray:
+    return (cumulative > rank[..., None]).argmax(axis=-1)
+
+
+def summarize(counts: np.ndarray) -> List[dict]:
+    """Statistics for each group of bucket counts.
+
+    ``counts`` has shape ``(groups, len(STAT_FIELDS), BUCKETS)``; every
+    group (a course, a period, a teacher) is summarized at once.
+    """
+    counts = counts.astype(np.float64)
+    grades = np.arange(BUCKETS) / SCALE
+    n = counts.sum(axis=-1)
+    safe_n = np.where(n > 0, n, 1)
+    mean = (counts * grades).sum(axis=-1) / safe_n
+    variance = (counts * grades ** 2).sum(axis=-1) / safe_n - mean ** 2
+    stdev = np.sqrt(np.clip(variance, 0, None))
+
+    cumulative = counts.cumsum(axis=-1)
+    ranks = n.astype(np.int64)
+    median = (_value_at_rank(cumulative, (ranks - 1) // 2) + _value_at_rank(cumulative, ranks // 2)) / (2 * SCALE)
+
+    finals = counts[:, STAT_FIELDS.index("final_grade")]
+    passed = finals[:, bucket(PASSING_GRADE):].sum(axis=-1)
+    graded = finals.sum(axis=-1)
+    bins = int(MAX_GRADE / HISTOGRAM_WIDTH)
+    bin_of_bucket = np.minimum(np.arange(BUCKETS) // int(HISTOGRAM_WIDTH * SCALE), bins - 1)
+    histogram = np.zeros((len(counts), bins))
+    np.add.at(histogram, (slice(None), bin_of_bucket), finals)
+
+    summaries = []
+    for group in range(len(counts)):
+        fields = {}
+        for index, field in enumerate(STAT_FIELDS):
+            count = int(n[group, index])
+            fields[field] = {
+                "count": count,
+                "mean": round(float(mean[group, index]), 2) if count else None,
+                "median": round(float(median[group, index]), 2) if count else None,
+                "stdev": round(float(stdev[group, index]), 2) if count else None,
+            }
+        summaries.append({
+            **fields,
+            "graded": int(graded[group]),
+            "passed": int(passed[group]),
+            "pass_rate": round(float(passed[group] / graded[group]), 4) if graded[group] else None,
+            "histogram": [
+                {"from": round(bin_index * HISTOGRAM_WIDTH, 2), "to": round((bin_index + 1) * HISTOGRAM_WIDTH, 2), "count": int(histogram[group, bin_index])}
+                for bin_index in range(bins)
+            ],
+        })
+    return summaries
+
+
+def group_by(keys: Sequence[str], counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Sum the counts of rows sharing a key, e.g. courses of the same academic period."""
+    unique, inverse = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    grouped = np.zeros((len(unique), *counts.shape[1:]), dtype=counts.dtype)
+    np.add.at(grouped, inverse, counts)
+    return {key: grouped[index] for index, key in enumerate(unique)}
+
+
+def at_risk_filter(passing: float = PASSING_GRADE) -> str:
+    """PostgREST ``or`` expression for students failing or trending to fail.
+
+    Matches a final grade below ``passing``, or, while the final grade is
+    pending, any recorded corte below it.
+    """
+    cortes = ",".join(f"{field}.lt.{passing}" for field in STAT_FIELDS[:3])
+    return f"final_grade.lt.{passing},and(final_grade.is.null,or({cortes}))"
+
+
+def projected_grade(grade: dict, weights: Sequence[float]) -> Optional[float]:
+    """Weighted average of the cortes recorded so far."""
+    recorded = [(grade[field], weight) for field, weight in zip(STAT_FIELDS[:3], weights) if grade.get(field) is not None]
+    total = sum(weight for _, weight in recorded)
+    if not total:
+        return None
+    return round(sum(value * weight for value, weight in recorded) / total, 2)
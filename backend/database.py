@@ -1,15 +1,191 @@
+import asyncio
+import logging
 import os
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence
+
+import httpx
 from dotenv import load_dotenv
 from pathlib import Path
+from postgrest import APIError, AsyncPostgrestClient
+
+if TYPE_CHECKING:
+    from memory_backend import MemoryStore
+
+logger = logging.getLogger(__name__)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 supabase_url = os.environ.get('SUPABASE_URL')
 supabase_key = os.environ.get('SUPABASE_ANON_KEY')
+supabase_service_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
+
+DATABASE_BACKEND = os.environ.get('DATABASE_BACKEND', 'supabase')
+DB_HTTP2 = os.environ.get('DB_HTTP2', 'true').lower() == 'true'
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', '100'))
+DB_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('DB_MAX_KEEPALIVE_CONNECTIONS', '20'))
+DB_KEEPALIVE_EXPIRY = float(os.environ.get('DB_KEEPALIVE_EXPIRY', '30'))
+DB_CONNECT_TIMEOUT = float(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+DB_TIMEOUT = float(os.environ.get('DB_TIMEOUT', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+MEMORY_DB_LATENCY = float(os.environ.get('MEMORY_DB_LATENCY', '0'))
+IN_FILTER_CHUNK_SIZE = int(os.environ.get('IN_FILTER_CHUNK_SIZE', '200'))
+DB_WARM_CONNECTIONS = int(os.environ.get('DB_WARM_CONNECTIONS', '0'))
+
+UNIQUE_VIOLATION = '23505'
+CHECK_VIOLATION = '23514'
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client backed by one shared, keep-alive httpx pool."""
+
+    def __init__(self, base_url: str, api_key: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.transport = transport
+        super().__init__(
+            base_url,
+            headers={"apikey": api_key, "Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT, pool=DB_POOL_TIMEOUT),
+        )
+
+    def create_session(self, base_url, headers, timeout):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            http2=DB_HTTP2 and self.transport is None,
+            limits=httpx.Limits(
+                max_connections=DB_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=DB_KEEPALIVE_EXPIRY,
+            ),
+            transport=self.transport,
+        )
+
+
+def create_memory_client(store: Optional["MemoryStore"] = None, latency: float = MEMORY_DB_LATENCY) -> PooledPostgrestClient:
+    """A client over ``store``, or over a fresh store with the schema installed."""
+    # The memory backend (and the numpy it pulls in) is only imported when used.
+    from memory_backend import MemoryStore, MemoryTransport
+    from memory_schema import install_schema
+
+    if store is None:
+        store = install_schema(MemoryStore())
+    return PooledPostgrestClient("http://memory.local/rest/v1", "memory", transport=MemoryTransport(store, latency))
+
+
+def is_unique_violation(error: APIError, constraint: Optional[str] = None) -> bool:
+    if error.code != UNIQUE_VIOLATION:
+        return False
+    return constraint is None or f'"{constraint}"' in (error.message or '')
+
+
+def is_check_violation(error: APIError, constraint: Optional[str] = None) -> bool:
+    if error.code != CHECK_VIOLATION:
+        return False
+    return constraint is None or f'"{constraint}"' in (error.message or '')
+
+
+async def select_in(build_query: Callable[[List[Any]], Any], values: Sequence[Any], chunk_size: int = IN_FILTER_CHUNK_SIZE) -> List[dict]:
+    """Run ``build_query(chunk).execute()`` for each chunk of ``values`` concurrently.
+
+    Keeps ``in.(...)`` filters short enough for URL length limits when id
+    lists grow large. Rows from all chunks are concatenated in chunk order.
+    """
+    values = list(dict.fromkeys(values))
+    if not values:
+        return []
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    responses = await asyncio.gather(*(build_query(chunk).execute() for chunk in chunks))
+    return [row for response in responses for row in response.data]
+
+
+_memory_store: Optional["MemoryStore"] = None
+
+
+def memory_store() -> "MemoryStore":
+    """The process-wide memory store, shared by every client created over it."""
+    from memory_backend import MemoryStore
+    from memory_schema import install_schema
+
+    global _memory_store
+    if _memory_store is None:
+        _memory_store = install_schema(MemoryStore())
+    return _memory_store
+
+
+def create_db_client() -> PooledPostgrestClient:
+    if DATABASE_BACKEND == 'memory':
+        return create_memory_client(memory_store())
+
+    if not supabase_url or not supabase_key:
+        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in .env file")
+
+    return PooledPostgrestClient(f"{supabase_url.rstrip('/')}/rest/v1", supabase_key)
+
+
+def create_service_client() -> PooledPostgrestClient:
+    """A client with the service-role key, for maintenance scripts only; the API never holds this key."""
+    if DATABASE_BACKEND == 'memory':
+        return create_db_client()
+
+    if not supabase_url or not supabase_service_key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in .env file")
+
+    return PooledPostgrestClient(f"{supabase_url.rstrip('/')}/rest/v1", supabase_service_key)
+
+
+class Database:
+    """Creates the PostgREST client on first use instead of at import.
+
+    Attribute access is forwarded to the client, so ``db.table(...)`` works
+    as with the client itself. The API connects from its lifespan; scripts
+    connect implicitly on first query. Callbacks registered with
+    ``on_connect`` run on every new client (e.g. to install event hooks).
+    """
+
+    def __init__(self, factory: Callable[[], PooledPostgrestClient] = create_db_client):
+        self._factory = factory
+        self._client: Optional[PooledPostgrestClient] = None
+        self._on_connect: List[Callable[[PooledPostgrestClient], None]] = []
+
+    def on_connect(self, callback: Callable[[PooledPostgrestClient], None]):
+        self._on_connect.append(callback)
+        if self._client is not None:
+            callback(self._client)
+
+    def connect(self) -> PooledPostgrestClient:
+        if self._client is None:
+            client = self._factory()
+            for callback in self._on_connect:
+                callback(client)
+            self._client = client
+        return self._client
+
+    def __getattr__(self, name: str):
+        return getattr(self.connect(), name)
+
+    async def warm(self, connections: int = DB_WARM_CONNECTIONS):
+        """Open pooled connections before traffic arrives.
+
+        Over HTTP/2 one connection carries every request, so one round trip
+        is enough by default; over HTTP/1.1 each concurrent request opens
+        its own keep-alive connection.
+        """
+        client = self.connect()
+        connections = connections or (1 if DB_HTTP2 else DB_MAX_KEEPALIVE_CONNECTIONS)
+        results = await asyncio.gather(
+            *(client.table("users").select("id").limit(1).execute() for _ in range(connections)),
+            return_exceptions=True,
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.warning("Database warm-up failed for %d of %d connections: %s", len(failures), connections, failures[0])
+
+    async def aclose(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
 
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in .env file")
 
-supabase: Client = create_client(supabase_url, supabase_key)
+db = Database()
+service_db = Database(create_service_client)
@@ -0,0 +1,53 @@
+import csv
+import io
+from typing import List, Optional, Tuple
+
+EMAIL_HEADERS = ("email", "correo", "correo electrónico", "correo electronico")
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def read_emails(content: bytes, max_rows: int) -> List[Tuple[int, str]]:
+    """``(line, email)`` pairs from an uploaded CSV of student emails.
+
+    The email column is found by its header; without a recognised header
+    the first column is used and the first row is treated as data. Blank
+    lines are skipped.
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise InvalidImport("El archivo debe estar codificado en UTF-8")
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(io.StringIO(text), dialect)
+    column: Optional[int] = None
+    emails = []
+    try:
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if column is None:
+                column = header_column(row)
+                if column is not None:
+                    continue
+                column = 0
+            emails.append((reader.line_num, row[column].strip() if column < len(row) else ""))
+            if len(emails) > max_rows:
+                raise InvalidImport(f"Máximo {max_rows} estudiantes por archivo")
+    except csv.Error:
+        raise InvalidImport("El archivo no es un CSV válido")
+    return emails
+
+
+def header_column(row: List[str]) -> Optional[int]:
+    for index, cell in enumerate(row):
+        if cell.strip().lower() in EMAIL_HEADERS:
+            return index
+    return None
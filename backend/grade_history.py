@@ -0,0 +1,7 @@
+from typing import Dict, Optional
+
+TRACKED_FIELDS = ("corte1", "corte2", "corte3", "final_grade")
+
+
+def changed_fields(before: dict, after: dict) -> Dict[str, Optional[float]]:
+    return {field: after.get(field) for field in TRACKED_FIELDS if field in after and after.get(field) != before.get(field)}
@@ -0,0 +1,267 @@
+import csv
+import io
+import math
+import re
+import zipfile
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import ParseError, iterparse
+from xml.sax.saxutils import escape
+
+from enrollment_import import InvalidImport
+
+GRADE_FIELDS = ("corte1", "corte2", "corte3")
+HEADERS = ("enrollment_id", "estudiante", "corte1", "corte2", "corte3", "nota_final")
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLSX_MAX_COLUMNS = 16384
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Calificaciones" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def grade_cells(grade: dict) -> list:
+    return [grade["enrollment_id"], grade["student_name"], *(grade.get(field) for field in (*GRADE_FIELDS, "final_grade"))]
+
+
+def _csv_cell(value):
+    """Quote text that a spreadsheet would otherwise evaluate as a formula."""
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def csv_chunks(pages: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    """Encode grade pages as CSV, one chunk per page. The BOM lets Excel detect UTF-8."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADERS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    async for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(value) for value in grade_cells(grade)] for grade in page)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Sink:
+    """Write-only file for ``zipfile``; written bytes are taken out with ``drain``."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_row(number: int, values: list) -> str:
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append("<c/>")
+        elif isinstance(value, (int, float)):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+async def xlsx_chunks(pages: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    """Write grade pages as a single-sheet XLSX, streamed as the zip is built.
+
+    The archive is written to an unseekable sink, so ``zipfile`` emits
+    data descriptors instead of seeking back, and each page is yielded as
+    soon as it is compressed.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'.encode("utf-8")
+                + _xlsx_row(1, list(HEADERS)).encode("utf-8")
+            )
+            number = 1
+            async for page in pages:
+                rows = []
+                for grade in page:
+                    number += 1
+                    rows.append(_xlsx_row(number, grade_cells(grade)))
+                sheet.write("".join(rows).encode("utf-8"))
+                yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+def _csv_rows(file: BinaryIO) -> Iterator[Tuple[int, List[str]]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(text, dialect)
+        for row in reader:
+            yield reader.line_num, row
+    except UnicodeDecodeError:
+        raise InvalidImport("El archivo debe estar codificado en UTF-8")
+    except csv.Error:
+        raise InvalidImport("El archivo no es un CSV válido")
+    finally:
+        text.detach()
+
+
+def _column_index(reference: str) -> int:
+    index = 0
+    for letter in re.match(r"[A-Z]*", reference).group():
+        index = index * 26 + ord(letter) - ord("A") + 1
+        if index > XLSX_MAX_COLUMNS:
+            raise ValueError(f"Column {reference} is beyond the last XLSX column")
+    return index - 1
+
+
+def _cell_text(cell, shared: List[str]) -> str:
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(node.text or "" for node in cell.iter(f"{SHEET_NS}t"))
+    value = cell.find(f"{SHEET_NS}v")
+    if value is None or value.text is None:
+        return ""
+    if kind == "s":
+        return shared[int(value.text)]
+    return value.text
+
+
+def _xlsx_rows(file: BinaryIO) -> Iterator[Tuple[int, List[str]]]:
+    """Rows of the first worksheet, parsed incrementally from the zipped XML."""
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise InvalidImport("El archivo no es un XLSX válido")
+    with archive:
+        sheets = [name for name in archive.namelist() if re.fullmatch(r"xl/worksheets/sheet\d+\.xml", name)]
+        if not sheets:
+            raise InvalidImport("El archivo no es un XLSX válido")
+        try:
+            shared = []
+            if "xl/sharedStrings.xml" in archive.namelist():
+                with archive.open("xl/sharedStrings.xml") as strings:
+                    for _, element in iterparse(strings):
+                        if element.tag == f"{SHEET_NS}si":
+                            shared.append("".join(node.text or "" for node in element.iter(f"{SHEET_NS}t")))
+                            element.clear()
+            with archive.open(min(sheets, key=lambda name: int(re.search(r"\d+", name).group()))) as sheet:
+                number = 0
+                for _, element in iterparse(sheet):
+                    if element.tag != f"{SHEET_NS}row":
+                        continue
+                    number = int(element.get("r") or number + 1)
+                    row: List[str] = []
+                    for position, cell in enumerate(element.iter(f"{SHEET_NS}c")):
+                        index = _column_index(cell.get("r")) if cell.get("r") else position
+                        row.extend([""] * (index + 1 - len(row)))
+                        row[index] = _cell_text(cell, shared)
+                    element.clear()
+                    yield number, row
+        except (ParseError, IndexError, ValueError, zipfile.BadZipFile):
+            raise InvalidImport("El archivo no es un XLSX válido")
+
+
+def _normalize(header: str) -> str:
+    return re.sub(r"[\s_]", "", header.strip().lower())
+
+
+def _cell(row: List[str], columns: Dict[str, int], field: str) -> str:
+    index = columns.get(field)
+    return row[index] if index is not None and index < len(row) else ""
+
+
+def _grade_value(text: str) -> Optional[float]:
+    text = text.strip().replace(",", ".")
+    if not text:
+        return None
+    value = float(text)
+    if not math.isfinite(value):
+        raise ValueError(f"Non-finite grade {text!r}")
+    return value
+
+
+def read_grades(file: BinaryIO, filename: str, max_rows: int) -> List[Tuple[int, str, Dict[str, Optional[float]], Optional[str]]]:
+    """``(line, enrollment_id, grades, error)`` for each data row of a CSV or XLSX gradebook.
+
+    Columns are found by header, so the file exported by the API can be
+    edited and uploaded back; ``estudiante`` and ``nota_final`` are
+    ignored. Empty cells leave the stored grade unchanged.
+    """
+    is_xlsx = filename.lower().endswith(".xlsx") or file.read(4) == b"PK\x03\x04"
+    file.seek(0)
+    rows = _xlsx_rows(file) if is_xlsx else _csv_rows(file)
+
+    columns: Optional[Dict[str, int]] = None
+    grades = []
+    for line, row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        if columns is None:
+            headers = [_normalize(cell) for cell in row]
+            if "enrollmentid" not in headers:
+                raise InvalidImport("El archivo debe tener una columna enrollment_id")
+            columns = {field: headers.index(field) for field in ("enrollmentid", *GRADE_FIELDS) if field in headers}
+            continue
+
+        values, error = {}, None
+        for field in GRADE_FIELDS:
+            try:
+                values[field] = _grade_value(_cell(row, columns, field))
+            except ValueError:
+                error = f"Valor inválido en {field}"
+                break
+        grades.append((line, _cell(row, columns, "enrollmentid").strip(), values, error))
+        if len(grades) > max_rows:
+            raise InvalidImport(f"Máximo {max_rows} filas por archivo")
+    if columns is None:
+        raise InvalidImport("El archivo está vacío")
+    return grades
@@ -0,0 +1,33 @@
+import math
+from typing import Optional, Sequence, Tuple
+
+DEFAULT_GRADE_WEIGHTS: Tuple[float, float, float] = (0.30, 0.35, 0.35)
+WEIGHT_FIELDS = ("weight_corte1", "weight_corte2", "weight_corte3")
+# courses.weight_corte* are numeric(4, 3): thousandths.
+WEIGHT_SCALE = 1000
+GRADE_FIELDS = ("corte1", "corte2", "corte3", "final_grade")
+
+
+def calculate_final_grade(corte1: Optional[float], corte2: Optional[float], corte3: Optional[float],
+                          weights: Tuple[float, float, float] = DEFAULT_GRADE_WEIGHTS) -> Optional[float]:
+    if corte1 is not None and corte2 is not None and corte3 is not None:
+        final = (corte1 * weights[0]) + (corte2 * weights[1]) + (corte3 * weights[2])
+        return round(final, 2)
+    return None
+
+
+def course_weights(course: dict) -> Tuple[float, float, float]:
+    return tuple(
+        course[field] if course.get(field) is not None else default
+        for field, default in zip(WEIGHT_FIELDS, DEFAULT_GRADE_WEIGHTS)
+    )
+
+
+def weights_valid(weights: Sequence[float]) -> bool:
+    """Whether ``weights`` are exact thousandths between 0 and 1 adding up to exactly 1, as the database checks."""
+    if not all(math.isfinite(weight) and 0 <= weight <= 1 for weight in weights):
+        return False
+    scaled = [weight * WEIGHT_SCALE for weight in weights]
+    if any(abs(value - round(value)) > 1e-6 for value in scaled):
+        return False
+    return sum(round(value) for value in scaled) == WEIGHT_SCALE
@@ -0,0 +1,68 @@
+"""List, activate and close the academic periods of an institution.
+
+    python manage_periods.py list [--institution SLUG]
+    python manage_periods.py activate CODE [--institution SLUG]
+    python manage_periods.py close CODE [--institution SLUG]
+
+Closing a period archives its courses, enrollments and grades: they drop
+out of the default listings and can no longer be edited. Activating a
+period closes the one that was active. Running API workers poll the
+periods every PERIOD_SYNC_INTERVAL seconds and drop cached listings when
+one changes, so they may serve the old listings until then.
+
+Only the service role may activate or close periods: set
+SUPABASE_SERVICE_ROLE_KEY.
+"""
+import argparse
+import asyncio
+
+from database import service_db
+
+
+async def find_institution(slug: str) -> dict:
+    response = await service_db.table("institutions").select("id, name").eq("slug", slug).execute()
+    if not response.data:
+        raise SystemExit(f"Unknown institution {slug!r}")
+    return response.data[0]
+
+
+async def find_period(institution: dict, code: str) -> dict:
+    response = await service_db.table("academic_periods").select("id, code, status").eq("institution_id", institution["id"]).eq("code", code).execute()
+    if not response.data:
+        raise SystemExit(f"Unknown period {code!r} in {institution['name']}")
+    return response.data[0]
+
+
+async def run(args):
+    institution = await find_institution(args.institution)
+    if args.command == "list":
+        response = await service_db.table("academic_periods").select("code, status").eq("institution_id", institution["id"]).order("code").execute()
+        for period in response.data:
+            print(f"{period['code']}\t{period['status']}")
+        return
+
+    period = await find_period(institution, args.code)
+    if args.command == "close":
+        archived = await service_db.rpc("close_academic_period", {"p_period_id": period["id"]}).execute()
+        print(f"Closed {period['code']}, archived {archived.data} courses")
+    else:
+        await service_db.rpc("activate_academic_period", {"p_period_id": period["id"]}).execute()
+        print(f"Activated {period['code']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("list", "activate", "close"))
+    parser.add_argument("code", nargs="?", help="period code, e.g. 2026-1")
+    parser.add_argument("--institution", default="default", help="institution slug")
+    args = parser.parse_args()
+    if args.command != "list" and not args.code:
+        parser.error(f"{args.command} needs a period code")
+    try:
+        await run(args)
+    finally:
+        await service_db.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,414 @@
+import asyncio
+import copy
+import json
+import re
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+
+class MemoryStore:
+    """In-memory stand-in for the Supabase tables used by tests and benchmarks."""
+
+    def __init__(self):
+        self.tables: Dict[str, List[dict]] = defaultdict(list)
+        self.unique_keys: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = defaultdict(list)
+        self.functions: Dict[str, Callable[["MemoryStore", dict], Any]] = {}
+        self.views: Dict[str, Callable[["MemoryStore"], List[dict]]] = {}
+        self.triggers: Dict[str, List[Callable[["MemoryStore", dict], None]]] = defaultdict(list)
+        self.defaults: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self.cascades: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        self.columns: Dict[str, Tuple[str, ...]] = {}
+
+    def declare_columns(self, relation: str, *columns: str):
+        """Declare the columns of a table or view; requests naming any other column fail as in PostgREST."""
+        self.columns[relation] = tuple(columns)
+
+    def check_columns(self, relation: str, columns: List[str]):
+        known = self.columns.get(relation)
+        if known is None:
+            return
+        for column in columns:
+            if column not in known:
+                raise MemoryBackendError(400, "42703", f"column {relation}.{column} does not exist")
+
+    def add_unique(self, table: str, *columns: str, name: Optional[str] = None):
+        self.unique_keys[table].append((name or f"{table}_{'_'.join(columns)}_key", tuple(columns)))
+
+    def constraints(self, table: str) -> List[Tuple[str, Tuple[str, ...]]]:
+        return [(f"{table}_pkey", ("id",))] + self.unique_keys.get(table, [])
+
+    def register_function(self, name: str, fn: Callable[["MemoryStore", dict], Any]):
+        self.functions[name] = fn
+
+    def register_view(self, name: str, fn: Callable[["MemoryStore"], List[dict]]):
+        self.views[name] = fn
+
+    def set_defaults(self, table: str, **values: Any):
+        self.defaults[table].update(values)
+
+    def with_defaults(self, table: str, row: dict) -> dict:
+        return {**self.defaults.get(table, {}), **row}
+
+    def register_trigger(self, table: str, fn: Callable[["MemoryStore", dict], None]):
+        """Register a BEFORE INSERT OR UPDATE row trigger; ``fn`` may modify the row."""
+        self.triggers[table].append(fn)
+
+    def run_triggers(self, table: str, row: dict):
+        for trigger in self.triggers.get(table, []):
+            trigger(self, row)
+
+    def add_cascade(self, table: str, column: str, parent: str):
+        """Declare ``table.column`` a foreign key to ``parent.id`` with ON DELETE CASCADE."""
+        self.cascades[parent].append((table, column))
+
+    def delete(self, table: str, selected: Callable[[dict], bool]) -> List[dict]:
+        """Delete the selected rows of ``table`` and, through cascades, their dependents."""
+        rows = self.tables[table]
+        deleted = [row for row in rows if selected(row)]
+        if not deleted:
+            return []
+        self.tables[table] = [row for row in rows if not selected(row)]
+        ids = {row["id"] for row in deleted}
+        for child, column in self.cascades.get(table, []):
+            self.delete(child, lambda row, column=column: row.get(column) in ids)
+        return deleted
+
+    def seed(self, table: str, rows: List[dict]):
+        self.tables[table].extend(self.with_defaults(table, copy.deepcopy(row)) for row in rows)
+
+    def clear(self):
+        self.tables.clear()
+
+
+def _key_values(row: dict, key: Tuple[str, ...]) -> Optional[tuple]:
+    values = tuple(row.get(column) for column in key)
+    return None if any(value is None for value in values) else values
+
+
+class _UniqueIndex:
+    def __init__(self, rows: List[dict], key: Tuple[str, ...]):
+        self.key = key
+        self.entries: Dict[tuple, dict] = {}
+        for row in rows:
+            self.add(row)
+
+    def get(self, row: dict) -> Optional[dict]:
+        values = _key_values(row, self.key)
+        return None if values is None else self.entries.get(values)
+
+    def add(self, row: dict):
+        values = _key_values(row, self.key)
+        if values is not None:
+            self.entries[values] = row
+
+    def remove(self, row: dict):
+        values = _key_values(row, self.key)
+        if values is not None and self.entries.get(values) is row:
+            del self.entries[values]
+
+
+def unique_violation(name: Optional[str]) -> "MemoryBackendError":
+    return MemoryBackendError(409, "23505", f'duplicate key value violates unique constraint "{name}"')
+
+
+class MemoryBackendError(Exception):
+    def __init__(self, status_code: int, code: str, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+
+def _split_top_level(value: str) -> List[str]:
+    parts, depth, quoted, escaped, current = [], 0, False, False, []
+    for char in value:
+        if escaped:
+            escaped = False
+        elif quoted and char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _coerce(raw: str, sample: Any) -> Any:
+    if isinstance(sample, bool):
+        return raw.lower() == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    negate = False
+    if expression.startswith("not."):
+        negate = True
+        expression = expression[4:]
+    operator, _, raw = expression.partition(".")
+    value = row.get(column)
+
+    if operator == "is":
+        lowered = raw.lower()
+        if lowered == "null":
+            result = value is None
+        elif lowered in ("true", "false"):
+            result = value is (lowered == "true")
+        else:
+            result = False
+    elif operator == "in":
+        options = [_unquote(item) for item in _split_top_level(raw[1:-1])]
+        result = value is not None and any(value == _coerce(option, value) for option in options)
+    elif operator in ("like", "ilike"):
+        pattern = re.escape(_unquote(raw)).replace(r"\*", ".*").replace("%", ".*")
+        flags = re.IGNORECASE if operator == "ilike" else 0
+        result = value is not None and re.fullmatch(pattern, str(value), flags) is not None
+    else:
+        if value is None:
+            result = False
+        else:
+            other = _coerce(_unquote(raw), value)
+            try:
+                result = {
+                    "eq": lambda: value == other,
+                    "neq": lambda: value != other,
+                    "gt": lambda: value > other,
+                    "gte": lambda: value >= other,
+                    "lt": lambda: value < other,
+                    "lte": lambda: value <= other,
+                }[operator]()
+            except KeyError:
+                raise MemoryBackendError(400, "PGRST100", f"Unsupported operator: {operator}")
+            except TypeError:
+                result = False
+    return not result if negate else result
+
+
+def _matches_logical(row: dict, operator: str, body: str) -> bool:
+    results = []
+    for condition in _split_top_level(body[1:-1]):
+        nested = re.match(r"^(not\.)?(and|or)(\(.*\))$", condition)
+        if nested:
+            result = _matches_logical(row, nested.group(2), nested.group(3))
+            results.append(not result if nested.group(1) else result)
+            continue
+        column, _, expression = condition.partition(".")
+        results.append(_matches(row, column, expression))
+    return all(results) if operator == "and" else any(results)
+
+
+def _selected_columns(select: str) -> Optional[List[str]]:
+    columns = _split_top_level(select)
+    if not columns or "*" in columns:
+        return None
+    return columns
+
+
+def _project(row: dict, columns: Optional[List[str]]) -> dict:
+    """Pick ``columns`` (checked against the relation beforehand); unset nullable columns read as null."""
+    if columns is None:
+        return dict(row)
+    return {column: row.get(column) for column in columns}
+
+
+class MemoryTransport(httpx.AsyncBaseTransport):
+    """httpx transport that answers PostgREST requests from a ``MemoryStore``.
+
+    Plugging the backend in at the transport level means the real async
+    PostgREST request builders (and any client instrumentation) are exercised
+    unchanged; only the network hop is replaced. ``latency`` adds an
+    artificial per-request delay to approximate a real round trip.
+    """
+
+    def __init__(self, store: Optional[MemoryStore] = None, latency: float = 0.0):
+        self.store = store or MemoryStore()
+        self.latency = latency
+        self.lock = asyncio.Lock()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = await request.aread()
+        payload = json.loads(body) if body else None
+        segments = [segment for segment in request.url.path.split("/") if segment]
+        try:
+            async with self.lock:
+                if len(segments) >= 2 and segments[-2] == "rpc":
+                    status_code, data, headers = self._rpc(segments[-1], payload)
+                else:
+                    status_code, data, headers = self._dispatch(request, segments[-1], payload)
+        except MemoryBackendError as error:
+            return httpx.Response(
+                error.status_code,
+                json={"code": error.code, "message": error.message, "details": None, "hint": None},
+            )
+        if data is None:
+            return httpx.Response(status_code, headers=headers)
+        return httpx.Response(status_code, json=data, headers=headers)
+
+    def _rpc(self, name: str, payload: Optional[dict]):
+        fn = self.store.functions.get(name)
+        if fn is None:
+            raise MemoryBackendError(404, "PGRST202", f"Could not find the function public.{name}")
+        return 200, fn(self.store, payload or {}), {}
+
+    def _dispatch(self, request: httpx.Request, table: str, payload: Any):
+        prefer = request.headers.get("prefer", "")
+        params = list(request.url.params.multi_items())
+        select = "*"
+        order: List[Tuple[str, bool, bool]] = []
+        limit = offset = None
+        on_conflict = None
+        filters: List[Tuple[str, str]] = []
+        for key, value in params:
+            if key == "select":
+                select = value
+            elif key == "order":
+                for term in value.split(","):
+                    parts = term.split(".")
+                    order.append((parts[0], "desc" in parts[1:], "nullsfirst" in parts[1:]))
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key == "on_conflict":
+                on_conflict = tuple(column.strip() for column in value.split(","))
+            else:
+                filters.append((_unquote(key), value))
+
+        columns = _selected_columns(select)
+        self.store.check_columns(table, [
+            *(columns or []),
+            *(column for column, _, _ in order),
+            *(column for column, _ in filters if column not in ("and", "or")),
+            *(column for item in (payload if isinstance(payload, list) else [payload] if payload else []) for column in item),
+        ])
+
+        def selected(row: dict) -> bool:
+            for column, expression in filters:
+                if column in ("and", "or"):
+                    if not _matches_logical(row, column, expression):
+                        return False
+                elif not _matches(row, column, expression):
+                    return False
+            return True
+
+        method = request.method
+        if table in self.store.views:
+            if method not in ("GET", "HEAD"):
+                raise MemoryBackendError(405, "PGRST000", f"View {table} is read-only")
+            rows = self.store.views[table](self.store)
+        else:
+            rows = self.store.tables[table]
+
+        if method in ("GET", "HEAD"):
+            matched = [row for row in rows if selected(row)]
+            for column, desc, nullsfirst in reversed(order):
+                present = [row for row in matched if row.get(column) is not None]
+                missing = [row for row in matched if row.get(column) is None]
+                present.sort(key=lambda row: row[column], reverse=desc)
+                matched = missing + present if nullsfirst else present + missing
+            total = len(matched)
+            start = offset or 0
+            end = start + limit if limit is not None else None
+            page = matched[start:end]
+            headers = {}
+            if "count=" in prefer:
+                headers["content-range"] = f"{start}-{start + len(page) - 1}/{total}" if page else f"*/{total}"
+            if method == "HEAD":
+                return 200, None, headers
+            return 200, [_project(row, columns) for row in page], headers
+
+        returning = "return=minimal" not in prefer
+        if method == "POST":
+            incoming = payload if isinstance(payload, list) else [payload]
+            merge = "resolution=merge-duplicates" in prefer
+            ignore = "resolution=ignore-duplicates" in prefer
+            constraints = self.store.constraints(table)
+            indexes = {key: _UniqueIndex(rows, key) for _, key in constraints}
+            target = on_conflict or ("id",)
+            if target not in indexes:
+                indexes[target] = _UniqueIndex(rows, target)
+            staged, backups, written = [], [], []
+            try:
+                for item in incoming:
+                    if merge or ignore:
+                        existing = indexes[target].get(item)
+                        if existing is not None:
+                            if ignore:
+                                continue
+                            candidate = {**existing, **item}
+                            for name, key in constraints:
+                                other = indexes[key].get(candidate)
+                                if other is not None and other is not existing:
+                                    raise unique_violation(name)
+                            for index in indexes.values():
+                                index.remove(existing)
+                            backups.append((existing, dict(existing)))
+                            existing.update(copy.deepcopy(item))
+                            self.store.run_triggers(table, existing)
+                            for index in indexes.values():
+                                index.add(existing)
+                            written.append(existing)
+                            continue
+                    for name, key in constraints:
+                        if indexes[key].get(item) is not None:
+                            raise unique_violation(name)
+                    row = self.store.with_defaults(table, copy.deepcopy(item))
+                    self.store.run_triggers(table, row)
+                    for index in indexes.values():
+                        index.add(row)
+                    staged.append(row)
+                    written.append(row)
+            except MemoryBackendError:
+                for existing, backup in reversed(backups):
+                    existing.clear()
+                    existing.update(backup)
+                raise
+            rows.extend(staged)
+            data = [_project(row, columns) for row in written] if returning else None
+            return 201, data, {}
+
+        if method == "PATCH":
+            matched = [row for row in rows if selected(row)]
+            for name, key in self.store.constraints(table):
+                if not any(column in payload for column in key):
+                    continue
+                index = _UniqueIndex(rows, key)
+                for row in matched:
+                    other = index.get({**row, **payload})
+                    if other is not None and other is not row:
+                        raise unique_violation(name)
+            for row in matched:
+                row.update(copy.deepcopy(payload))
+                self.store.run_triggers(table, row)
+            data = [_project(row, columns) for row in matched] if returning else None
+            return 200, data, {}
+
+        if method == "DELETE":
+            matched = self.store.delete(table, selected)
+            data = [_project(row, columns) for row in matched] if returning else None
+            return 200, data, {}
+
+        raise MemoryBackendError(405, "PGRST000", f"Unsupported method: {method}")
@@ -0,0 +1,370 @@
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from course_stats import STAT_FIELDS, counts_from_grades
+from grade_history import changed_fields
+from grading import DEFAULT_GRADE_WEIGHTS, WEIGHT_FIELDS, calculate_final_grade, course_weights
+from memory_backend import MemoryStore, unique_violation
+
+DEFAULT_INSTITUTION_ID = "00000000-0000-0000-0000-000000000001"
+
+NOTIFICATION_COLUMNS = ("id", "user_id", "message", "type", "read", "created_at")
+ENROLLMENT_COLUMNS = ("id", "student_id", "course_id", "enrolled_at", "archived")
+GRADE_COLUMNS = ("id", "enrollment_id", "course_id", "student_id", "student_name", "corte1", "corte2", "corte3", "final_grade", "last_updated", "archived")
+
+# Columns of every table and view, as left by supabase/migrations.
+COLUMNS = {
+    "users": ("id", "full_name", "email", "password_hash", "role", "created_at", "reset_token", "reset_token_expiry", "institution_id"),
+    "courses": ("id", "name", "code", "description", "teacher_id", "academic_period", "access_code", "created_at",
+                *WEIGHT_FIELDS, "institution_id", "period_id", "archived"),
+    "enrollments": ENROLLMENT_COLUMNS,
+    "grades": GRADE_COLUMNS,
+    "orphaned_enrollments": (*ENROLLMENT_COLUMNS, "quarantined_at"),
+    "orphaned_grades": (*GRADE_COLUMNS, "quarantined_at"),
+    "notifications": NOTIFICATION_COLUMNS,
+    "notifications_archive": (*NOTIFICATION_COLUMNS, "archived_at"),
+    "notification_counters": ("user_id", "unread"),
+    "course_grade_stats": ("course_id", *STAT_FIELDS),
+    "revoked_tokens": ("jti", "expires_at", "revoked_at"),
+    "user_token_revocations": ("user_id", "revoked_before", "revoked_at"),
+    "grade_history": ("id", "enrollment_id", "course_id", "student_id", "changed_by", "changed_at", "changes"),
+    "institutions": ("id", "name", "slug", "created_at"),
+    "academic_periods": ("id", "institution_id", "code", "starts_on", "ends_on", "status", "created_at"),
+    "student_courses": ("id", "name", "code", "description", "teacher_id", "academic_period", "access_code", "created_at",
+                        "student_id", "enrollment_id", "enrolled_at", *WEIGHT_FIELDS, "institution_id", "period_id", "archived"),
+    "course_roster": ("id", "full_name", "email", "role", "created_at", "enrollment_id", "course_id", "teacher_id", "enrolled_at", "institution_id"),
+    "teacher_course_stats": ("course_id", "name", "code", "academic_period", "teacher_id", *WEIGHT_FIELDS, *STAT_FIELDS),
+}
+
+
+def student_courses_view(store: MemoryStore) -> List[dict]:
+    courses = {course["id"]: course for course in store.tables["courses"]}
+    rows = []
+    for enrollment in store.tables["enrollments"]:
+        course = courses.get(enrollment["course_id"])
+        if course is not None:
+            rows.append({
+                **course,
+                "student_id": enrollment["student_id"],
+                "enrollment_id": enrollment["id"],
+                "enrolled_at": enrollment.get("enrolled_at"),
+                "archived": enrollment.get("archived", False),
+            })
+    return rows
+
+
+def course_roster_view(store: MemoryStore) -> List[dict]:
+    users = {user["id"]: user for user in store.tables["users"]}
+    courses = {course["id"]: course for course in store.tables["courses"]}
+    rows = []
+    for enrollment in store.tables["enrollments"]:
+        user = users.get(enrollment["student_id"])
+        course = courses.get(enrollment["course_id"])
+        if user is not None and course is not None:
+            rows.append({
+                "id": user["id"],
+                "full_name": user["full_name"],
+                "email": user["email"],
+                "role": user["role"],
+                "created_at": user["created_at"],
+                "enrollment_id": enrollment["id"],
+                "course_id": course["id"],
+                "teacher_id": course["teacher_id"],
+                "enrolled_at": enrollment.get("enrolled_at"),
+                "institution_id": user.get("institution_id"),
+            })
+    return rows
+
+
+def teacher_course_stats_view(store: MemoryStore) -> List[dict]:
+    grades_by_course = {}
+    for grade in store.tables["grades"]:
+        grades_by_course.setdefault(grade["course_id"], []).append(grade)
+    rows = []
+    for course in store.tables["courses"]:
+        counts = counts_from_grades(grades_by_course.get(course["id"], [])).tolist()
+        rows.append({
+            "course_id": course["id"],
+            "name": course["name"],
+            "code": course["code"],
+            "academic_period": course["academic_period"],
+            "teacher_id": course["teacher_id"],
+            **{field: course.get(field) for field in WEIGHT_FIELDS},
+            **dict(zip(STAT_FIELDS, counts)),
+        })
+    return rows
+
+
+def _find_course(store: MemoryStore, course_id: str) -> dict:
+    for course in store.tables["courses"]:
+        if course["id"] == course_id:
+            return course
+    return {}
+
+
+def _set_final_grade(grade: dict, weights):
+    grade["final_grade"] = calculate_final_grade(grade.get("corte1"), grade.get("corte2"), grade.get("corte3"), weights)
+
+
+def compute_final_grade_trigger(store: MemoryStore, grade: dict):
+    _set_final_grade(grade, course_weights(_find_course(store, grade.get("course_id"))))
+
+
+def course_weights_trigger(store: MemoryStore, course: dict):
+    weights = course_weights(course)
+    for grade in store.tables["grades"]:
+        if grade["course_id"] == course["id"]:
+            _set_final_grade(grade, weights)
+
+
+def recompute_final_grades(store: MemoryStore, params: dict) -> int:
+    course_id = params.get("p_course_id")
+    courses = {course["id"]: course for course in store.tables["courses"]}
+    count = 0
+    for grade in store.tables["grades"]:
+        if course_id is None or grade["course_id"] == course_id:
+            _set_final_grade(grade, course_weights(courses.get(grade["course_id"], {})))
+            count += 1
+    return count
+
+
+def save_grades(store: MemoryStore, params: dict) -> List[dict]:
+    submitted = {grade["enrollment_id"]: grade for grade in params["p_grades"]}
+    now = datetime.now(timezone.utc).isoformat()
+    saved = []
+    for grade in store.tables["grades"]:
+        values = submitted.get(grade["enrollment_id"])
+        if values is None or grade["course_id"] != params["p_course_id"]:
+            continue
+        before = dict(grade)
+        for field in ("corte1", "corte2", "corte3"):
+            if values.get(field) is not None:
+                grade[field] = values[field]
+        grade["last_updated"] = now
+        store.run_triggers("grades", grade)
+        changes = changed_fields(before, grade)
+        if changes:
+            store.tables["grade_history"].append({
+                "id": str(uuid.uuid4()),
+                "enrollment_id": grade["enrollment_id"],
+                "course_id": grade["course_id"],
+                "student_id": grade["student_id"],
+                "changed_by": params["p_changed_by"],
+                "changed_at": now,
+                "changes": changes,
+            })
+        saved.append(dict(grade))
+    return saved
+
+
+def delete_course(store: MemoryStore, params: dict) -> bool:
+    return bool(store.delete("courses", lambda course: course["id"] == params["p_course_id"] and course["teacher_id"] == params["p_teacher_id"]))
+
+
+def _enroll(store: MemoryStore, course: dict, student_id: str) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    enrollment = {"id": str(uuid.uuid4()), "student_id": student_id, "course_id": course["id"], "enrolled_at": now, "archived": False}
+    store.tables["enrollments"].append(enrollment)
+    student = next((user for user in store.tables["users"] if user["id"] == student_id), None)
+    if student is not None:
+        grade = {
+            "id": str(uuid.uuid4()),
+            "enrollment_id": enrollment["id"],
+            "course_id": course["id"],
+            "student_id": student_id,
+            "student_name": student["full_name"],
+            "corte1": None,
+            "corte2": None,
+            "corte3": None,
+            "final_grade": None,
+            "last_updated": now,
+            "archived": False,
+        }
+        store.run_triggers("grades", grade)
+        store.tables["grades"].append(grade)
+    return enrollment
+
+
+def enroll_student(store: MemoryStore, params: dict) -> List[dict]:
+    course = next((course for course in store.tables["courses"]
+                   if course["access_code"] == params["p_access_code"] and not course.get("archived")), None)
+    if course is None:
+        return []
+    if any(enrollment["student_id"] == params["p_student_id"] and enrollment["course_id"] == course["id"]
+           for enrollment in store.tables["enrollments"]):
+        raise unique_violation("enrollments_student_id_course_id_key")
+    _enroll(store, course, params["p_student_id"])
+    return [dict(course)]
+
+
+def enroll_students(store: MemoryStore, params: dict) -> List[dict]:
+    course = _find_course(store, params["p_course_id"])
+    if not course or course.get("archived"):
+        return []
+    enrolled = {enrollment["student_id"] for enrollment in store.tables["enrollments"] if enrollment["course_id"] == course["id"]}
+    created = []
+    for student_id in params["p_student_ids"]:
+        if student_id not in enrolled:
+            enrolled.add(student_id)
+            enrollment = _enroll(store, course, student_id)
+            created.append({"student_id": student_id, "enrollment_id": enrollment["id"]})
+    return created
+
+
+def users_by_email(store: MemoryStore, params: dict) -> List[dict]:
+    emails = {email.lower() for email in params["p_emails"]}
+    return [{"id": user["id"], "email": user["email"], "role": user["role"]} for user in store.tables["users"] if user["email"].lower() in emails]
+
+
+def academic_period_for(store: MemoryStore, params: dict) -> List[dict]:
+    periods = [period for period in store.tables["academic_periods"] if period["institution_id"] == params["p_institution_id"]]
+    period = next((period for period in periods if period["code"] == params["p_code"]), None)
+    if period is None:
+        period = {
+            "id": str(uuid.uuid4()),
+            "institution_id": params["p_institution_id"],
+            "code": params["p_code"],
+            "starts_on": None,
+            "ends_on": None,
+            "status": "upcoming" if any(period["status"] == "active" for period in periods) else "active",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        store.tables["academic_periods"].append(period)
+    return [dict(period)]
+
+
+def close_academic_period(store: MemoryStore, params: dict) -> int:
+    for period in store.tables["academic_periods"]:
+        if period["id"] == params["p_period_id"]:
+            period["status"] = "closed"
+    archived = {course["id"] for course in store.tables["courses"] if course.get("period_id") == params["p_period_id"]}
+    count = 0
+    for course in store.tables["courses"]:
+        if course["id"] in archived and not course.get("archived"):
+            course["archived"] = True
+            count += 1
+    for table in ("enrollments", "grades"):
+        for row in store.tables[table]:
+            if row["course_id"] in archived:
+                row["archived"] = True
+    return count
+
+
+def activate_academic_period(store: MemoryStore, params: dict) -> List[dict]:
+    period = next((period for period in store.tables["academic_periods"] if period["id"] == params["p_period_id"]), None)
+    if period is None:
+        return []
+    for previous in store.tables["academic_periods"]:
+        if previous["institution_id"] == period["institution_id"] and previous["status"] == "active" and previous is not period:
+            close_academic_period(store, {"p_period_id": previous["id"]})
+    period["status"] = "active"
+    return [dict(period)]
+
+
+def notification_counters_view(store: MemoryStore) -> List[dict]:
+    unread = Counter(notification["user_id"] for notification in store.tables["notifications"] if not notification.get("read"))
+    return [{"user_id": user_id, "unread": count} for user_id, count in unread.items()]
+
+
+def mark_notifications_read(store: MemoryStore, params: dict) -> int:
+    ids = set(params["p_ids"]) if params.get("p_ids") is not None else None
+    updated = 0
+    for notification in store.tables["notifications"]:
+        if notification["user_id"] == params["p_user_id"] and not notification.get("read") and (ids is None or notification["id"] in ids):
+            notification["read"] = True
+            updated += 1
+    return updated
+
+
+def _parse_interval(value: str) -> timedelta:
+    amount, unit = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(second|minute|hour|day)s?\s*", value).groups()
+    return timedelta(**{unit + "s": float(amount)})
+
+
+def archive_read_notifications(store: MemoryStore, params: dict) -> int:
+    cutoff = datetime.now(timezone.utc) - _parse_interval(params.get("p_older_than", "30 days"))
+    batch_size = params.get("p_batch_size", 1000)
+    candidates = sorted(
+        (notification for notification in store.tables["notifications"]
+         if notification.get("read") and datetime.fromisoformat(notification["created_at"]) < cutoff),
+        key=lambda notification: notification["created_at"],
+    )[:batch_size]
+    moved = {notification["id"] for notification in candidates}
+    archived_at = datetime.now(timezone.utc).isoformat()
+    store.tables["notifications"] = [notification for notification in store.tables["notifications"] if notification["id"] not in moved]
+    store.tables["notifications_archive"].extend({**notification, "archived_at": archived_at} for notification in candidates)
+    return len(candidates)
+
+
+def _later(first: str, second: str) -> str:
+    return max(first, second, key=datetime.fromisoformat)
+
+
+def revoke_token(store: MemoryStore, params: dict) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    existing = next((row for row in store.tables["revoked_tokens"] if row["jti"] == params["p_jti"]), None)
+    if existing is None:
+        store.tables["revoked_tokens"].append({"jti": params["p_jti"], "expires_at": params["p_expires_at"], "revoked_at": now})
+    else:
+        existing.update(expires_at=_later(existing["expires_at"], params["p_expires_at"]), revoked_at=now)
+
+
+def consume_token(store: MemoryStore, params: dict) -> bool:
+    if any(row["jti"] == params["p_jti"] for row in store.tables["revoked_tokens"]):
+        return False
+    revoke_token(store, params)
+    return True
+
+
+def revoke_user_tokens(store: MemoryStore, params: dict) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    existing = next((row for row in store.tables["user_token_revocations"] if row["user_id"] == params["p_user_id"]), None)
+    if existing is None:
+        store.tables["user_token_revocations"].append({"user_id": params["p_user_id"], "revoked_before": params["p_revoked_before"], "revoked_at": now})
+    else:
+        existing.update(revoked_before=_later(existing["revoked_before"], params["p_revoked_before"]), revoked_at=now)
+
+
+def install_schema(store: MemoryStore) -> MemoryStore:
+    """Mirror the constraints, views and functions from supabase/migrations on a memory store."""
+    for relation, columns in COLUMNS.items():
+        store.declare_columns(relation, *columns)
+    store.add_unique("users", "email")
+    store.add_unique("institutions", "slug")
+    store.add_unique("academic_periods", "institution_id", "code")
+    store.add_unique("courses", "period_id", "code")
+    store.add_unique("courses", "access_code")
+    store.add_unique("enrollments", "student_id", "course_id")
+    store.add_unique("grades", "enrollment_id")
+    store.add_cascade("enrollments", "course_id", "courses")
+    store.add_cascade("grades", "enrollment_id", "enrollments")
+    store.add_cascade("grades", "course_id", "courses")
+    store.set_defaults("users", institution_id=DEFAULT_INSTITUTION_ID)
+    store.set_defaults("courses", archived=False, **dict(zip(WEIGHT_FIELDS, DEFAULT_GRADE_WEIGHTS)))
+    store.set_defaults("enrollments", archived=False)
+    store.set_defaults("grades", archived=False)
+    store.seed("institutions", [{"id": DEFAULT_INSTITUTION_ID, "name": "Institución principal", "slug": "default"}])
+    store.register_trigger("grades", compute_final_grade_trigger)
+    store.register_trigger("courses", course_weights_trigger)
+    store.register_function("recompute_final_grades", recompute_final_grades)
+    store.register_function("save_grades", save_grades)
+    store.register_function("delete_course", delete_course)
+    store.register_function("enroll_student", enroll_student)
+    store.register_function("enroll_students", enroll_students)
+    store.register_function("users_by_email", users_by_email)
+    store.register_function("academic_period_for", academic_period_for)
+    store.register_function("close_academic_period", close_academic_period)
+    store.register_function("activate_academic_period", activate_academic_period)
+    store.register_function("mark_notifications_read", mark_notifications_read)
+    store.register_function("archive_read_notifications", archive_read_notifications)
+    store.register_function("revoke_token", revoke_token)
+    store.register_function("consume_token", consume_token)
+    store.register_function("revoke_user_tokens", revoke_user_tokens)
+    store.register_view("notification_counters", notification_counters_view)
+    store.register_view("student_courses", student_courses_view)
+    store.register_view("course_roster", course_roster_view)
+    store.register_view("teacher_course_stats", teacher_course_stats_view)
+    return store
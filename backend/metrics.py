@@ -0,0 +1,322 @@
+import asyncio
+import bisect
+import contextvars
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # One slot per bucket, then +Inf, sum and count.
+            series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> Iterable[Sample]:
+        for key, series in self._series.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, series[-2]
+            yield f"{self.name}_count", labels, series[-1]
+
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text format.
+
+    Collectors are called at scrape time and return ``(name, kind, help,
+    samples)`` tuples, which lets components that keep their own counters
+    be exported without depending on this module.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        families = [(metric.name, metric.kind, metric.documentation, metric.samples()) for metric in self._metrics]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception:
+                logger.exception("Metrics collector failed")
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def families(prefix: str, documentation: str, values: Dict[str, float], counters: Sequence[str] = ()):
+    """Turn a component's ``metrics()`` dict into collector families."""
+    for key, value in values.items():
+        kind = "counter" if key in counters else "gauge"
+        yield f"{prefix}_{key}", kind, f"{documentation}: {key.replace('_', ' ')}", [(f"{prefix}_{key}", {}, float(value))]
+
+
+class RequestStats:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries: List[Tuple[str, str, int, float]] = []
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(query[3] for query in self.queries)
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+
+def query_shape(query: str) -> str:
+    """The parameter names of a PostgREST query string, without their values.
+
+    Filter values can hold emails or reset tokens, so only the column names
+    (and ``select``, ``order``, ...) are kept for logs.
+    """
+    return "&".join(dict.fromkeys(name for name, _ in parse_qsl(query, keep_blank_values=True)))
+
+
+def timed_call(submitted_at: float, fn, *args):
+    """Run ``fn`` in a worker and report how long it waited in the pool queue."""
+    started = time.time()
+    result = fn(*args)
+    return max(started - submitted_at, 0.0), time.time() - started, result
+
+
+class DatabaseInstrumentation:
+    """httpx event hooks timing every PostgREST round trip.
+
+    Each query is recorded in the ``db_query_duration_seconds`` histogram
+    and appended to the stats of the HTTP request being served, if any.
+    """
+
+    def __init__(self, registry: Registry):
+        self.duration = registry.histogram("db_query_duration_seconds", "PostgREST round trip latency", ("method", "resource", "status"))
+
+    def install(self, client: httpx.AsyncClient):
+        client.event_hooks["request"].append(self._on_request)
+        client.event_hooks["response"].append(self._on_response)
+
+    async def _on_request(self, request: httpx.Request):
+        request.extensions["metrics_started"] = time.perf_counter()
+
+    async def _on_response(self, response: httpx.Response):
+        request = response.request
+        started = request.extensions.get("metrics_started")
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        resource = request.url.path.split("/rest/v1/", 1)[-1]
+        self.duration.observe(elapsed, method=request.method, resource=resource, status=str(response.status_code))
+        stats = current_request.get()
+        if stats is not None:
+            query = query_shape(request.url.query.decode("ascii", "replace"))
+            stats.queries.append((request.method, f"{resource}?{query}" if query else resource, response.status_code, elapsed))
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a sleep of ``interval`` seconds."""
+
+    def __init__(self, registry: Registry, interval: float = 0.5):
+        self.interval = interval
+        self.lag = registry.histogram("event_loop_lag_seconds", "Delay of event loop wake-ups",
+                                      buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+        self.max_lag = registry.gauge("event_loop_lag_max_seconds", "Largest event loop delay since start")
+        self._max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.lag.observe(lag)
+            if lag > self._max:
+                self._max = lag
+                self.max_lag.set(lag)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and database usage.
+
+    Streaming responses (Server-Sent Events) are left out of the latency
+    histograms since their duration is the connection lifetime. Requests
+    slower than ``slow_request_seconds`` are logged with the queries they
+    issued, by resource and filtered columns only; 0 disables that log.
+    """
+
+    def __init__(self, app, registry: Registry, slow_request_seconds: float = 0.0):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+        self.duration = registry.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+        self.db_round_trips = registry.histogram("http_request_db_round_trips", "Database round trips per HTTP request",
+                                                 ("method", "route"), buckets=COUNT_BUCKETS)
+        self.db_time = registry.histogram("http_request_db_seconds", "Time spent waiting on the database per HTTP request", ("method", "route"))
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+        self._in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        response = {"status": 500, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                response["streaming"] = content_type.startswith(b"text/event-stream")
+            await send(message)
+
+        self._in_flight += 1
+        self.in_flight.set(self._in_flight)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._in_flight -= 1
+            self.in_flight.set(self._in_flight)
+            current_request.reset(token)
+            if not response["streaming"]:
+                self._record(scope, response["status"], time.perf_counter() - started, stats)
+
+    def _record(self, scope, status: int, elapsed: float, stats: RequestStats):
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope["method"]
+        self.duration.observe(elapsed, method=method, route=route, status=str(status))
+        self.db_round_trips.observe(len(stats.queries), method=method, route=route)
+        self.db_time.observe(stats.db_seconds, method=method, route=route)
+
+        if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+            breakdown = "".join(
+                f"\n  {query_method} {resource} -> {query_status} in {seconds * 1000:.1f}ms"
+                for query_method, resource, query_status, seconds in stats.queries
+            )
+            logger.warning(
+                "Slow request %s %s -> %d in %.1fms (%d queries, %.1fms in database)%s",
+                method, route, status, elapsed * 1000, len(stats.queries), stats.db_seconds * 1000, breakdown,
+            )
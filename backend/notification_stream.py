@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[dict], Awaitable[None]]
+
+
+class Broker(ABC):
+    """Carries published events to every worker's hub.
+
+    ``start`` is given the hub's delivery callback; ``publish`` must make the
+    event reach that callback on every worker, including the publishing one.
+    """
+
+    @abstractmethod
+    async def start(self, deliver: Deliver):
+        ...
+
+    @abstractmethod
+    async def publish(self, event: dict):
+        ...
+
+    async def stop(self):
+        pass
+
+
+class LocalBroker(Broker):
+    """Single-process broker: events are delivered straight back to the hub."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def publish(self, event: dict):
+        if self._deliver is not None:
+            await self._deliver(event)
+
+    async def stop(self):
+        self._deliver = None
+
+
+class Subscription:
+    def __init__(self, hub: "NotificationHub", user_id: str, queue_size: int):
+        self.hub = hub
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def push(self, event: Optional[dict]) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Next event, or ``None`` when ``timeout`` passes without one.
+
+        Raises ``EOFError`` once the subscription has been closed.
+        """
+        if self.closed and self.queue.empty():
+            raise EOFError()
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is None:
+            raise EOFError()
+        return event
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub._unsubscribe(self)
+            while not self.push(None):
+                self.queue.get_nowait()
+
+
+class NotificationHub:
+    """Fans events out to the streaming connections of each user.
+
+    Events go through ``broker`` so several workers can share them. The last
+    ``history_size`` events per user are kept so a reconnecting client can
+    resume after the last event id it saw. A client that falls more than
+    ``queue_size`` events behind is disconnected and has to resume.
+    """
+
+    def __init__(self, broker: Optional[Broker] = None, history_size: int = 100, queue_size: int = 256,
+                 heartbeat_interval: float = 15.0):
+        self.broker = broker or LocalBroker()
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._history: Dict[str, Deque[dict]] = {}
+        self.connections_total = 0
+        self.published_total = 0
+        self.delivered_total = 0
+        self.dropped_total = 0
+        self.fanout_count = 0
+        self.fanout_seconds_total = 0.0
+        self.fanout_seconds_max = 0.0
+
+    @property
+    def connected_clients(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    async def start(self):
+        await self.broker.start(self._deliver)
+
+    async def stop(self):
+        await self.broker.stop()
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                subscription.close()
+
+    async def publish(self, user_id: str, event_type: str, data: dict, event_id: Optional[str] = None):
+        event = {
+            "id": event_id or str(uuid.uuid4()),
+            "user_id": user_id,
+            "event": event_type,
+            "data": data,
+            "published_at": time.time(),
+        }
+        self.published_total += 1
+        try:
+            await self.broker.publish(event)
+        except Exception:
+            logger.exception("Failed to publish %s event for user %s", event_type, user_id)
+
+    async def _deliver(self, event: dict):
+        user_id = event["user_id"]
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = deque(maxlen=self.history_size)
+        history.append(event)
+
+        for subscription in list(self._subscribers.get(user_id, ())):
+            if subscription.push(event):
+                self.delivered_total += 1
+            else:
+                self.dropped_total += 1
+                logger.warning("Disconnecting slow notification stream for user %s", user_id)
+                subscription.close()
+
+        elapsed = max(time.time() - event["published_at"], 0.0)
+        self.fanout_count += 1
+        self.fanout_seconds_total += elapsed
+        self.fanout_seconds_max = max(self.fanout_seconds_max, elapsed)
+
+    def subscribe(self, user_id: str, last_event_id: Optional[str] = None) -> Subscription:
+        """Register a stream, queueing any buffered events after ``last_event_id``."""
+        subscription = Subscription(self, user_id, self.queue_size)
+        if last_event_id is not None:
+            for event in self.replay(user_id, last_event_id) or []:
+                subscription.push(event)
+        self._subscribers[user_id].add(subscription)
+        self.connections_total += 1
+        return subscription
+
+    def replay(self, user_id: str, last_event_id: str) -> Optional[List[dict]]:
+        """Buffered events after ``last_event_id``, or ``None`` if it is no longer buffered."""
+        history = list(self._history.get(user_id, ()))
+        for index, event in enumerate(history):
+            if event["id"] == last_event_id:
+                return history[index + 1:]
+        return None
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    def metrics(self) -> dict:
+        return {
+            "connected_clients": self.connected_clients,
+            "connections_total": self.connections_total,
+            "published_total": self.published_total,
+            "delivered_total": self.delivered_total,
+            "dropped_total": self.dropped_total,
+            "fanout_count": self.fanout_count,
+            "fanout_seconds_total": self.fanout_seconds_total,
+            "fanout_seconds_max": self.fanout_seconds_max,
+        }
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def format_heartbeat() -> str:
+    return ": ping\n\n"
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationPipeline(BatchWriter):
+    """Buffers notifications in process and writes them as multi-row inserts.
+
+    Batching and the restart spool come from ``BatchWriter``. Notifications
+    enqueued with a ``coalesce_key`` are dropped when one with the same user
+    and key was already queued or written within ``coalesce_window`` seconds.
+    """
+
+    table = "notifications"
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.5, coalesce_window: float = 60.0,
+                 spool_path: Optional[Path] = None,
+                 max_pending: int = 100000):
+        super().__init__(batch_size=batch_size, flush_interval=flush_interval, spool_path=spool_path, max_pending=max_pending)
+        self.coalesce_window = coalesce_window
+        self._recent: Dict[Tuple[str, str], float] = {}
+        self.coalesced_total = 0
+
+    async def enqueue(self, user_ids: List[str], message: str, notification_type: str, coalesce_key: Optional[str] = None) -> List[dict]:
+        """Queue one notification per user and return the ones kept, leaving out coalesced and dropped ones."""
+        now = time.monotonic()
+        created_at = datetime.now(timezone.utc).isoformat()
+        notifications, previous = [], {}
+        for user_id in user_ids:
+            if coalesce_key is not None:
+                key = (user_id, coalesce_key)
+                last = self._recent.get(key)
+                if last is not None and now - last < self.coalesce_window:
+                    self.coalesced_total += 1
+                    continue
+                # Claimed before the spool write so a concurrent enqueue coalesces into this one.
+                previous[key] = last
+                self._recent[key] = now
+            notifications.append({
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "message": message,
+                "type": notification_type,
+                "read": False,
+                "created_at": created_at
+            })
+
+        kept = await self.append(notifications)
+        kept_users = {notification["user_id"] for notification in kept}
+        for key, last in previous.items():
+            if key[0] not in kept_users:
+                if last is None:
+                    self._recent.pop(key, None)
+                else:
+                    self._recent[key] = last
+        return kept
+
+    def before_flush(self):
+        cutoff = time.monotonic() - self.coalesce_window
+        for key in [key for key, seen in self._recent.items() if seen < cutoff]:
+            del self._recent[key]
+
+    def metrics(self) -> dict:
+        return {**super().metrics(), "coalesced_total": self.coalesced_total}
+
+
+class NotificationArchiver:
+    """Moves read notifications older than ``older_than`` seconds to the archive table.
+
+    ``run_once`` archives in batches of ``batch_size`` until nothing is left;
+    ``start`` repeats it every ``interval`` seconds (0 disables the loop).
+    """
+
+    def __init__(self, older_than: float = 30 * 24 * 3600, batch_size: int = 1000, interval: float = 3600.0):
+        self.older_than = older_than
+        self.batch_size = batch_size
+        self.interval = interval
+        self.client = None
+        self._task: Optional[asyncio.Task] = None
+        self.archived_total = 0
+        self.runs = 0
+
+    async def run_once(self, client=None) -> int:
+        client = client or self.client
+        archived = 0
+        while True:
+            response = await client.rpc("archive_read_notifications", {
+                "p_older_than": f"{int(self.older_than)} seconds",
+                "p_batch_size": self.batch_size,
+            }).execute()
+            moved = response.data or 0
+            archived += moved
+            if moved < self.batch_size:
+                break
+        self.runs += 1
+        self.archived_total += archived
+        if archived:
+            logger.info("Archived %d read notifications", archived)
+        return archived
+
+    async def start(self, client):
+        self.client = client
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Notification archival failed; will retry")
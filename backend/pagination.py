@@ -0,0 +1,91 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+SortKey = Tuple[str, bool]
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    if not fields:
+        return list(allowed)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(unknown) or fields}")
+    return list(dict.fromkeys(requested))
+
+
+def quote_value(value: Any) -> str:
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_condition(order: Sequence[SortKey], values: Sequence[Any]) -> str:
+    """PostgREST ``or`` expression selecting rows strictly after ``values``."""
+    branches = []
+    for index, (column, desc) in enumerate(order):
+        terms = [f"{order[i][0]}.eq.{quote_value(values[i])}" for i in range(index)]
+        terms.append(f"{column}.{'lt' if desc else 'gt'}.{quote_value(values[index])}")
+        branches.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return ",".join(branches)
+
+
+class Page:
+    """Keyset-paginated, projected list query over one table.
+
+    ``order`` must end with a unique column so the ordering is total. Sort
+    columns are always selected so the next cursor can be built, and are
+    stripped from the response when they were not requested.
+    """
+
+    def __init__(self, fields: List[str], order: Sequence[SortKey], limit: Optional[int], cursor: Optional[str]):
+        self.fields = fields
+        self.order = list(order)
+        self.limit = limit
+        self.after = decode_cursor(cursor, len(self.order)) if cursor else None
+
+    @property
+    def select(self) -> str:
+        columns = list(self.fields)
+        columns += [column for column, _ in self.order if column not in columns]
+        return ", ".join(columns)
+
+    def apply(self, query):
+        if self.after is not None:
+            query = query.or_(keyset_condition(self.order, self.after))
+        for column, desc in self.order:
+            query = query.order(column, desc=desc)
+        if self.limit is not None:
+            query = query.limit(self.limit + 1)
+        return query
+
+    def response(self, rows: List[dict]) -> JSONResponse:
+        headers = {}
+        if self.limit is not None and len(rows) > self.limit:
+            rows = rows[:self.limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1][column] for column, _ in self.order])
+        extra = [column for column, _ in self.order if column not in self.fields]
+        if extra:
+            rows = [{field: row[field] for field in self.fields} for row in rows]
+        return JSONResponse(rows, headers=headers)
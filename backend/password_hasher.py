@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+from metrics import timed_call
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full and the caller should back off."""
+
+
+@lru_cache(maxsize=None)
+def _context(rounds: int):
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _load(rounds: int) -> None:
+    _context(rounds).handler("bcrypt").get_backend()
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool instead of the event loop.
+
+    At most ``max_pending`` operations may be queued or running at once;
+    further calls fail fast with ``HasherBusy``. ``verify`` also returns a
+    replacement hash when the stored one was made with a different cost.
+    ``on_timing`` is called with the queue wait and run time of each job.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 64, use_processes: bool = False, rounds: int = 12,
+                 on_timing: Optional[Callable[[float, float], None]] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.rounds = rounds
+        self.pending = 0
+        self.on_timing = on_timing
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HasherBusy()
+        self.pending += 1
+        try:
+            waited, ran, result = await asyncio.get_running_loop().run_in_executor(self.executor, timed_call, time.time(), fn, *args)
+        finally:
+            self.pending -= 1
+        if self.on_timing is not None:
+            self.on_timing(waited, ran)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._submit(_verify_and_update, password, hashed, self.rounds)
+
+    async def warm(self):
+        """Start every worker and load the bcrypt backend in it."""
+        await asyncio.gather(*(self._submit(_load, self.rounds) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
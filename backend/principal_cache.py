@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+PRINCIPAL_FIELDS = ("id", "full_name", "email", "role", "created_at", "institution_id")
+
+
+class PrincipalCache:
+    """Bounded TTL/LRU cache of authenticated principals keyed by JWT ``sub``.
+
+    Concurrent misses for the same user share a single in-flight load. Only
+    found users are cached; a missing row is re-checked on the next request.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0, trust_token_claims: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.trust_token_claims = trust_token_claims
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def claims_for(self, user: dict) -> dict:
+        if not self.trust_token_claims:
+            return {}
+        return {field: user[field] for field in PRINCIPAL_FIELDS if field != "id" and field in user}
+
+    def from_claims(self, payload: dict) -> Optional[dict]:
+        if not self.trust_token_claims:
+            return None
+        if any(field not in payload for field in PRINCIPAL_FIELDS if field != "id"):
+            return None
+        principal = {field: payload[field] for field in PRINCIPAL_FIELDS if field != "id"}
+        principal["id"] = payload["sub"]
+        return principal
+
+    def peek(self, user_id: str) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return principal
+
+    def put(self, user_id: str, principal: dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, user_id: str, loader: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        principal = self.peek(user_id)
+        if principal is not None:
+            self.hits += 1
+            return principal
+
+        pending = self._inflight.get(user_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            principal = await loader(user_id)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        else:
+            if principal is not None and self._inflight.get(user_id) is future:
+                self.put(user_id, principal)
+            future.set_result(principal)
+            return principal
+        finally:
+            if self._inflight.get(user_id) is future:
+                del self._inflight[user_id]
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+        self._inflight.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._inflight.clear()
@@ -0,0 +1,215 @@
+import ipaddress
+import json
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class Limit:
+    """A token bucket: ``burst`` requests at once, refilled at ``rate`` per second."""
+
+    __slots__ = ("rate", "burst")
+
+    def __init__(self, rate: float, burst: float):
+        if rate <= 0 or burst < 1:
+            raise ValueError("A rate limit needs a positive rate and a burst of at least 1")
+        self.rate = rate
+        self.burst = burst
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["Limit"]:
+        """Parse ``"10/minute"`` (bucket of 10, refilled over a minute) or ``"10/minute burst 20"``.
+
+        An empty spec or ``"off"`` disables the limit.
+        """
+        spec = spec.strip().lower()
+        if not spec or spec == "off":
+            return None
+        amount, separator, rest = spec.partition("/")
+        period, _, burst = rest.partition(" burst ")
+        if not separator or period.strip() not in PERIODS:
+            raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. 10/minute")
+        count = float(amount)
+        return cls(count / PERIODS[period.strip()], float(burst) if burst else count)
+
+
+class RateLimitBackend(ABC):
+    """Bucket state keyed by rule and client.
+
+    The memory backend limits each worker separately; a backend over a
+    shared store (e.g. a Redis script doing the same refill arithmetic)
+    implements ``take`` so limits hold across workers.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; return 0 when allowed, else seconds until they are available."""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = limit.burst
+            if len(self._buckets) >= self.maxsize:
+                self.prune(now)
+        else:
+            tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+        allowed = tokens >= cost
+        remaining = tokens - cost if allowed else tokens
+        self._buckets[key] = (remaining, now, now + (limit.burst - remaining) / limit.rate)
+        return 0.0 if allowed else (cost - tokens) / limit.rate
+
+    def prune(self, now: Optional[float] = None):
+        """Drop buckets that have refilled (they behave like new ones), then the oldest if still full."""
+        now = now if now is not None else time.monotonic()
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        while len(self._buckets) >= self.maxsize:
+            del self._buckets[next(iter(self._buckets))]
+
+
+class RateLimiter:
+    """Named limits checked against a backend.
+
+    ``check(rule, key)`` raises ``RateLimited`` once ``key`` (an IP, user
+    id or email) has used up its bucket for ``rule``. Unknown or disabled
+    rules always pass. Backend errors are logged and let the request
+    through rather than failing it.
+    """
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None, enabled: bool = True):
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self.enabled = enabled
+        self.rules: Dict[str, Limit] = {}
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    def add(self, rule: str, spec: str):
+        limit = Limit.parse(spec)
+        if limit is None:
+            self.rules.pop(rule, None)
+        else:
+            self.rules[rule] = limit
+
+    async def check(self, rule: str, key: Optional[str], cost: float = 1.0):
+        limit = self.rules.get(rule)
+        if limit is None or not self.enabled or not key:
+            return
+        try:
+            retry_after = await self.backend.take(f"{rule}:{key}", limit, cost)
+        except Exception:
+            self.errors += 1
+            logger.exception("Rate limit backend failed for rule %s", rule)
+            return
+        if retry_after:
+            self.limited += 1
+            raise RateLimited(retry_after)
+        self.allowed += 1
+
+    def metrics(self) -> dict:
+        metrics = {"allowed": self.allowed, "limited": self.limited, "errors": self.errors}
+        if isinstance(self.backend, MemoryRateLimitBackend):
+            metrics["buckets"] = len(self.backend)
+        return metrics
+
+
+def parse_networks(spec: str) -> Tuple[Network, ...]:
+    """Parse a comma-separated list of addresses or CIDR ranges, e.g. ``"10.0.0.0/8, 127.0.0.1"``."""
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+
+def _trusted(address: str, trusted_proxies: Sequence[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_address(scope, trusted_proxies: Sequence[Network] = ()) -> Optional[str]:
+    """The address per-IP limits are keyed on.
+
+    Requests from a trusted proxy are keyed on the right-most
+    ``X-Forwarded-For`` entry that is not itself a trusted proxy; entries
+    left of it come from the client and could be forged.
+    """
+    client = scope.get("client")
+    address = client[0] if client else None
+    if address is None or not trusted_proxies or not _trusted(address, trusted_proxies):
+        return address
+    forwarded = b",".join(value for name, value in scope.get("headers", []) if name == b"x-forwarded-for")
+    for hop in reversed(forwarded.decode("latin-1").split(",")):
+        hop = hop.strip()
+        if hop and not _trusted(hop, trusted_proxies):
+            return hop
+    return address
+
+
+def retry_after_header(retry_after: float) -> str:
+    return str(max(1, math.ceil(retry_after)))
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying per-route limits keyed by client IP.
+
+    ``routes`` maps ``"METHOD /path"`` to a rule name. Requests are
+    rejected before the body is read or the route runs, so a flood costs a
+    dict lookup and a bucket update. Other requests only pay the lookup.
+    The client address is the one the server resolved, unless it is one of
+    ``trusted_proxies``; see ``client_address``. Behind a proxy, either the
+    server must resolve ``X-Forwarded-For`` (serve.py's
+    FORWARDED_ALLOW_IPS) or the proxy must be listed here, or every client
+    shares the proxy's buckets.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, routes: Dict[str, str], detail: str = "Too many requests",
+                 trusted_proxies: Sequence[Network] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.routes = {tuple(route.split(" ", 1)): rule for route, rule in routes.items()}
+        self.detail = detail
+        self.trusted_proxies = tuple(trusted_proxies)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            rule = self.routes.get((scope["method"], scope["path"]))
+            if rule is not None:
+                try:
+                    await self.limiter.check(rule, client_address(scope, self.trusted_proxies))
+                except RateLimited as limited:
+                    body = json.dumps({"detail": self.detail}).encode("utf-8")
+                    await send({
+                        "type": "http.response.start",
+                        "status": 429,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            (b"retry-after", retry_after_header(limited.retry_after).encode()),
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": body})
+                    return
+        await self.app(scope, receive, send)
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from grading import WEIGHT_FIELDS, course_weights
+from metrics import timed_call
+
+logger = logging.getLogger(__name__)
+
+
+def load_pdf_stack():
+    """Import ReportLab, which is only needed once a report is rendered."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate
+
+    getSampleStyleSheet()
+    return SimpleDocTemplate
+
+
+def render_grades_pdf(course: dict, grades: List[dict]) -> bytes:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    title = Paragraph(f"<b>Reporte de Calificaciones</b>", styles['Title'])
+    elements.append(title)
+    elements.append(Spacer(1, 12))
+
+    course_info = Paragraph(f"<b>Curso:</b> {course['name']} ({course['code']})<br/><b>Período:</b> {course['academic_period']}", styles['Normal'])
+    elements.append(course_info)
+    elements.append(Spacer(1, 12))
+
+    headers = [f"Corte {number} ({weight * 100:g}%)" for number, weight in enumerate(course_weights(course), start=1)]
+    data = [['Estudiante', *headers, 'Nota Final']]
+
+    for grade in grades:
+        row = [
+            grade['student_name'],
+            str(grade['corte1']) if grade['corte1'] is not None else '-',
+            str(grade['corte2']) if grade['corte2'] is not None else '-',
+            str(grade['corte3']) if grade['corte3'] is not None else '-',
+            str(grade['final_grade']) if grade['final_grade'] is not None else '-'
+        ]
+        data.append(row)
+
+    table = Table(data)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+
+    elements.append(table)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def build_zip(files: List[Tuple[str, bytes]]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, content in files:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def report_key(course: dict, grade_count: int, last_updated: Optional[str]) -> str:
+    parts = [course["id"], course["name"], course["code"], course["academic_period"], str(grade_count), last_updated or ""]
+    parts += [str(course.get(field)) for field in WEIGHT_FIELDS]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class ReportCache:
+    """LRU cache of rendered reports bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        content = self._entries.get(key)
+        if content is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return content
+
+    def put(self, key: str, content: bytes):
+        if len(content) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = content
+        self.size += len(content)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class ReportRenderer:
+    """Renders grade reports on a worker pool and caches them by content key.
+
+    Grades are only loaded on a cache miss, and concurrent requests for the
+    same key share one load and render. ``on_timing`` is called with the
+    queue wait and run time of each render. A worker process that dies
+    breaks the whole pool; the pool is then replaced and the job retried
+    once.
+    """
+
+    def __init__(self, workers: Optional[int] = None, use_processes: bool = True, cache: Optional[ReportCache] = None,
+                 on_timing: Optional[Callable[[float, float], None]] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.cache = cache or ReportCache()
+        self.renders = 0
+        self.pool_restarts = 0
+        self.on_timing = on_timing
+        self._executor: Optional[Executor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reports")
+        return self._executor
+
+    async def run(self, fn, *args):
+        executor = self.executor
+        try:
+            waited, ran, result = await asyncio.get_running_loop().run_in_executor(executor, timed_call, time.time(), fn, *args)
+        except BrokenProcessPool:
+            # Concurrent jobs fail together; only the first one replaces the pool.
+            if self._executor is executor:
+                logger.warning("Report worker pool broke; starting a new one")
+                self.pool_restarts += 1
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            waited, ran, result = await asyncio.get_running_loop().run_in_executor(self.executor, timed_call, time.time(), fn, *args)
+        if self.on_timing is not None:
+            self.on_timing(waited, ran)
+        return result
+
+    async def render(self, key: str, course: dict, load_grades: Callable[[], Awaitable[List[dict]]]) -> bytes:
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            grades = await load_grades()
+            content = await self.run(render_grades_pdf, course, grades)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        else:
+            self.renders += 1
+            self.cache.put(key, content)
+            future.set_result(content)
+            return content
+        finally:
+            del self._inflight[key]
+
+    async def warm(self):
+        """Start every worker and load ReportLab in it before the first render."""
+        await asyncio.gather(*(self.run(load_pdf_stack) for _ in range(self.workers)))
+
+    async def zip(self, files: List[Tuple[str, bytes]]) -> bytes:
+        return await asyncio.to_thread(build_zip, files)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
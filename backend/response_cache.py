@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from pagination import NEXT_CURSOR_HEADER
+
+logger = logging.getLogger(__name__)
+
+CACHED_HEADERS = (NEXT_CURSOR_HEADER,)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+
+class CacheBackend(ABC):
+    """Storage for cached responses and per-resource version counters.
+
+    Versions must be shared by every worker serving the API; a backend
+    backed by a shared store (e.g. Redis) implements the same four methods.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, entry: dict, ttl: float):
+        ...
+
+    @abstractmethod
+    async def versions(self, scopes: Sequence[str]) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def bump(self, scopes: Sequence[str]):
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU with TTL. Only correct when the API runs one worker."""
+
+    def __init__(self, maxsize: int = 5000):
+        self.maxsize = maxsize
+        # Versions restart at zero with the process; the epoch keeps ETags
+        # issued before a restart from matching afterwards.
+        self.epoch = uuid.uuid4().hex[:8]
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: dict, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def versions(self, scopes: Sequence[str]) -> List[str]:
+        return [f"{self.epoch}.{self._versions.get(scope, 0)}" for scope in scopes]
+
+    async def bump(self, scopes: Sequence[str]):
+        for scope in scopes:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+
+
+class ResponseCache:
+    """Caches JSON responses keyed by request and validated by resource versions.
+
+    A response depends on a list of scopes (e.g. ``course:<id>``). Write
+    endpoints bump the scopes they change, which changes the weak ETag of
+    every response depending on them. A request whose ``If-None-Match``
+    matches the current ETag gets a 304 without touching the database.
+    ETags also change every ``ttl`` seconds, which bounds how long a bump
+    missed by this process's backend can go unnoticed.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: float = 300.0, enabled: bool = True):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bumps = 0
+
+    async def etag(self, key: str, scopes: Sequence[str]) -> str:
+        versions = await self.backend.versions(scopes)
+        # ETags roll over every ``ttl`` seconds, so a version bump that this
+        # process never saw (another worker, a script) cannot keep a stale
+        # response valid through 304s for longer than a cached body would be.
+        window = str(int(time.time() // self.ttl)) if self.ttl > 0 else ""
+        digest = hashlib.sha256("\x1f".join([key, *scopes, *versions, window]).encode("utf-8")).hexdigest()[:32]
+        return f'W/"{digest}"'
+
+    async def respond(self, request: Request, key: str, scopes: Sequence[str], loader: Callable[[], Awaitable[Response]]) -> Response:
+        if not self.enabled:
+            return await loader()
+
+        etag = await self.etag(key, scopes)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        entry = await self.backend.get(key)
+        if entry is not None and entry["etag"] == etag:
+            self.hits += 1
+            return Response(entry["body"], media_type="application/json", headers={**entry["headers"], **headers})
+
+        self.misses += 1
+        response = await loader()
+        if response.status_code == 200:
+            cached_headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+            await self.backend.set(key, {"etag": etag, "body": response.body, "headers": cached_headers}, self.ttl)
+            response.headers.update(headers)
+        return response
+
+    async def bump(self, *scopes: str):
+        self.bumps += 1
+        await self.backend.bump(scopes)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses + self.not_modified
+        metrics = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "bumps": self.bumps,
+            "hit_ratio": (self.hits + self.not_modified) / lookups if lookups else 0.0,
+        }
+        if isinstance(self.backend, MemoryCacheBackend):
+            metrics["entries"] = len(self.backend)
+        return metrics
+
+
+class ScopeWatcher:
+    """Bumps ``scope`` when data changed outside the API does.
+
+    Maintenance scripts write straight to the database, so no endpoint
+    bumps the scopes of what they change. Every ``interval`` seconds the
+    watcher runs ``load`` and bumps ``scope`` when the result differs from
+    the previous run.
+    """
+
+    def __init__(self, cache: ResponseCache, scope: str, load: Callable[[], Awaitable[object]], interval: float = 30.0):
+        self.cache = cache
+        self.scope = scope
+        self.load = load
+        self.interval = interval
+        self._state: object = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def check(self) -> bool:
+        state = await self.load()
+        changed = self._state is not None and state != self._state
+        self._state = state
+        if changed:
+            await self.cache.bump(self.scope)
+        return changed
+
+    async def start(self):
+        if self.interval > 0 and self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Failed to check %s for changes", self.scope)
@@ -0,0 +1,74 @@
+"""Run the API under uvicorn, in one worker process unless WEB_CONCURRENCY says otherwise.
+
+Each worker imports the app and completes the lifespan startup before it
+starts accepting connections on the shared socket. With ``PREWARM`` on
+(the default here) that startup also opens the database connections and
+starts the bcrypt and report worker pools, so the first requests a worker
+serves do not pay for them.
+
+One worker is the default. Response cache versions, rate limit buckets
+and the notification stream broker live in each worker's memory, and no
+shared backend for them ships yet. With WEB_CONCURRENCY > 1 the response
+cache is therefore turned off in every worker: a worker that never sees a
+write would keep answering 304 for the data it changed. Rate limits then
+apply per worker, and live notifications only reach streams held by the
+worker that created them (clients catch up with Last-Event-ID when they
+reconnect).
+
+Behind a reverse proxy, set FORWARDED_ALLOW_IPS to the proxy addresses so
+that the client address (and the per-IP rate limits keyed on it) comes
+from X-Forwarded-For instead of being the proxy's for every request. When
+the app runs under another server that does not resolve proxy headers, set
+RATE_LIMIT_TRUSTED_PROXIES to the same addresses instead.
+
+    WEB_CONCURRENCY=4 python serve.py    # four workers, no response cache
+"""
+import logging
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+os.environ.setdefault('PREWARM', 'true')
+
+import uvicorn  # noqa: E402
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', '8001'))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+KEEP_ALIVE_TIMEOUT = int(os.environ.get('KEEP_ALIVE_TIMEOUT', '5'))
+FORWARDED_ALLOW_IPS = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+logger = logging.getLogger(__name__)
+
+
+def configure_workers(workers: int):
+    """Turn off what is only correct within one worker; workers inherit this environment."""
+    if workers <= 1:
+        return
+    if os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true':
+        os.environ['RESPONSE_CACHE_ENABLED'] = 'false'
+        logger.warning("Running %d workers: the response cache keeps versions per worker, so it is turned off", workers)
+    logger.warning("Running %d workers: rate limits apply per worker and live notifications stay within one worker", workers)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    configure_workers(WEB_CONCURRENCY)
+    uvicorn.run(
+        "server:app",
+        app_dir=str(ROOT_DIR),
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        lifespan="on",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, Query, Request, UploadFile, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -6,30 +6,178 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
-import jwt
 import secrets
-from io import BytesIO
-from fastapi.responses import StreamingResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from database import supabase
+import hashlib
+import asyncio
+import math
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from database import db, is_check_violation, is_unique_violation, select_in
+from postgrest import APIError
+from notifications import NotificationArchiver, NotificationPipeline
+from notification_stream import LocalBroker, NotificationHub, format_heartbeat, format_sse
+from password_hasher import HasherBusy, PasswordHasher
+from reports import ReportCache, ReportRenderer, report_key
+from principal_cache import PRINCIPAL_FIELDS, PrincipalCache
+from tokens import DEFAULT_SECRET, REFRESH, ClaimsCache, ExpiredToken, InvalidToken, RevocationList, SigningKeys, TokenService
+from pagination import NEXT_CURSOR_HEADER, Page, keyset_condition, parse_fields
+from response_cache import MemoryCacheBackend, ResponseCache, ScopeWatcher, etag_matches
+from enrollment_import import InvalidImport, read_emails
+from gradebook import XLSX_MEDIA_TYPE, csv_chunks, read_grades, xlsx_chunks
+from grading import DEFAULT_GRADE_WEIGHTS, GRADE_FIELDS, WEIGHT_FIELDS, WEIGHT_SCALE, course_weights, weights_valid
+from rate_limit import MemoryRateLimitBackend, RateLimited, RateLimiter, RateLimitMiddleware, parse_networks, retry_after_header
+from metrics import DatabaseInstrumentation, LoopLagMonitor, MetricsMiddleware, Registry, families
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+metrics_registry = Registry()
+worker_queue_wait = metrics_registry.histogram("worker_queue_wait_seconds", "Time jobs wait for a worker pool slot", ("pool",))
+worker_run_time = metrics_registry.histogram("worker_run_seconds", "Time jobs run on a worker pool", ("pool",))
+
+def observe_worker(pool: str):
+    def observe(waited: float, ran: float):
+        worker_queue_wait.observe(waited, pool=pool)
+        worker_run_time.observe(ran, pool=pool)
+    return observe
+
+database_instrumentation = DatabaseInstrumentation(metrics_registry)
+db.on_connect(lambda client: database_instrumentation.install(client.session))
+loop_lag_monitor = LoopLagMonitor(metrics_registry, interval=float(os.environ.get('LOOP_LAG_INTERVAL', '0.5')))
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', '0'))
+# Bearer token scrapers must send to read /metrics; the endpoint answers 404 while it is unset.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '0')) or None,
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64')),
+    use_processes=os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread') == 'process',
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    on_timing=observe_worker("bcrypt"),
+)
 security = HTTPBearer()
-SECRET_KEY = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
+optional_security = HTTPBearer(auto_error=False)
+SECRET_KEY = os.environ.get('JWT_SECRET', DEFAULT_SECRET)
+JWT_ACCEPT_LEGACY = os.environ.get('JWT_ACCEPT_LEGACY', 'false').lower() == 'true'
+ACCESS_TOKEN_EXPIRE_MINUTES = float(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '15'))
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', '30'))
+
+token_service = TokenService(
+    keys=SigningKeys.parse(os.environ.get('JWT_KEYS', ''), os.environ.get('JWT_ACTIVE_KID'), SECRET_KEY, JWT_ACCEPT_LEGACY),
+    revocations=RevocationList(
+        capacity=int(os.environ.get('TOKEN_REVOCATION_CAPACITY', '100000')),
+        sync_interval=float(os.environ.get('TOKEN_REVOCATION_SYNC_INTERVAL', '5')),
+        retention=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+    ),
+    claims_cache=ClaimsCache(maxsize=int(os.environ.get('TOKEN_CLAIMS_CACHE_SIZE', '50000'))),
+    access_ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    refresh_ttl=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+)
+
+principal_cache = PrincipalCache(
+    maxsize=int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('PRINCIPAL_CACHE_TTL', '60')),
+    trust_token_claims=os.environ.get('PRINCIPAL_TRUST_TOKEN_CLAIMS', 'false').lower() == 'true',
+)
+
+NOTIFICATION_SPOOL_PATH = os.environ.get('NOTIFICATION_SPOOL_PATH', str(ROOT_DIR / 'notifications.spool'))
+notification_pipeline = NotificationPipeline(
+    batch_size=int(os.environ.get('NOTIFICATION_BATCH_SIZE', '200')),
+    flush_interval=float(os.environ.get('NOTIFICATION_FLUSH_INTERVAL', '0.5')),
+    coalesce_window=float(os.environ.get('NOTIFICATION_COALESCE_WINDOW', '60')),
+    spool_path=Path(NOTIFICATION_SPOOL_PATH) if NOTIFICATION_SPOOL_PATH else None,
+    max_pending=int(os.environ.get('NOTIFICATION_MAX_PENDING', '100000')),
+)
+
+notification_archiver = NotificationArchiver(
+    older_than=float(os.environ.get('NOTIFICATION_ARCHIVE_AFTER_DAYS', '30')) * 24 * 3600,
+    batch_size=int(os.environ.get('NOTIFICATION_ARCHIVE_BATCH_SIZE', '1000')),
+    interval=float(os.environ.get('NOTIFICATION_ARCHIVE_INTERVAL', '3600')),
+)
+MAX_BULK_READ_IDS = int(os.environ.get('MAX_BULK_READ_IDS', '200'))
+
+notification_hub = NotificationHub(
+    broker=LocalBroker(),
+    history_size=int(os.environ.get('NOTIFICATION_STREAM_HISTORY', '100')),
+    queue_size=int(os.environ.get('NOTIFICATION_STREAM_QUEUE_SIZE', '256')),
+    heartbeat_interval=float(os.environ.get('NOTIFICATION_STREAM_HEARTBEAT', '15')),
+)
+
+report_renderer = ReportRenderer(
+    workers=int(os.environ.get('REPORT_WORKERS', '0')) or None,
+    use_processes=os.environ.get('REPORT_EXECUTOR', 'process') == 'process',
+    cache=ReportCache(max_bytes=int(os.environ.get('REPORT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))),
+    on_timing=observe_worker("reports"),
+)
+response_cache = ResponseCache(
+    backend=MemoryCacheBackend(maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', '5000'))),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '300')),
+    enabled=os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true',
+)
+PERIODS_SCOPE = "periods"
+
+async def load_period_states():
+    response = await db.table("academic_periods").select("id, status").execute()
+    return {period["id"]: period["status"] for period in response.data}
 
-app = FastAPI()
+# manage_periods.py archives courses behind the API's back; listings that hide archived rows depend on this scope.
+period_watcher = ScopeWatcher(response_cache, PERIODS_SCOPE, load_period_states, interval=float(os.environ.get('PERIOD_SYNC_INTERVAL', '30')))
+rate_limiter = RateLimiter(
+    backend=MemoryRateLimitBackend(maxsize=int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))),
+    enabled=os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true',
+)
+rate_limiter.add("login_ip", os.environ.get('RATE_LIMIT_LOGIN_IP', '30/minute'))
+rate_limiter.add("login_email", os.environ.get('RATE_LIMIT_LOGIN_EMAIL', '10/minute'))
+rate_limiter.add("register_ip", os.environ.get('RATE_LIMIT_REGISTER_IP', '10/minute'))
+rate_limiter.add("forgot_password_ip", os.environ.get('RATE_LIMIT_FORGOT_PASSWORD_IP', '10/minute'))
+rate_limiter.add("forgot_password_email", os.environ.get('RATE_LIMIT_FORGOT_PASSWORD_EMAIL', '3/hour'))
+rate_limiter.add("reset_password_ip", os.environ.get('RATE_LIMIT_RESET_PASSWORD_IP', '10/minute'))
+rate_limiter.add("enroll_ip", os.environ.get('RATE_LIMIT_ENROLL_IP', '60/minute'))
+rate_limiter.add("enroll_user", os.environ.get('RATE_LIMIT_ENROLL_USER', '10/minute'))
+RATE_LIMITED_ROUTES = {
+    "POST /api/auth/login": "login_ip",
+    "POST /api/auth/register": "register_ip",
+    "POST /api/auth/forgot-password": "forgot_password_ip",
+    "POST /api/auth/reset-password": "reset_password_ip",
+    "POST /api/courses/enroll": "enroll_ip",
+}
+RATE_LIMIT_DETAIL = "Demasiadas solicitudes, intenta de nuevo más tarde"
+# Proxies whose X-Forwarded-For is trusted for per-IP limits when the server itself does not resolve it.
+RATE_LIMIT_TRUSTED_PROXIES = parse_networks(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', ''))
+AT_RISK_LIMIT = int(os.environ.get('AT_RISK_LIMIT', '50'))
+MAX_EXPORT_COURSES = int(os.environ.get('MAX_EXPORT_COURSES', '50'))
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))
+PREWARM = os.environ.get('PREWARM', 'false').lower() == 'true'
+DEFAULT_INSTITUTION_ID = os.environ.get('DEFAULT_INSTITUTION_ID', '00000000-0000-0000-0000-000000000001')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.connect()
+    if PREWARM:
+        await asyncio.gather(db.warm(), password_hasher.warm(), report_renderer.warm())
+    await notification_pipeline.start(db)
+    await notification_hub.start()
+    await notification_archiver.start(db)
+    await token_service.revocations.start(db)
+    await period_watcher.start()
+    await loop_lag_monitor.start()
+    yield
+    await loop_lag_monitor.stop()
+    await period_watcher.stop()
+    await token_service.revocations.stop()
+    await notification_archiver.stop()
+    await notification_hub.stop()
+    await notification_pipeline.stop()
+    password_hasher.shutdown()
+    report_renderer.shutdown()
+    await db.aclose()
+
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 class UserCreate(BaseModel):
@@ -49,12 +197,16 @@ class User(BaseModel):
     email: str
     role: str
     created_at: str
+    institution_id: Optional[str] = None
 
 class CourseCreate(BaseModel):
     name: str
     code: str
     description: str
     academic_period: str
+    weight_corte1: Optional[float] = None
+    weight_corte2: Optional[float] = None
+    weight_corte3: Optional[float] = None
 
 class Course(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -66,6 +218,22 @@ class Course(BaseModel):
     academic_period: str
     access_code: str
     created_at: str
+    weight_corte1: float = DEFAULT_GRADE_WEIGHTS[0]
+    weight_corte2: float = DEFAULT_GRADE_WEIGHTS[1]
+    weight_corte3: float = DEFAULT_GRADE_WEIGHTS[2]
+    institution_id: Optional[str] = None
+    period_id: Optional[str] = None
+    archived: bool = False
+
+COURSE_COLUMNS = ", ".join(Course.model_fields)
+
+class AcademicPeriod(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    code: str
+    status: str
+    starts_on: Optional[str] = None
+    ends_on: Optional[str] = None
 
 class EnrollmentCreate(BaseModel):
     access_code: str
@@ -76,6 +244,10 @@ class GradeInput(BaseModel):
     corte2: Optional[float] = None
     corte3: Optional[float] = None
 
+class BulkGradeInput(BaseModel):
+    course_id: str
+    grades: List[GradeInput]
+
 class Grade(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
@@ -89,6 +261,50 @@ class Grade(BaseModel):
     final_grade: Optional[float] = None
     last_updated: str
 
+class BulkGradeResult(BaseModel):
+    enrollment_id: str
+    success: bool
+    grade: Optional[Grade] = None
+    error: Optional[str] = None
+
+class BulkGradeResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[BulkGradeResult]
+
+class GradeImportResult(BaseModel):
+    line: int
+    enrollment_id: str
+    success: bool
+    error: Optional[str] = None
+
+class GradeImportResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[GradeImportResult]
+
+class GradeHistoryEntry(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    enrollment_id: str
+    course_id: str
+    student_id: str
+    changed_by: str
+    changed_at: str
+    changes: dict
+
+class EnrollmentImportResult(BaseModel):
+    line: int
+    email: str
+    success: bool
+    enrollment_id: Optional[str] = None
+    error: Optional[str] = None
+
+class EnrollmentImportResponse(BaseModel):
+    enrolled: int
+    failed: int
+    results: List[EnrollmentImportResult]
+
 class Notification(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
@@ -98,59 +314,163 @@ class Notification(BaseModel):
     read: bool
     created_at: str
 
+class MarkNotificationsRead(BaseModel):
+    ids: Optional[List[str]] = None
+
 class ForgotPasswordRequest(BaseModel):
     email: EmailStr
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+    all_devices: bool = False
+
 class ResetPasswordRequest(BaseModel):
     token: str
     new_password: str
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Servidor ocupado, intenta de nuevo en unos segundos",
+        headers={"Retry-After": os.environ.get('PASSWORD_HASH_RETRY_AFTER', '1')}
+    )
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def check_rate_limit(rule: str, key: Optional[str]):
+    try:
+        await rate_limiter.check(rule, key)
+    except RateLimited as limited:
+        raise HTTPException(status_code=429, detail=RATE_LIMIT_DETAIL, headers={"Retry-After": retry_after_header(limited.retry_after)})
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise hasher_busy()
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise hasher_busy()
 
 def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return token_service.access_token(data)
+
+def issue_tokens(user: dict) -> dict:
+    return {
+        **token_service.issue(user["id"], principal_cache.claims_for(user)),
+        "user": {
+            "id": user["id"],
+            "full_name": user["full_name"],
+            "email": user["email"],
+            "role": user["role"]
+        }
+    }
+
+async def load_principal(user_id: str) -> Optional[dict]:
+    response = await db.table("users").select(", ".join(PRINCIPAL_FIELDS)).eq("id", user_id).execute()
+    return response.data[0] if response.data else None
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate(credentials.credentials)
+
+async def get_stream_user(access_token: Optional[str] = None, credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    # EventSource cannot send headers, so streams also accept ?access_token=.
+    token = credentials.credentials if credentials is not None else access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await authenticate(token)
+
+def verify_token(token: str, token_type: str = "access") -> dict:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        response = supabase.table("users").select("id, full_name, email, role, created_at").eq("id", user_id).execute()
-        if not response.data:
-            raise HTTPException(status_code=401, detail="User not found")
-        return response.data[0]
-    except jwt.ExpiredSignatureError:
+        return token_service.verify(token, token_type)
+    except ExpiredToken:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except InvalidToken:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def calculate_final_grade(corte1: Optional[float], corte2: Optional[float], corte3: Optional[float]) -> Optional[float]:
-    if corte1 is not None and corte2 is not None and corte3 is not None:
-        final = (corte1 * 0.3) + (corte2 * 0.35) + (corte3 * 0.35)
-        return round(final, 2)
-    return None
-
-async def create_notification(user_id: str, message: str, notification_type: str):
-    notification = {
-        "id": str(uuid.uuid4()),
-        "user_id": user_id,
-        "message": message,
-        "type": notification_type,
-        "read": False,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    supabase.table("notifications").insert(notification).execute()
+async def authenticate(token: str) -> dict:
+    payload = verify_token(token)
+    principal = principal_cache.from_claims(payload)
+    if principal is None:
+        principal = await principal_cache.get(payload["sub"], load_principal)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return principal
+
+WEIGHTS_DETAIL = "Los pesos de los cortes deben estar entre 0 y 1, tener hasta tres decimales y sumar 1"
+WEIGHTS_CONSTRAINT = "courses_grade_weights_check"
+
+def course_weight_values(course_data: CourseCreate, current: Optional[dict] = None) -> dict:
+    values = [getattr(course_data, field) for field in WEIGHT_FIELDS]
+    if all(value is None for value in values):
+        return dict(zip(WEIGHT_FIELDS, course_weights(current or {})))
+    if any(value is None for value in values):
+        raise HTTPException(status_code=400, detail="Debe indicar el peso de los tres cortes")
+    if not weights_valid(values):
+        raise HTTPException(status_code=400, detail=WEIGHTS_DETAIL)
+    return {field: round(value * WEIGHT_SCALE) / WEIGHT_SCALE for field, value in zip(WEIGHT_FIELDS, values)}
+
+MAX_BULK_GRADES = int(os.environ.get('MAX_BULK_GRADES', '500'))
+MAX_ENROLLMENT_IMPORT_ROWS = int(os.environ.get('MAX_ENROLLMENT_IMPORT_ROWS', '2000'))
+MAX_ENROLLMENT_IMPORT_BYTES = int(os.environ.get('MAX_ENROLLMENT_IMPORT_BYTES', str(1024 * 1024)))
+MAX_GRADE_IMPORT_ROWS = int(os.environ.get('MAX_GRADE_IMPORT_ROWS', '5000'))
+MAX_GRADE_IMPORT_BYTES = int(os.environ.get('MAX_GRADE_IMPORT_BYTES', str(5 * 1024 * 1024)))
+GRADEBOOK_PAGE_SIZE = int(os.environ.get('GRADEBOOK_PAGE_SIZE', '500'))
+GRADEBOOK_COLUMNS = "id, enrollment_id, student_name, corte1, corte2, corte3, final_grade"
+ACCESS_CODE_ATTEMPTS = 3
+
+def list_page(model, fields: Optional[str], order, limit: Optional[int], cursor: Optional[str], default_limit: Optional[int] = None) -> Page:
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE if cursor else default_limit
+    return Page(parse_fields(fields, list(model.model_fields)), order, limit, cursor)
+
+def grade_values_valid(grade_data: GradeInput) -> bool:
+    for grade_value in [grade_data.corte1, grade_data.corte2, grade_data.corte3]:
+        if grade_value is not None and not (math.isfinite(grade_value) and 0 <= grade_value <= 5):
+            return False
+    return True
+
+async def create_notifications(user_ids: List[str], message: str, notification_type: str, coalesce_key: Optional[str] = None):
+    # Only notifications the pipeline kept are pushed; coalesced and dropped ones never reach the database.
+    for notification in await notification_pipeline.enqueue(user_ids, message, notification_type, coalesce_key):
+        await notification_hub.publish(notification["user_id"], "notification", notification, event_id=notification["id"])
+
+async def create_notification(user_id: str, message: str, notification_type: str, coalesce_key: Optional[str] = None):
+    await create_notifications([user_id], message, notification_type, coalesce_key)
+
+async def publish_grades(grades: List[dict]):
+    for grade in grades:
+        await notification_hub.publish(grade["student_id"], "grade", Grade(**grade).model_dump())
+
+def cache_key(request: Request, current_user: dict) -> str:
+    return f"{current_user['id']}:{request.url.path}?{request.url.query}"
+
+def json_response(content) -> JSONResponse:
+    return JSONResponse(jsonable_encoder(content))
+
+def in_period(query, period: str):
+    """Filter ``query`` to open periods (``current``), one period code, or nothing for ``all``."""
+    if period == "current":
+        return query.eq("archived", False)
+    if period == "all":
+        return query
+    return query.eq("academic_period", period)
+
+def ensure_open(course: dict):
+    if course.get("archived"):
+        raise HTTPException(status_code=400, detail="El período académico del curso está cerrado")
+
+async def open_period(current_user: dict, code: str) -> dict:
+    institution_id = current_user.get("institution_id") or DEFAULT_INSTITUTION_ID
+    response = await db.rpc("academic_period_for", {"p_institution_id": institution_id, "p_code": code}).execute()
+    period = response.data[0]
+    if period["status"] == "closed":
+        raise HTTPException(status_code=400, detail="El período académico está cerrado")
+    return period
 
 @api_router.get("/")
 async def root():
@@ -158,10 +478,6 @@ async def root():
 
 @api_router.post("/auth/register")
 async def register(user_data: UserCreate):
-    response = supabase.table("users").select("id").eq("email", user_data.email).execute()
-    if response.data:
-        raise HTTPException(status_code=400, detail="El correo ya está registrado")
-
     if user_data.role not in ["teacher", "student"]:
         raise HTTPException(status_code=400, detail="Rol inválido")
 
@@ -169,51 +485,43 @@ async def register(user_data: UserCreate):
         "id": str(uuid.uuid4()),
         "full_name": user_data.full_name,
         "email": user_data.email,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await hash_password(user_data.password),
         "role": user_data.role,
         "created_at": datetime.now(timezone.utc).isoformat(),
+        "institution_id": DEFAULT_INSTITUTION_ID,
         "reset_token": None,
         "reset_token_expiry": None
     }
 
-    supabase.table("users").insert(user).execute()
+    try:
+        await db.table("users").insert(user, returning="minimal").execute()
+    except APIError as error:
+        if is_unique_violation(error, "users_email_key"):
+            raise HTTPException(status_code=400, detail="El correo ya está registrado")
+        raise
 
-    access_token = create_access_token(data={"sub": user["id"]})
-
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "id": user["id"],
-            "full_name": user["full_name"],
-            "email": user["email"],
-            "role": user["role"]
-        }
-    }
+    return issue_tokens(user)
 
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
-    response = supabase.table("users").select("*").eq("email", credentials.email).execute()
-    if not response.data or not verify_password(credentials.password, response.data[0]["password_hash"]):
+    await check_rate_limit("login_email", credentials.email.lower())
+    response = await db.table("users").select("*").eq("email", credentials.email).execute()
+    if not response.data:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
     user = response.data[0]
-    access_token = create_access_token(data={"sub": user["id"]})
+    valid, new_hash = await verify_password(credentials.password, user["password_hash"])
+    if not valid:
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+    if new_hash:
+        await db.table("users").update({"password_hash": new_hash}).eq("id", user["id"]).execute()
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "id": user["id"],
-            "full_name": user["full_name"],
-            "email": user["email"],
-            "role": user["role"]
-        }
-    }
+    return issue_tokens(user)
 
 @api_router.post("/auth/forgot-password")
 async def forgot_password(request: ForgotPasswordRequest):
-    response = supabase.table("users").select("id").eq("email", request.email).execute()
+    await check_rate_limit("forgot_password_email", request.email.lower())
+    response = await db.table("users").select("id").eq("email", request.email).execute()
     if not response.data:
         return {"message": "Si el correo existe, recibirás un enlace de recuperación"}
 
@@ -221,7 +529,7 @@ async def forgot_password(request: ForgotPasswordRequest):
     reset_token = secrets.token_urlsafe(32)
     reset_token_expiry = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
 
-    supabase.table("users").update({
+    await db.table("users").update({
         "reset_token": reset_token,
         "reset_token_expiry": reset_token_expiry
     }).eq("id", user["id"]).execute()
@@ -233,7 +541,7 @@ async def forgot_password(request: ForgotPasswordRequest):
 
 @api_router.post("/auth/reset-password")
 async def reset_password(request: ResetPasswordRequest):
-    response = supabase.table("users").select("*").eq("reset_token", request.token).execute()
+    response = await db.table("users").select("*").eq("reset_token", request.token).execute()
     if not response.data:
         raise HTTPException(status_code=400, detail="Token inválido")
 
@@ -243,98 +551,169 @@ async def reset_password(request: ResetPasswordRequest):
         if expiry < datetime.now(timezone.utc):
             raise HTTPException(status_code=400, detail="Token expirado")
 
-    new_password_hash = hash_password(request.new_password)
-    supabase.table("users").update({
+    new_password_hash = await hash_password(request.new_password)
+    await db.table("users").update({
         "password_hash": new_password_hash,
         "reset_token": None,
         "reset_token_expiry": None
     }).eq("id", user["id"]).execute()
+    principal_cache.invalidate(user["id"])
+    await token_service.revocations.revoke_user(user["id"])
 
     return {"message": "Contraseña actualizada exitosamente"}
 
+@api_router.post("/auth/refresh")
+async def refresh_tokens(request: RefreshRequest):
+    payload = verify_token(request.refresh_token, REFRESH)
+    user = await principal_cache.get(payload["sub"], load_principal)
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    # Refresh tokens are single use: of concurrent requests presenting one, only the first gets a new pair.
+    if not await token_service.consume(payload):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return issue_tokens(user)
+
+@api_router.post("/auth/logout")
+async def logout(request: Optional[LogoutRequest] = None, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = verify_token(credentials.credentials)
+    await token_service.revoke(payload)
+    request = request or LogoutRequest()
+    if request.refresh_token:
+        try:
+            refresh = token_service.verify(request.refresh_token, REFRESH)
+        except InvalidToken:
+            refresh = None
+        if refresh is not None and refresh["sub"] == payload["sub"]:
+            await token_service.revoke(refresh)
+    if request.all_devices:
+        await token_service.revocations.revoke_user(payload["sub"])
+    return {"message": "Sesión cerrada"}
+
 @api_router.get("/auth/me", response_model=User)
 async def get_me(current_user: dict = Depends(get_current_user)):
     return User(**current_user)
 
+@api_router.get("/periods", response_model=List[AcademicPeriod])
+async def get_academic_periods(current_user: dict = Depends(get_current_user)):
+    institution_id = current_user.get("institution_id") or DEFAULT_INSTITUTION_ID
+    response = await db.table("academic_periods").select("id, code, status, starts_on, ends_on").eq("institution_id", institution_id).order("code", desc=True).execute()
+    return [AcademicPeriod(**period) for period in response.data]
+
 @api_router.post("/courses", response_model=Course)
 async def create_course(course_data: CourseCreate, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes pueden crear cursos")
 
-    response = supabase.table("courses").select("id").eq("code", course_data.code).execute()
-    if response.data:
-        raise HTTPException(status_code=400, detail="El código del curso ya existe")
-
-    course = {
-        "id": str(uuid.uuid4()),
-        "name": course_data.name,
-        "code": course_data.code,
-        "description": course_data.description,
-        "teacher_id": current_user["id"],
-        "academic_period": course_data.academic_period,
-        "access_code": secrets.token_urlsafe(8),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
+    weights = course_weight_values(course_data)
+    period = await open_period(current_user, course_data.academic_period)
+    for attempt in range(ACCESS_CODE_ATTEMPTS):
+        course = {
+            "id": str(uuid.uuid4()),
+            "name": course_data.name,
+            "code": course_data.code,
+            "description": course_data.description,
+            "teacher_id": current_user["id"],
+            "academic_period": course_data.academic_period,
+            "access_code": secrets.token_urlsafe(8),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "institution_id": period["institution_id"],
+            "period_id": period["id"],
+            **weights
+        }
 
-    supabase.table("courses").insert(course).execute()
-    return Course(**course)
+        try:
+            await db.table("courses").insert(course, returning="minimal").execute()
+        except APIError as error:
+            if is_unique_violation(error, "courses_period_id_code_key"):
+                raise HTTPException(status_code=400, detail="El código del curso ya existe")
+            if is_check_violation(error, WEIGHTS_CONSTRAINT):
+                raise HTTPException(status_code=400, detail=WEIGHTS_DETAIL)
+            if is_unique_violation(error, "courses_access_code_key") and attempt + 1 < ACCESS_CODE_ATTEMPTS:
+                continue
+            raise
+        await response_cache.bump(f"teacher_courses:{current_user['id']}")
+        return Course(**course)
 
 @api_router.get("/courses/teacher", response_model=List[Course])
-async def get_teacher_courses(current_user: dict = Depends(get_current_user)):
+async def get_teacher_courses(request: Request, period: str = "current", limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes")
 
-    response = supabase.table("courses").select("*").eq("teacher_id", current_user["id"]).execute()
-    return [Course(**course) for course in response.data]
+    page = list_page(Course, fields, [("created_at", False), ("id", False)], limit, cursor)
+
+    async def load():
+        response = await page.apply(in_period(db.table("courses").select(page.select).eq("teacher_id", current_user["id"]), period)).execute()
+        return page.response(response.data)
+
+    return await response_cache.respond(request, cache_key(request, current_user), [f"teacher_courses:{current_user['id']}", PERIODS_SCOPE], load)
 
 @api_router.get("/courses/student", response_model=List[Course])
-async def get_student_courses(current_user: dict = Depends(get_current_user)):
+async def get_student_courses(request: Request, period: str = "current", current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Solo estudiantes")
 
-    enrollments = supabase.table("enrollments").select("course_id").eq("student_id", current_user["id"]).execute()
-    if not enrollments.data:
-        return []
+    async def load():
+        response = await in_period(db.table("student_courses").select(COURSE_COLUMNS).eq("student_id", current_user["id"]), period).execute()
+        return json_response([Course(**course) for course in response.data])
 
-    course_ids = [e["course_id"] for e in enrollments.data]
-    response = supabase.table("courses").select("*").in_("id", course_ids).execute()
-    return [Course(**course) for course in response.data]
+    return await response_cache.respond(request, cache_key(request, current_user), [f"enrollments:{current_user['id']}", "courses", PERIODS_SCOPE], load)
 
 @api_router.get("/courses/{course_id}", response_model=Course)
-async def get_course(course_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("courses").select("*").eq("id", course_id).execute()
-    if not response.data:
-        raise HTTPException(status_code=404, detail="Curso no encontrado")
+async def get_course(course_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] == "teacher":
+        async def load_teacher_course():
+            response = await db.table("courses").select(COURSE_COLUMNS).eq("id", course_id).execute()
+            if not response.data:
+                raise HTTPException(status_code=404, detail="Curso no encontrado")
+            if response.data[0]["teacher_id"] != current_user["id"]:
+                raise HTTPException(status_code=403, detail="No autorizado")
+            return json_response(Course(**response.data[0]))
 
-    course = response.data[0]
+        return await response_cache.respond(request, cache_key(request, current_user), [f"course:{course_id}", PERIODS_SCOPE], load_teacher_course)
 
-    if current_user["role"] == "teacher":
-        if course["teacher_id"] != current_user["id"]:
-            raise HTTPException(status_code=403, detail="No autorizado")
-    else:
-        enrollment = supabase.table("enrollments").select("id").eq("student_id", current_user["id"]).eq("course_id", course_id).execute()
-        if not enrollment.data:
-            raise HTTPException(status_code=403, detail="No inscrito en este curso")
+    async def load_student_course():
+        response = await db.table("student_courses").select(COURSE_COLUMNS).eq("id", course_id).eq("student_id", current_user["id"]).execute()
+        if response.data:
+            return json_response(Course(**response.data[0]))
+
+        exists = await db.table("courses").select("id").eq("id", course_id).execute()
+        if not exists.data:
+            raise HTTPException(status_code=404, detail="Curso no encontrado")
+        raise HTTPException(status_code=403, detail="No inscrito en este curso")
 
-    return Course(**course)
+    return await response_cache.respond(request, cache_key(request, current_user), [f"course:{course_id}", f"enrollments:{current_user['id']}", PERIODS_SCOPE], load_student_course)
 
 @api_router.put("/courses/{course_id}", response_model=Course)
 async def update_course(course_id: str, course_data: CourseCreate, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes")
 
-    response = supabase.table("courses").select("*").eq("id", course_id).execute()
+    response = await db.table("courses").select("*").eq("id", course_id).execute()
     if not response.data or response.data[0]["teacher_id"] != current_user["id"]:
         raise HTTPException(status_code=404, detail="Curso no encontrado")
+    current = response.data[0]
+    ensure_open(current)
 
-    supabase.table("courses").update({
+    changes = {
         "name": course_data.name,
         "code": course_data.code,
         "description": course_data.description,
-        "academic_period": course_data.academic_period
-    }).eq("id", course_id).execute()
+        "academic_period": course_data.academic_period,
+        **course_weight_values(course_data, current)
+    }
+    if course_data.academic_period != current["academic_period"]:
+        changes["period_id"] = (await open_period(current_user, course_data.academic_period))["id"]
 
-    updated = supabase.table("courses").select("*").eq("id", course_id).execute()
+    try:
+        updated = await db.table("courses").update(changes).eq("id", course_id).execute()
+    except APIError as error:
+        if is_unique_violation(error, "courses_period_id_code_key"):
+            raise HTTPException(status_code=400, detail="El código del curso ya existe")
+        if is_check_violation(error, WEIGHTS_CONSTRAINT):
+            raise HTTPException(status_code=400, detail=WEIGHTS_DETAIL)
+        raise
+
+    await response_cache.bump(f"course:{course_id}", f"teacher_courses:{current_user['id']}", "courses", f"grades:{course_id}")
     return Course(**updated.data[0])
 
 @api_router.delete("/courses/{course_id}")
@@ -342,226 +721,610 @@ async def delete_course(course_id: str, current_user: dict = Depends(get_current
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes")
 
-    response = supabase.table("courses").select("*").eq("id", course_id).execute()
-    if not response.data or response.data[0]["teacher_id"] != current_user["id"]:
+    deleted = await db.rpc("delete_course", {"p_course_id": course_id, "p_teacher_id": current_user["id"]}).execute()
+    if not deleted.data:
         raise HTTPException(status_code=404, detail="Curso no encontrado")
 
-    supabase.table("grades").delete().eq("course_id", course_id).execute()
-    supabase.table("enrollments").delete().eq("course_id", course_id).execute()
-    supabase.table("courses").delete().eq("id", course_id).execute()
-
+    await response_cache.bump(f"course:{course_id}", f"teacher_courses:{current_user['id']}", "courses", f"grades:{course_id}")
     return {"message": "Curso eliminado"}
 
 @api_router.post("/courses/enroll")
 async def enroll_in_course(enrollment_data: EnrollmentCreate, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Solo estudiantes")
+    await check_rate_limit("enroll_user", current_user["id"])
 
-    response = supabase.table("courses").select("*").eq("access_code", enrollment_data.access_code).execute()
+    try:
+        response = await db.rpc("enroll_student", {"p_student_id": current_user["id"], "p_access_code": enrollment_data.access_code}).execute()
+    except APIError as error:
+        if is_unique_violation(error, "enrollments_student_id_course_id_key"):
+            raise HTTPException(status_code=400, detail="Ya estás inscrito en este curso")
+        raise
     if not response.data:
         raise HTTPException(status_code=404, detail="Código de acceso inválido")
 
     course = response.data[0]
-
-    existing = supabase.table("enrollments").select("id").eq("student_id", current_user["id"]).eq("course_id", course["id"]).execute()
-    if existing.data:
-        raise HTTPException(status_code=400, detail="Ya estás inscrito en este curso")
-
-    enrollment = {
-        "id": str(uuid.uuid4()),
-        "student_id": current_user["id"],
-        "course_id": course["id"],
-        "enrolled_at": datetime.now(timezone.utc).isoformat()
-    }
-    supabase.table("enrollments").insert(enrollment).execute()
-
-    grade = {
-        "id": str(uuid.uuid4()),
-        "enrollment_id": enrollment["id"],
-        "course_id": course["id"],
-        "student_id": current_user["id"],
-        "student_name": current_user["full_name"],
-        "corte1": None,
-        "corte2": None,
-        "corte3": None,
-        "final_grade": None,
-        "last_updated": datetime.now(timezone.utc).isoformat()
-    }
-    supabase.table("grades").insert(grade).execute()
-
+    await response_cache.bump(f"enrollments:{current_user['id']}", f"grades:{course['id']}")
     return {"message": "Inscripción exitosa", "course": Course(**course)}
 
-@api_router.get("/courses/{course_id}/students")
-async def get_course_students(course_id: str, current_user: dict = Depends(get_current_user)):
+@api_router.post("/courses/{course_id}/enrollments/import", response_model=EnrollmentImportResponse)
+async def import_enrollments(course_id: str, file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes")
 
-    response = supabase.table("courses").select("*").eq("id", course_id).execute()
-    if not response.data or response.data[0]["teacher_id"] != current_user["id"]:
+    course = await db.table("courses").select("id, teacher_id, archived").eq("id", course_id).execute()
+    if not course.data or course.data[0]["teacher_id"] != current_user["id"]:
         raise HTTPException(status_code=404, detail="Curso no encontrado")
+    ensure_open(course.data[0])
 
-    enrollments = supabase.table("enrollments").select("student_id").eq("course_id", course_id).execute()
-    if not enrollments.data:
-        return []
+    content = await file.read(MAX_ENROLLMENT_IMPORT_BYTES + 1)
+    if len(content) > MAX_ENROLLMENT_IMPORT_BYTES:
+        raise HTTPException(status_code=400, detail="El archivo es demasiado grande")
+    try:
+        rows = read_emails(content, MAX_ENROLLMENT_IMPORT_ROWS)
+    except InvalidImport as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if not rows:
+        raise HTTPException(status_code=400, detail="El archivo no contiene correos")
+
+    # Emails match ignoring case; an exact match wins over accounts that differ only in case.
+    users = await db.rpc("users_by_email", {"p_emails": list({email for _, email in rows if email})}).execute()
+    users_by_email = {}
+    for user in users.data:
+        users_by_email.setdefault(user["email"].lower(), []).append(user)
+
+    errors = {}
+    student_ids = {}
+    for index, (_, email) in enumerate(rows):
+        matches = users_by_email.get(email.lower(), [])
+        user = next((match for match in matches if match["email"] == email), matches[0] if len(matches) == 1 else None)
+        if not email:
+            errors[index] = "Fila sin correo"
+        elif email.lower() in student_ids:
+            errors[index] = "Correo repetido en el archivo"
+        elif user is None:
+            errors[index] = "Usuario no encontrado"
+        elif user["role"] != "student":
+            errors[index] = "El usuario no es estudiante"
+        else:
+            student_ids[email.lower()] = user["id"]
+
+    enrolled = {}
+    if student_ids:
+        response = await db.rpc("enroll_students", {"p_course_id": course_id, "p_student_ids": list(student_ids.values())}).execute()
+        enrolled = {row["student_id"]: row["enrollment_id"] for row in response.data or []}
+    if enrolled:
+        await response_cache.bump(f"grades:{course_id}", *(f"enrollments:{student_id}" for student_id in enrolled))
+
+    results = []
+    for index, (line, email) in enumerate(rows):
+        error = errors.get(index)
+        enrollment_id = enrolled.get(student_ids.get(email.lower())) if error is None else None
+        if error is None and enrollment_id is None:
+            error = "Ya está inscrito en este curso"
+        results.append(EnrollmentImportResult(line=line, email=email, success=error is None, enrollment_id=enrollment_id, error=error))
+
+    return EnrollmentImportResponse(enrolled=len(enrolled), failed=len(results) - len(enrolled), results=results)
+
+@api_router.get("/courses/{course_id}/students", response_model=List[User])
+async def get_course_students(course_id: str, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Solo docentes")
 
-    student_ids = [e["student_id"] for e in enrollments.data]
-    students = supabase.table("users").select("id, full_name, email, role, created_at").in_("id", student_ids).execute()
+    page = list_page(User, fields, [("full_name", False), ("id", False)], limit, cursor)
 
-    return students.data
+    students = await page.apply(db.table("course_roster").select(page.select).eq("course_id", course_id).eq("teacher_id", current_user["id"])).execute()
+    if not students.data:
+        response = await db.table("courses").select("id, teacher_id").eq("id", course_id).execute()
+        if not response.data or response.data[0]["teacher_id"] != current_user["id"]:
+            raise HTTPException(status_code=404, detail="Curso no encontrado")
+
+    return page.response(students.data)
 
 @api_router.post("/grades")
-async def create_or_update_grade(grade_data: GradeInput, background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
+async def create_or_update_grade(grade_data: GradeInput, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes")
 
-    for grade_value in [grade_data.corte1, grade_data.corte2, grade_data.corte3]:
-        if grade_value is not None and (grade_value < 0 or grade_value > 5):
-            raise HTTPException(status_code=400, detail="Las notas deben estar entre 0.0 y 5.0")
+    if not grade_values_valid(grade_data):
+        raise HTTPException(status_code=400, detail="Las notas deben estar entre 0.0 y 5.0")
 
-    enrollment = supabase.table("enrollments").select("*").eq("id", grade_data.enrollment_id).execute()
+    enrollment = await db.table("student_courses").select("id, name, teacher_id, student_id, archived").eq("enrollment_id", grade_data.enrollment_id).execute()
     if not enrollment.data:
         raise HTTPException(status_code=404, detail="Inscripción no encontrada")
-
-    course = supabase.table("courses").select("*").eq("id", enrollment.data[0]["course_id"]).execute()
-    if not course.data or course.data[0]["teacher_id"] != current_user["id"]:
+    course = enrollment.data[0]
+    if course["teacher_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="No autorizado")
+    ensure_open(course)
+
+    # save_grades reads the previous values and writes the history row in the same statement as the update.
+    saved = await db.rpc("save_grades", {
+        "p_course_id": course["id"],
+        "p_grades": [grade_data.model_dump(exclude_none=True)],
+        "p_changed_by": current_user["id"],
+    }).execute()
+    if not saved.data:
+        raise HTTPException(status_code=404, detail="Calificación no encontrada")
 
-    existing_grade = supabase.table("grades").select("*").eq("enrollment_id", grade_data.enrollment_id).execute()
+    grade = saved.data[0]
+    await response_cache.bump(f"grades:{course['id']}")
+    await publish_grades(saved.data)
+    await create_notification(
+        course["student_id"],
+        f"Nueva calificación registrada en {course['name']}",
+        "grade_update",
+        coalesce_key=f"grade_update:{course['id']}"
+    )
 
-    update_data = {"last_updated": datetime.now(timezone.utc).isoformat()}
-    if grade_data.corte1 is not None:
-        update_data["corte1"] = grade_data.corte1
-    if grade_data.corte2 is not None:
-        update_data["corte2"] = grade_data.corte2
-    if grade_data.corte3 is not None:
-        update_data["corte3"] = grade_data.corte3
+    return Grade(**grade)
+
+async def save_grades(course: dict, grades: List[GradeInput], current_user: dict) -> Tuple[dict, dict]:
+    """Validate ``grades`` and write the valid ones, with their history, in one statement.
+
+    Returns the saved grades by enrollment id and an error message by
+    index into ``grades`` for the rejected ones. Either every valid grade
+    is saved or none is.
+    """
+    errors = {}
+    inputs = {}
+    for index, grade_data in enumerate(grades):
+        if grade_data.enrollment_id in inputs:
+            errors[index] = "Inscripción repetida en la solicitud"
+        elif not grade_values_valid(grade_data):
+            errors[index] = "Las notas deben estar entre 0.0 y 5.0"
+        else:
+            inputs[grade_data.enrollment_id] = index
+
+    saved = {}
+    if inputs:
+        # Only submitted cortes are sent, so concurrent writes to the other cortes survive.
+        response = await db.rpc("save_grades", {
+            "p_course_id": course["id"],
+            "p_grades": [grades[index].model_dump(exclude_none=True) for index in inputs.values()],
+            "p_changed_by": current_user["id"],
+        }).execute()
+        saved = {grade["enrollment_id"]: grade for grade in response.data}
+        for enrollment_id, index in inputs.items():
+            if enrollment_id not in saved:
+                errors[index] = "Inscripción no encontrada en este curso"
+    if saved:
+        await response_cache.bump(f"grades:{course['id']}")
+        await publish_grades(list(saved.values()))
+        await create_notifications(
+            [grade["student_id"] for grade in saved.values()],
+            f"Nueva calificación registrada en {course['name']}",
+            "grade_update",
+            coalesce_key=f"grade_update:{course['id']}"
+        )
+    return saved, errors
+
+@api_router.post("/grades/bulk", response_model=BulkGradeResponse)
+async def bulk_upsert_grades(bulk_data: BulkGradeInput, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Solo docentes")
 
-    corte1 = grade_data.corte1 if grade_data.corte1 is not None else existing_grade.data[0].get("corte1")
-    corte2 = grade_data.corte2 if grade_data.corte2 is not None else existing_grade.data[0].get("corte2")
-    corte3 = grade_data.corte3 if grade_data.corte3 is not None else existing_grade.data[0].get("corte3")
+    if not bulk_data.grades:
+        raise HTTPException(status_code=400, detail="No se enviaron calificaciones")
+    if len(bulk_data.grades) > MAX_BULK_GRADES:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BULK_GRADES} calificaciones por solicitud")
 
-    final_grade = calculate_final_grade(corte1, corte2, corte3)
-    if final_grade is not None:
-        update_data["final_grade"] = final_grade
+    course = await db.table("courses").select("id, name, teacher_id, archived").eq("id", bulk_data.course_id).execute()
+    if not course.data or course.data[0]["teacher_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Curso no encontrado")
+    ensure_open(course.data[0])
 
-    supabase.table("grades").update(update_data).eq("enrollment_id", grade_data.enrollment_id).execute()
+    saved, errors = await save_grades(course.data[0], bulk_data.grades, current_user)
 
-    background_tasks.add_task(
-        create_notification,
-        enrollment.data[0]["student_id"],
-        f"Nueva calificación registrada en {course.data[0]['name']}",
-        "grade_update"
-    )
+    results = []
+    for index, grade_data in enumerate(bulk_data.grades):
+        error = errors.get(index)
+        if error is not None:
+            results.append(BulkGradeResult(enrollment_id=grade_data.enrollment_id, success=False, error=error))
+        else:
+            results.append(BulkGradeResult(enrollment_id=grade_data.enrollment_id, success=True, grade=Grade(**saved[grade_data.enrollment_id])))
 
-    updated_grade = supabase.table("grades").select("*").eq("enrollment_id", grade_data.enrollment_id).execute()
-    return Grade(**updated_grade.data[0])
+    return BulkGradeResponse(updated=len(saved), failed=len(errors), results=results)
 
-@api_router.get("/grades/course/{course_id}", response_model=List[Grade])
-async def get_course_grades(course_id: str, current_user: dict = Depends(get_current_user)):
+@api_router.post("/grades/import/{course_id}", response_model=GradeImportResponse)
+async def import_grades(course_id: str, file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes")
 
-    course = supabase.table("courses").select("*").eq("id", course_id).execute()
+    course = await db.table("courses").select("id, name, teacher_id, archived").eq("id", course_id).execute()
     if not course.data or course.data[0]["teacher_id"] != current_user["id"]:
         raise HTTPException(status_code=404, detail="Curso no encontrado")
+    ensure_open(course.data[0])
+
+    file.file.seek(0, os.SEEK_END)
+    if file.file.tell() > MAX_GRADE_IMPORT_BYTES:
+        raise HTTPException(status_code=400, detail="El archivo es demasiado grande")
+    file.file.seek(0)
+    try:
+        rows = await asyncio.to_thread(read_grades, file.file, file.filename or "", MAX_GRADE_IMPORT_ROWS)
+    except InvalidImport as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if not rows:
+        raise HTTPException(status_code=400, detail="El archivo no contiene calificaciones")
+
+    errors = {}
+    inputs, input_rows = [], []
+    for index, (_, enrollment_id, values, error) in enumerate(rows):
+        if error is None and not enrollment_id:
+            error = "Fila sin enrollment_id"
+        if error is not None:
+            errors[index] = error
+        elif any(value is not None for value in values.values()):
+            inputs.append(GradeInput(enrollment_id=enrollment_id, **values))
+            input_rows.append(index)
+
+    saved, save_errors = await save_grades(course.data[0], inputs, current_user) if inputs else ({}, {})
+    for position, error in save_errors.items():
+        errors[input_rows[position]] = error
+
+    results = [
+        GradeImportResult(line=line, enrollment_id=enrollment_id, success=index not in errors, error=errors.get(index))
+        for index, (line, enrollment_id, _, _) in enumerate(rows)
+    ]
+    return GradeImportResponse(updated=len(saved), failed=len(errors), results=results)
+
+@api_router.get("/grades/course/{course_id}", response_model=List[Grade])
+async def get_course_grades(course_id: str, request: Request, period: str = Query("current", pattern="^(current|all)$"), limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Solo docentes")
+
+    page = list_page(Grade, fields, [("student_name", False), ("id", False)], limit, cursor)
+
+    async def load():
+        course = await db.table("courses").select("id, teacher_id, archived").eq("id", course_id).execute()
+        if not course.data or course.data[0]["teacher_id"] != current_user["id"]:
+            raise HTTPException(status_code=404, detail="Curso no encontrado")
+        if period == "current" and course.data[0]["archived"]:
+            raise HTTPException(status_code=404, detail="El curso pertenece a un período cerrado")
 
-    grades = supabase.table("grades").select("*").eq("course_id", course_id).execute()
-    return [Grade(**grade) for grade in grades.data]
+        grades = await page.apply(in_period(db.table("grades").select(page.select).eq("course_id", course_id), period)).execute()
+        return page.response(grades.data)
+
+    return await response_cache.respond(request, cache_key(request, current_user), [f"grades:{course_id}", f"course:{course_id}", PERIODS_SCOPE], load)
 
 @api_router.get("/grades/student/course/{course_id}", response_model=Grade)
-async def get_student_grade(course_id: str, current_user: dict = Depends(get_current_user)):
+async def get_student_grade(course_id: str, request: Request, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Solo estudiantes")
 
-    grade = supabase.table("grades").select("*").eq("course_id", course_id).eq("student_id", current_user["id"]).execute()
+    async def load():
+        grade = await db.table("grades").select("*").eq("course_id", course_id).eq("student_id", current_user["id"]).execute()
 
-    if not grade.data:
-        raise HTTPException(status_code=404, detail="Calificación no encontrada")
+        if not grade.data:
+            raise HTTPException(status_code=404, detail="Calificación no encontrada")
+
+        return json_response(Grade(**grade.data[0]))
+
+    return await response_cache.respond(request, cache_key(request, current_user), [f"grades:{course_id}", f"enrollments:{current_user['id']}"], load)
+
+HISTORY_ORDER = [("changed_at", True), ("id", True)]
+
+def history_query(column: str, value: str, page: Page, since: Optional[datetime], until: Optional[datetime]):
+    query = db.table("grade_history").select(page.select).eq(column, value)
+    if since is not None:
+        query = query.gte("changed_at", as_utc(since).isoformat())
+    if until is not None:
+        query = query.lt("changed_at", as_utc(until).isoformat())
+    return page.apply(query)
+
+def as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+@api_router.get("/grades/history/course/{course_id}", response_model=List[GradeHistoryEntry])
+async def get_course_grade_history(course_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Solo docentes")
+
+    page = list_page(GradeHistoryEntry, fields, HISTORY_ORDER, limit, cursor, default_limit=DEFAULT_PAGE_SIZE)
+    course, history = await asyncio.gather(
+        db.table("courses").select("id, teacher_id").eq("id", course_id).execute(),
+        history_query("course_id", course_id, page, since, until).execute(),
+    )
+    if not course.data or course.data[0]["teacher_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Curso no encontrado")
+    return page.response(history.data)
+
+@api_router.get("/grades/history/enrollment/{enrollment_id}", response_model=List[GradeHistoryEntry])
+async def get_enrollment_grade_history(enrollment_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    page = list_page(GradeHistoryEntry, fields, HISTORY_ORDER, limit, cursor, default_limit=DEFAULT_PAGE_SIZE)
+    enrollment, history = await asyncio.gather(
+        db.table("student_courses").select("teacher_id, student_id").eq("enrollment_id", enrollment_id).execute(),
+        history_query("enrollment_id", enrollment_id, page, since, until).execute(),
+    )
+    if not enrollment.data or current_user["id"] not in (enrollment.data[0]["teacher_id"], enrollment.data[0]["student_id"]):
+        raise HTTPException(status_code=404, detail="Inscripción no encontrada")
+    return page.response(history.data)
+
+STATS_COLUMNS = ", ".join(("course_id", "name", "code", "academic_period", "teacher_id", *WEIGHT_FIELDS, *GRADE_FIELDS))
+
+def course_summary(row: dict, summary: dict) -> dict:
+    return {"course_id": row["course_id"], "name": row["name"], "code": row["code"], "academic_period": row["academic_period"], **summary}
+
+@api_router.get("/statistics/courses/{course_id}")
+async def get_course_statistics(course_id: str, request: Request, at_risk_limit: int = Query(AT_RISK_LIMIT, ge=0, le=MAX_PAGE_SIZE), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Solo docentes")
+    # course_stats brings in numpy, which only the statistics endpoints need.
+    from course_stats import at_risk_filter, projected_grade, stack_counts, summarize
+
+    async def load():
+        stats, at_risk = await asyncio.gather(
+            db.table("teacher_course_stats").select(STATS_COLUMNS).eq("course_id", course_id).execute(),
+            db.table("grades").select("enrollment_id, student_id, student_name, corte1, corte2, corte3, final_grade", count="exact")
+                .eq("course_id", course_id).or_(at_risk_filter())
+                .order("final_grade").order("student_name").limit(at_risk_limit).execute(),
+        )
+        if not stats.data or stats.data[0]["teacher_id"] != current_user["id"]:
+            raise HTTPException(status_code=404, detail="Curso no encontrado")
+
+        row = stats.data[0]
+        weights = course_weights(row)
+        students = [{**grade, "projected_grade": projected_grade(grade, weights)} for grade in at_risk.data]
+        summary = summarize(stack_counts([row]))[0]
+        return json_response({**course_summary(row, summary), "at_risk_count": at_risk.count or 0, "at_risk": students})
+
+    return await response_cache.respond(request, cache_key(request, current_user), [f"grades:{course_id}", f"course:{course_id}"], load)
+
+@api_router.get("/statistics/teacher")
+async def get_teacher_statistics(academic_period: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Solo docentes")
+    import numpy as np
+    from course_stats import group_by, stack_counts, summarize
 
-    return Grade(**grade.data[0])
+    query = db.table("teacher_course_stats").select(STATS_COLUMNS).eq("teacher_id", current_user["id"])
+    if academic_period is not None:
+        query = query.eq("academic_period", academic_period)
+    rows = (await query.order("academic_period").order("code").execute()).data
+
+    counts = stack_counts(rows)
+    periods = group_by([row["academic_period"] for row in rows], counts)
+    summaries = summarize(counts)
+    period_summaries = summarize(np.stack(list(periods.values()))) if periods else []
+    overall = summarize(counts.sum(axis=0, keepdims=True))[0]
+
+    return {
+        "courses": [course_summary(row, summary) for row, summary in zip(rows, summaries)],
+        "periods": [{"academic_period": period, **summary} for period, summary in zip(periods, period_summaries)],
+        "overall": overall,
+    }
+
+async def load_report_version(course: dict) -> str:
+    latest = await db.table("grades").select("last_updated", count="exact").eq("course_id", course["id"]).order("last_updated", desc=True).limit(1).execute()
+    return report_key(course, latest.count or 0, latest.data[0]["last_updated"] if latest.data else None)
+
+async def iter_course_grades(course_id: str, page_size: int = GRADEBOOK_PAGE_SIZE):
+    """Grades of a course in pages of ``page_size``, following a keyset on (student_name, id)."""
+    order = [("student_name", False), ("id", False)]
+    after = None
+    while True:
+        query = db.table("grades").select(GRADEBOOK_COLUMNS).eq("course_id", course_id)
+        if after is not None:
+            query = query.or_(keyset_condition(order, after))
+        for column, desc in order:
+            query = query.order(column, desc=desc)
+        rows = (await query.limit(page_size).execute()).data
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        after = [rows[-1][column] for column, _ in order]
 
 @api_router.get("/grades/export/{course_id}")
-async def export_grades_pdf(course_id: str, current_user: dict = Depends(get_current_user)):
+async def export_grades_pdf(course_id: str, request: Request, export_format: str = Query("pdf", alias="format", pattern="^(pdf|csv|xlsx)$"), current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Solo docentes")
 
-    course = supabase.table("courses").select("*").eq("id", course_id).execute()
+    course = await db.table("courses").select("*").eq("id", course_id).execute()
     if not course.data or course.data[0]["teacher_id"] != current_user["id"]:
         raise HTTPException(status_code=404, detail="Curso no encontrado")
 
-    grades = supabase.table("grades").select("*").eq("course_id", course_id).execute()
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    title = Paragraph(f"<b>Reporte de Calificaciones</b>", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-
-    course_info = Paragraph(f"<b>Curso:</b> {course.data[0]['name']} ({course.data[0]['code']})<br/><b>Período:</b> {course.data[0]['academic_period']}", styles['Normal'])
-    elements.append(course_info)
-    elements.append(Spacer(1, 12))
-
-    data = [['Estudiante', 'Corte 1 (30%)', 'Corte 2 (35%)', 'Corte 3 (35%)', 'Nota Final']]
-
-    for grade in grades.data:
-        row = [
-            grade['student_name'],
-            str(grade['corte1']) if grade['corte1'] is not None else '-',
-            str(grade['corte2']) if grade['corte2'] is not None else '-',
-            str(grade['corte3']) if grade['corte3'] is not None else '-',
-            str(grade['final_grade']) if grade['final_grade'] is not None else '-'
-        ]
-        data.append(row)
-
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-
-    elements.append(table)
-    doc.build(elements)
-
-    buffer.seek(0)
-    return StreamingResponse(
-        buffer,
+    if export_format != "pdf":
+        chunks = csv_chunks if export_format == "csv" else xlsx_chunks
+        return StreamingResponse(
+            chunks(iter_course_grades(course_id)),
+            media_type="text/csv; charset=utf-8" if export_format == "csv" else XLSX_MEDIA_TYPE,
+            headers={"Content-Disposition": f"attachment; filename=calificaciones_{course.data[0]['code']}.{export_format}"}
+        )
+
+    key = await load_report_version(course.data[0])
+    etag = f'"{key}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    async def load_grades():
+        grades = await db.table("grades").select("*").eq("course_id", course_id).execute()
+        return grades.data
+
+    content = await report_renderer.render(key, course.data[0], load_grades)
+
+    return Response(
+        content,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=calificaciones_{course.data[0]['code']}.pdf"}
+        headers={
+            "Content-Disposition": f"attachment; filename=calificaciones_{course.data[0]['code']}.pdf",
+            "ETag": etag,
+            "Cache-Control": "private, no-cache"
+        }
+    )
+
+@api_router.get("/grades/export")
+async def export_grades_zip(request: Request, course_ids: List[str] = Query(..., alias="course_id"), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Solo docentes")
+
+    course_ids = list(dict.fromkeys(course_ids))
+    if len(course_ids) > MAX_EXPORT_COURSES:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_EXPORT_COURSES} cursos por exportación")
+
+    courses = await select_in(lambda chunk: db.table("courses").select("*").in_("id", chunk).eq("teacher_id", current_user["id"]), course_ids)
+    if len(courses) != len(course_ids):
+        raise HTTPException(status_code=404, detail="Curso no encontrado")
+
+    grades = await select_in(lambda chunk: db.table("grades").select("*").in_("course_id", chunk), course_ids)
+    grades_by_course = {course_id: [] for course_id in course_ids}
+    for grade in grades:
+        grades_by_course[grade["course_id"]].append(grade)
+
+    courses_by_id = {course["id"]: course for course in courses}
+    keys = {}
+    for course_id in course_ids:
+        course_grades = grades_by_course[course_id]
+        last_updated = max((grade["last_updated"] for grade in course_grades), default=None)
+        keys[course_id] = report_key(courses_by_id[course_id], len(course_grades), last_updated)
+
+    etag = '"' + hashlib.sha256("".join(keys[course_id] for course_id in course_ids).encode("utf-8")).hexdigest()[:32] + '"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    def loader(course_grades):
+        async def load_grades():
+            return course_grades
+        return load_grades
+
+    contents = await asyncio.gather(*(
+        report_renderer.render(keys[course_id], courses_by_id[course_id], loader(grades_by_course[course_id]))
+        for course_id in course_ids
+    ))
+    archive = await report_renderer.zip([
+        (f"calificaciones_{courses_by_id[course_id]['code']}.pdf", content)
+        for course_id, content in zip(course_ids, contents)
+    ])
+
+    return Response(
+        archive,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": "attachment; filename=calificaciones.zip",
+            "ETag": etag,
+            "Cache-Control": "private, no-cache"
+        }
     )
 
 @api_router.get("/notifications", response_model=List[Notification])
-async def get_notifications(current_user: dict = Depends(get_current_user)):
-    notifications = supabase.table("notifications").select("*").eq("user_id", current_user["id"]).order("created_at", desc=True).limit(100).execute()
-    return [Notification(**notif) for notif in notifications.data]
+async def get_notifications(limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    page = list_page(Notification, fields, [("created_at", True), ("id", True)], limit, cursor, default_limit=DEFAULT_PAGE_SIZE)
+    notifications = await page.apply(db.table("notifications").select(page.select).eq("user_id", current_user["id"])).execute()
+    return page.response(notifications.data)
+
+async def load_notifications_after(user_id: str, last_event_id: str) -> Optional[List[dict]]:
+    last_seen = await db.table("notifications").select("created_at").eq("id", last_event_id).eq("user_id", user_id).execute()
+    if not last_seen.data:
+        return None
+    created_at = last_seen.data[0]["created_at"]
+    missed = await db.table("notifications").select("*").eq("user_id", user_id).gt("created_at", created_at).order("created_at").order("id").limit(MAX_PAGE_SIZE).execute()
+    return [{"id": notification["id"], "event": "notification", "data": notification} for notification in missed.data]
+
+@api_router.get("/notifications/stream")
+async def stream_notifications(request: Request, last_event_id: Optional[str] = None, current_user: dict = Depends(get_stream_user)):
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    user_id = current_user["id"]
+
+    backlog = []
+    if last_event_id and notification_hub.replay(user_id, last_event_id) is None:
+        subscription = notification_hub.subscribe(user_id)
+        missed = await load_notifications_after(user_id, last_event_id)
+        if missed is None:
+            backlog = [{"id": last_event_id, "event": "resync", "data": {}}]
+        else:
+            backlog = missed
+    else:
+        subscription = notification_hub.subscribe(user_id, last_event_id)
+
+    async def events():
+        try:
+            sent = {event["id"] for event in backlog}
+            for event in backlog:
+                yield format_sse(event)
+            yield format_heartbeat()
+            while True:
+                try:
+                    event = await subscription.next(notification_hub.heartbeat_interval)
+                except EOFError:
+                    break
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    yield format_heartbeat()
+                elif event["id"] not in sent:
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@api_router.get("/notifications/unread-count")
+async def get_unread_count(current_user: dict = Depends(get_current_user)):
+    counter = await db.table("notification_counters").select("unread").eq("user_id", current_user["id"]).execute()
+    return {"unread": counter.data[0]["unread"] if counter.data else 0}
+
+@api_router.put("/notifications/read")
+async def mark_notifications_read(request: MarkNotificationsRead, current_user: dict = Depends(get_current_user)):
+    if request.ids is not None and not request.ids:
+        raise HTTPException(status_code=400, detail="No se enviaron notificaciones")
+    if request.ids is not None and len(request.ids) > MAX_BULK_READ_IDS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BULK_READ_IDS} notificaciones por solicitud")
+
+    ids = list(dict.fromkeys(request.ids)) if request.ids is not None else None
+    result = await db.rpc("mark_notifications_read", {"p_user_id": current_user["id"], "p_ids": ids}).execute()
+    return {"updated": result.data or 0}
 
 @api_router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: dict = Depends(get_current_user)):
-    result = supabase.table("notifications").update({"read": True}).eq("id", notification_id).eq("user_id", current_user["id"]).execute()
+    result = await db.table("notifications").update({"read": True}).eq("id", notification_id).eq("user_id", current_user["id"]).execute()
 
     if not result.data:
         raise HTTPException(status_code=404, detail="Notificación no encontrada")
 
     return {"message": "Notificación marcada como leída"}
 
+def collect_component_metrics():
+    yield from families("notification_pipeline", "Notification write pipeline", notification_pipeline.metrics(),
+                        counters=("enqueued_total", "coalesced_total", "flushed_total", "flush_count", "flush_failures", "dead_lettered_total", "dropped_total", "flush_seconds_total"))
+    yield from families("notification_stream", "Notification push streams", notification_hub.metrics(),
+                        counters=("connections_total", "published_total", "delivered_total", "dropped_total", "fanout_count", "fanout_seconds_total"))
+    yield from families("response_cache", "Response cache", response_cache.metrics(), counters=("hits", "misses", "not_modified", "bumps"))
+    yield from families("tokens", "Token verification", token_service.metrics(),
+                        counters=("claims_cache_hits", "claims_cache_misses", "revocation_filter_hits", "revocation_false_positives"))
+    yield from families("rate_limit", "Rate limiting", rate_limiter.metrics(), counters=("allowed", "limited", "errors"))
+    yield from families("principal_cache", "Principal cache", {"hits": principal_cache.hits, "misses": principal_cache.misses}, counters=("hits", "misses"))
+    yield from families("report_cache", "Report cache", {
+        "hits": report_renderer.cache.hits,
+        "misses": report_renderer.cache.misses,
+        "bytes": report_renderer.cache.size,
+        "renders": report_renderer.renders,
+        "pool_restarts": report_renderer.pool_restarts,
+    }, counters=("hits", "misses", "renders", "pool_restarts"))
+    yield from families("password_hasher", "Password hashing pool", {"pending": password_hasher.pending})
+
+metrics_registry.register_collector(collect_component_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    if not METRICS_TOKEN or credentials is None or not secrets.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router)
 
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, routes=RATE_LIMITED_ROUTES, detail=RATE_LIMIT_DETAIL,
+                   trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Retry-After"],
 )
 
+app.add_middleware(MetricsMiddleware, registry=metrics_registry, slow_request_seconds=SLOW_REQUEST_SECONDS)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
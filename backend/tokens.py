@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+ACCESS = "access"
+REFRESH = "refresh"
+SYNC_OVERLAP_SECONDS = 30
+DEFAULT_SECRET = "your-secret-key-change-in-production"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+class SigningKeys:
+    """HMAC keys identified by ``kid``; new tokens are signed with the active key.
+
+    Rotating means adding a key, making it active and, once tokens signed
+    with the previous key have expired, removing that one. Tokens without a
+    ``kid`` (issued before rotation existed) are only accepted when a
+    ``legacy_secret`` is given, and are checked against it.
+    """
+
+    def __init__(self, keys: Dict[str, str], active_kid: str, legacy_secret: Optional[str] = None):
+        if active_kid not in keys:
+            raise ValueError(f"Active signing key {active_kid!r} is not configured")
+        self.keys = dict(keys)
+        self.active_kid = active_kid
+        self.legacy_secret = legacy_secret
+
+    @classmethod
+    def parse(cls, spec: str, active_kid: Optional[str], legacy_secret: Optional[str], accept_legacy: bool = False) -> "SigningKeys":
+        """Build from ``"kid1:secret1,kid2:secret2"``, falling back to the legacy secret alone.
+
+        Kid-less tokens are accepted only with ``accept_legacy``, which needs
+        a legacy secret other than the placeholder default.
+        """
+        if accept_legacy and (not legacy_secret or legacy_secret == DEFAULT_SECRET):
+            raise ValueError("JWT_ACCEPT_LEGACY needs JWT_SECRET set to the secret legacy tokens were signed with")
+        keys = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            kid, separator, secret = item.partition(":")
+            if not separator or not kid or not secret:
+                raise ValueError("JWT_KEYS must look like kid1:secret1,kid2:secret2")
+            keys[kid] = secret
+        if not keys:
+            keys = {"default": legacy_secret}
+        return cls(keys, active_kid or next(iter(keys)), legacy_secret if accept_legacy else None)
+
+    @property
+    def active_secret(self) -> str:
+        return self.keys[self.active_kid]
+
+    def secret_for(self, kid: Optional[str]) -> str:
+        if kid is None:
+            if self.legacy_secret is None:
+                raise InvalidToken("Token without signing key id")
+            return self.legacy_secret
+        secret = self.keys.get(kid)
+        if secret is None:
+            raise InvalidToken("Unknown signing key")
+        return secret
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """Revoked token ids and per-user cut-offs, checked without a database hit.
+
+    Lookups go through a Bloom filter first, so the common case (a token
+    that was never revoked) costs a few hashes; only filter hits consult the
+    exact set. Entries are kept until the token would have expired anyway.
+    Revocations are written to the database and every worker pulls new ones
+    every ``sync_interval`` seconds. ``retention`` is the longest token
+    lifetime; per-user cut-offs older than that no longer match any token.
+    """
+
+    def __init__(self, capacity: int = 100000, sync_interval: float = 5.0, retention: float = 30 * 24 * 3600):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self.retention = retention
+        self._revoked: Dict[str, float] = {}
+        self._users: Dict[str, float] = {}
+        self._filter = BloomFilter(capacity)
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+        self._synced_at: Optional[str] = None
+        self.filter_hits = 0
+        self.false_positives = 0
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def _add(self, jti: str, expires_at: float):
+        self._revoked[jti] = expires_at
+        self._filter.add(jti)
+        if len(self._revoked) > self.capacity:
+            self.prune()
+
+    def prune(self):
+        """Forget expired entries and rebuild the filter, which cannot delete."""
+        now = time.time()
+        self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+        self._users = {user_id: revoked_before for user_id, revoked_before in self._users.items() if revoked_before > now - self.retention}
+        self.capacity = max(self.capacity, len(self._revoked) * 2)
+        self._filter = BloomFilter(self.capacity)
+        for jti in self._revoked:
+            self._filter.add(jti)
+
+    def is_revoked(self, payload: dict) -> bool:
+        revoked_before = self._users.get(payload.get("sub"))
+        if revoked_before is not None and payload.get("iat", 0) < revoked_before:
+            return True
+        jti = payload.get("jti")
+        if jti is None or jti not in self._filter:
+            return False
+        self.filter_hits += 1
+        if jti in self._revoked:
+            return True
+        self.false_positives += 1
+        return False
+
+    async def revoke(self, jti: str, expires_at: float):
+        self._add(jti, expires_at)
+        if self._client is not None:
+            await self._client.rpc("revoke_token", {
+                "p_jti": jti,
+                "p_expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+            }).execute()
+
+    async def consume(self, jti: str, expires_at: float) -> bool:
+        """Revoke ``jti`` for single use; False if it was already revoked, here or by any other worker.
+
+        The database insert is the arbiter: of concurrent attempts, only the
+        one whose ``consume_token`` call inserts the row gets True.
+        """
+        if jti in self._revoked:
+            return False
+        self._add(jti, expires_at)
+        if self._client is None:
+            return True
+        response = await self._client.rpc("consume_token", {
+            "p_jti": jti,
+            "p_expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+        }).execute()
+        return response.data is True
+
+    async def revoke_user(self, user_id: str, revoked_before: Optional[float] = None):
+        """Revoke every token of ``user_id`` issued before ``revoked_before`` (now by default)."""
+        revoked_before = revoked_before or time.time()
+        self._users[user_id] = max(self._users.get(user_id, 0), revoked_before)
+        if self._client is not None:
+            await self._client.rpc("revoke_user_tokens", {
+                "p_user_id": user_id,
+                "p_revoked_before": datetime.fromtimestamp(revoked_before, timezone.utc).isoformat(),
+            }).execute()
+
+    async def start(self, client):
+        self._client = client
+        await self.sync()
+        if self.sync_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._client = None
+
+    async def sync(self):
+        started_at = datetime.now(timezone.utc)
+        tokens = self._client.table("revoked_tokens").select("jti, expires_at").gt("expires_at", started_at.isoformat())
+        users = self._client.table("user_token_revocations").select("user_id, revoked_before")
+        if self._synced_at is not None:
+            tokens = tokens.gte("revoked_at", self._synced_at)
+            users = users.gte("revoked_at", self._synced_at)
+        tokens, users = await asyncio.gather(tokens.execute(), users.execute())
+        for row in tokens.data:
+            self._add(row["jti"], datetime.fromisoformat(row["expires_at"]).timestamp())
+        for row in users.data:
+            revoked_before = datetime.fromisoformat(row["revoked_before"]).timestamp()
+            self._users[row["user_id"]] = max(self._users.get(row["user_id"], 0), revoked_before)
+        # Overlap the next window so rows committed late or stamped by a skewed clock are not missed.
+        self._synced_at = (started_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)).isoformat()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Failed to sync revoked tokens")
+
+
+class ClaimsCache:
+    """Verified claims per token string, kept until the token expires."""
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[dict]:
+        payload = self._entries.get(token)
+        if payload is None:
+            self.misses += 1
+            return None
+        if payload["exp"] <= time.time():
+            del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return payload
+
+    def put(self, token: str, payload: dict):
+        self._entries[token] = payload
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class TokenService:
+    """Issues and verifies short-lived access tokens and longer-lived refresh tokens."""
+
+    def __init__(self, keys: SigningKeys, revocations: RevocationList, claims_cache: ClaimsCache,
+                 access_ttl: float = 900, refresh_ttl: float = 30 * 24 * 3600):
+        self.keys = keys
+        self.revocations = revocations
+        self.claims_cache = claims_cache
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+
+    def _encode(self, claims: dict, token_type: str, ttl: float) -> str:
+        # Sub-second ``iat`` keeps a token issued right after a per-user revocation valid.
+        now = time.time()
+        payload = {**claims, "typ": token_type, "jti": uuid.uuid4().hex, "iat": now, "exp": int(now + ttl)}
+        return jwt.encode(payload, self.keys.active_secret, algorithm=ALGORITHM, headers={"kid": self.keys.active_kid})
+
+    def access_token(self, claims: dict) -> str:
+        return self._encode(claims, ACCESS, self.access_ttl)
+
+    def issue(self, user_id: str, claims: Optional[dict] = None) -> dict:
+        return {
+            "access_token": self.access_token({"sub": user_id, **(claims or {})}),
+            "refresh_token": self._encode({"sub": user_id}, REFRESH, self.refresh_ttl),
+            "token_type": "bearer",
+            "expires_in": int(self.access_ttl),
+        }
+
+    def decode(self, token: str) -> dict:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            return jwt.decode(token, self.keys.secret_for(kid), algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
+        except jwt.ExpiredSignatureError:
+            raise ExpiredToken("Token expired")
+        except jwt.InvalidTokenError:
+            raise InvalidToken("Invalid token")
+
+    def verify(self, token: str, token_type: str = ACCESS) -> dict:
+        payload = self.claims_cache.get(token)
+        if payload is None:
+            payload = self.decode(token)
+            self.claims_cache.put(token, payload)
+        # Tokens issued before token types existed are access tokens.
+        if payload.get("typ", ACCESS) != token_type:
+            raise InvalidToken("Invalid token")
+        if self.revocations.is_revoked(payload):
+            raise InvalidToken("Token revoked")
+        return payload
+
+    async def revoke(self, payload: dict):
+        if payload.get("jti"):
+            await self.revocations.revoke(payload["jti"], payload["exp"])
+
+    async def consume(self, payload: dict) -> bool:
+        """Revoke a single-use token; False when it had already been used."""
+        return bool(payload.get("jti")) and await self.revocations.consume(payload["jti"], payload["exp"])
+
+    def metrics(self) -> dict:
+        return {
+            "claims_cache_hits": self.claims_cache.hits,
+            "claims_cache_misses": self.claims_cache.misses,
+            "claims_cache_entries": len(self.claims_cache),
+            "revoked_tokens": len(self.revocations),
+            "revocation_filter_hits": self.revocations.filter_hits,
+            "revocation_false_positives": self.revocations.false_positives,
+        }
@@ -12,12 +12,57 @@ import StudentDashboard from "@/pages/StudentDashboard";
 import { Toaster } from "@/components/ui/sonner";
 
 const BACKEND_URL = 'https://axx-backend-production.up.railway.app';
-const API = `${BACKEND_URL}/api`;
+export const API = `${BACKEND_URL}/api`;
 
 export const api = axios.create({
   baseURL: API,
 });
 
+export const storeSession = ({ access_token, refresh_token }) => {
+  localStorage.setItem("token", access_token);
+  localStorage.setItem("refreshToken", refresh_token);
+};
+
+export const clearSession = () => {
+  localStorage.removeItem("token");
+  localStorage.removeItem("refreshToken");
+};
+
+// Concurrent 401s share one refresh; refresh tokens are single use.
+let refreshing = null;
+
+export const refreshSession = () => {
+  const refreshToken = localStorage.getItem("refreshToken");
+  if (!refreshToken) {
+    return Promise.reject(new Error("No refresh token"));
+  }
+  if (!refreshing) {
+    refreshing = axios
+      .post(`${API}/auth/refresh`, { refresh_token: refreshToken })
+      .then((res) => {
+        storeSession(res.data);
+        return res.data.access_token;
+      })
+      .catch((error) => {
+        clearSession();
+        throw error;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+export const logout = async () => {
+  try {
+    await api.post("/auth/logout", { refresh_token: localStorage.getItem("refreshToken") });
+  } catch (error) {
+    // The session is dropped locally either way.
+  }
+  clearSession();
+};
+
 // Add auth token to requests
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem("token");
@@ -27,6 +72,20 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Access tokens are short-lived: on a 401, refresh once and retry
+api.interceptors.response.use(undefined, async (error) => {
+  const config = error.config;
+  if (error.response?.status !== 401 || !config || config._retried || config.url === "/auth/logout") {
+    throw error;
+  }
+  config._retried = true;
+  const token = await refreshSession().catch(() => {
+    throw error;
+  });
+  config.headers.Authorization = `Bearer ${token}`;
+  return api(config);
+});
+
 function App() {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -40,7 +99,7 @@ function App() {
           setUser(res.data);
         })
         .catch(() => {
-          localStorage.removeItem("token");
+          clearSession();
         })
         .finally(() => {
           setLoading(false);
@@ -0,0 +1,59 @@
+import { useEffect, useRef } from "react";
+import { API, refreshSession } from "@/App";
+
+// Subscribes to the server-sent notification stream. EventSource reconnects
+// on its own and sends Last-Event-ID, so missed events are replayed. When the
+// access token has expired the server refuses the reconnect; the session is
+// then refreshed and a new stream resumes after the last event seen.
+export function useNotificationStream({ onNotification, onGrade, onResync }) {
+  const handlers = useRef({ onNotification, onGrade, onResync });
+  handlers.current = { onNotification, onGrade, onResync };
+
+  useEffect(() => {
+    if (!localStorage.getItem("token") || typeof EventSource === "undefined") {
+      return undefined;
+    }
+
+    let source = null;
+    let lastEventId = null;
+    let stopped = false;
+
+    const connect = () => {
+      const params = new URLSearchParams({ access_token: localStorage.getItem("token") });
+      if (lastEventId) {
+        params.set("last_event_id", lastEventId);
+      }
+      source = new EventSource(`${API}/notifications/stream?${params}`);
+      const listen = (type, key) => {
+        source.addEventListener(type, (event) => {
+          lastEventId = event.lastEventId || lastEventId;
+          const handler = handlers.current[key];
+          if (handler) {
+            handler(JSON.parse(event.data));
+          }
+        });
+      };
+      listen("notification", "onNotification");
+      listen("grade", "onGrade");
+      listen("resync", "onResync");
+      source.onerror = () => {
+        if (source.readyState !== EventSource.CLOSED || stopped) {
+          return;
+        }
+        refreshSession()
+          .then(() => {
+            if (!stopped) {
+              connect();
+            }
+          })
+          .catch(() => {});
+      };
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      source.close();
+    };
+  }, []);
+}
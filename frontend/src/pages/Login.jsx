@@ -5,7 +5,7 @@ import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { toast } from "sonner";
-import { api } from "@/App";
+import { api, storeSession } from "@/App";
 import { GraduationCap, Loader2 } from "lucide-react";
 
 export default function Login({ setUser }) {
@@ -22,7 +22,7 @@ export default function Login({ setUser }) {
 
     try {
       const response = await api.post("/auth/login", formData);
-      localStorage.setItem("token", response.data.access_token);
+      storeSession(response.data);
       setUser(response.data.user);
       toast.success("¡Bienvenido de nuevo!");
       navigate("/dashboard");
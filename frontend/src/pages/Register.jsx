@@ -6,7 +6,7 @@ import { Label } from "@/components/ui/label";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { RadioGroup, RadioGroupItem } from "@/components/ui/radio-group";
 import { toast } from "sonner";
-import { api } from "@/App";
+import { api, storeSession } from "@/App";
 import { GraduationCap, Loader2 } from "lucide-react";
 
 export default function Register({ setUser }) {
@@ -42,7 +42,7 @@ export default function Register({ setUser }) {
         password: formData.password,
         role: formData.role,
       });
-      localStorage.setItem("token", response.data.access_token);
+      storeSession(response.data);
       setUser(response.data.user);
       toast.success("¡Registro exitoso! Bienvenido a AcademiCO");
       navigate("/dashboard");
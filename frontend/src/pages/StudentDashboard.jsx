@@ -8,9 +8,10 @@ import { Label } from "@/components/ui/label";
 import { Badge } from "@/components/ui/badge";
 import { Progress } from "@/components/ui/progress";
 import { toast } from "sonner";
-import { api } from "@/App";
+import { api, logout } from "@/App";
 import { GraduationCap, Plus, BookOpen, Award, Bell, LogOut, Loader2 } from "lucide-react";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
+import { useNotificationStream } from "@/hooks/use-notification-stream";
 
 export default function StudentDashboard({ user, setUser }) {
   const navigate = useNavigate();
@@ -33,6 +34,18 @@ export default function StudentDashboard({ user, setUser }) {
     }
   }, [selectedCourse]);
 
+  useNotificationStream({
+    onNotification: (notification) => {
+      setNotifications((current) => [notification, ...current.filter((n) => n.id !== notification.id)]);
+    },
+    onGrade: (updatedGrade) => {
+      if (selectedCourse && updatedGrade.course_id === selectedCourse.id) {
+        setGrade(updatedGrade);
+      }
+    },
+    onResync: () => loadNotifications(),
+  });
+
   const loadCourses = async () => {
     try {
       const response = await api.get("/courses/student");
@@ -78,8 +91,8 @@ export default function StudentDashboard({ user, setUser }) {
     }
   };
 
-  const handleLogout = () => {
-    localStorage.removeItem("token");
+  const handleLogout = async () => {
+    await logout();
     setUser(null);
     navigate("/");
     toast.success("Sesión cerrada");
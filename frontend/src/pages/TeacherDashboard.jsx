@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
@@ -9,8 +9,8 @@ import { Textarea } from "@/components/ui/textarea";
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table";
 import { Badge } from "@/components/ui/badge";
 import { toast } from "sonner";
-import { api } from "@/App";
-import { GraduationCap, Plus, BookOpen, Users, Bell, LogOut, Download, Edit, Trash2, Copy, Loader2 } from "lucide-react";
+import { api, logout } from "@/App";
+import { GraduationCap, Plus, BookOpen, Users, Bell, LogOut, Download, Edit, Trash2, Copy, Loader2, Upload } from "lucide-react";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent, AlertDialogDescription, AlertDialogFooter, AlertDialogHeader, AlertDialogTitle, AlertDialogTrigger } from "@/components/ui/alert-dialog";
 
@@ -20,12 +20,18 @@ export default function TeacherDashboard({ user, setUser }) {
   const [selectedCourse, setSelectedCourse] = useState(null);
   const [students, setStudents] = useState([]);
   const [grades, setGrades] = useState([]);
+  const [courseStats, setCourseStats] = useState(null);
   const [notifications, setNotifications] = useState([]);
   const [loading, setLoading] = useState(false);
   const [createDialogOpen, setCreateDialogOpen] = useState(false);
   const [editDialogOpen, setEditDialogOpen] = useState(false);
   const [gradeDialogOpen, setGradeDialogOpen] = useState(false);
   const [selectedGrade, setSelectedGrade] = useState(null);
+  const [importing, setImporting] = useState(false);
+  const importInputRef = useRef(null);
+  const [importingGrades, setImportingGrades] = useState(false);
+  const gradesInputRef = useRef(null);
+  const [showClosedPeriods, setShowClosedPeriods] = useState(false);
   const [formData, setFormData] = useState({
     name: "",
     code: "",
@@ -39,33 +45,38 @@ export default function TeacherDashboard({ user, setUser }) {
   });
 
   useEffect(() => {
-    loadCourses();
     loadNotifications();
   }, []);
 
+  useEffect(() => {
+    loadCourses();
+  }, [showClosedPeriods]);
+
   useEffect(() => {
     if (selectedCourse) {
-      loadCourseDetails(selectedCourse.id);
+      loadCourseDetails(selectedCourse.id, selectedCourse.archived);
     }
   }, [selectedCourse]);
 
   const loadCourses = async () => {
     try {
-      const response = await api.get("/courses/teacher");
+      const response = await api.get("/courses/teacher", { params: { period: showClosedPeriods ? "all" : "current" } });
       setCourses(response.data);
     } catch (error) {
       toast.error("Error al cargar cursos");
     }
   };
 
-  const loadCourseDetails = async (courseId) => {
+  const loadCourseDetails = async (courseId, archived = false) => {
     try {
-      const [studentsRes, gradesRes] = await Promise.all([
+      const [studentsRes, gradesRes, statsRes] = await Promise.all([
         api.get(`/courses/${courseId}/students`),
-        api.get(`/grades/course/${courseId}`),
+        api.get(`/grades/course/${courseId}`, { params: { period: archived ? "all" : "current" } }),
+        api.get(`/statistics/courses/${courseId}`),
       ]);
       setStudents(studentsRes.data);
       setGrades(gradesRes.data);
+      setCourseStats(statsRes.data);
     } catch (error) {
       toast.error("Error al cargar detalles del curso");
     }
@@ -154,15 +165,16 @@ export default function TeacherDashboard({ user, setUser }) {
     }
   };
 
-  const handleExportPDF = async (courseId) => {
+  const handleExport = async (courseId, format = "pdf") => {
     try {
       const response = await api.get(`/grades/export/${courseId}`, {
+        params: format === "pdf" ? undefined : { format },
         responseType: 'blob',
       });
       const url = window.URL.createObjectURL(new Blob([response.data]));
       const link = document.createElement('a');
       link.href = url;
-      link.setAttribute('download', `calificaciones_${selectedCourse.code}.pdf`);
+      link.setAttribute('download', `calificaciones_${selectedCourse.code}.${format}`);
       document.body.appendChild(link);
       link.click();
       link.remove();
@@ -172,8 +184,57 @@ export default function TeacherDashboard({ user, setUser }) {
     }
   };
 
-  const handleLogout = () => {
-    localStorage.removeItem("token");
+  const handleImportEnrollments = async (e) => {
+    const file = e.target.files?.[0];
+    e.target.value = "";
+    if (!file) return;
+    setImporting(true);
+
+    try {
+      const formData = new FormData();
+      formData.append("file", file);
+      const response = await api.post(`/courses/${selectedCourse.id}/enrollments/import`, formData);
+      const { enrolled, failed } = response.data;
+      if (failed > 0) {
+        toast.warning(`${enrolled} estudiante(s) inscrito(s), ${failed} fila(s) con errores`);
+      } else {
+        toast.success(`${enrolled} estudiante(s) inscrito(s)`);
+      }
+      loadCourseDetails(selectedCourse.id);
+    } catch (error) {
+      toast.error(error.response?.data?.detail || "Error al importar estudiantes");
+    } finally {
+      setImporting(false);
+    }
+  };
+
+  const handleImportGrades = async (e) => {
+    const file = e.target.files?.[0];
+    e.target.value = "";
+    if (!file) return;
+    setImportingGrades(true);
+
+    try {
+      const formData = new FormData();
+      formData.append("file", file);
+      const response = await api.post(`/grades/import/${selectedCourse.id}`, formData);
+      const { updated, failed, results } = response.data;
+      if (failed > 0) {
+        const lines = results.filter((result) => !result.success).slice(0, 3).map((result) => `fila ${result.line}: ${result.error}`);
+        toast.warning(`${updated} calificación(es) actualizada(s), ${failed} fila(s) con errores`, { description: lines.join("; ") });
+      } else {
+        toast.success(`${updated} calificación(es) actualizada(s)`);
+      }
+      loadCourseDetails(selectedCourse.id);
+    } catch (error) {
+      toast.error(error.response?.data?.detail || "Error al importar calificaciones");
+    } finally {
+      setImportingGrades(false);
+    }
+  };
+
+  const handleLogout = async () => {
+    await logout();
     setUser(null);
     navigate("/");
     toast.success("Sesión cerrada");
@@ -251,6 +312,9 @@ export default function TeacherDashboard({ user, setUser }) {
                 <h1 className="text-3xl font-bold text-gray-900" style={{fontFamily: 'Space Grotesk, sans-serif'}}>Mis Cursos</h1>
                 <p className="text-gray-600 mt-1">Gestiona tus cursos y estudiantes</p>
               </div>
+              <Button variant="outline" onClick={() => setShowClosedPeriods(!showClosedPeriods)} data-testid="toggle-closed-periods-btn">
+                {showClosedPeriods ? "Ocultar períodos cerrados" : "Ver períodos cerrados"}
+              </Button>
               <Dialog open={createDialogOpen} onOpenChange={setCreateDialogOpen}>
                 <DialogTrigger asChild>
                   <Button data-testid="create-course-btn">
@@ -333,6 +397,7 @@ export default function TeacherDashboard({ user, setUser }) {
                           <span>{course.name}</span>
                         </div>
                         <Badge variant="outline" className="mt-2">{course.code}</Badge>
+                        {course.archived && <Badge variant="secondary" className="mt-2 ml-2">Cerrado</Badge>}
                       </div>
                     </CardTitle>
                     <CardDescription>{course.description}</CardDescription>
@@ -419,12 +484,81 @@ export default function TeacherDashboard({ user, setUser }) {
                     <h1 className="text-3xl font-bold text-gray-900" style={{fontFamily: 'Space Grotesk, sans-serif'}}>{selectedCourse.name}</h1>
                     <p className="text-gray-600 mt-1">{selectedCourse.code} - {selectedCourse.academic_period}</p>
                   </div>
-                  <Button onClick={() => handleExportPDF(selectedCourse.id)} data-testid="export-pdf-btn">
-                    <Download className="mr-2 h-4 w-4" />
-                    Exportar PDF
-                  </Button>
+                  <div className="flex gap-2">
+                    <input
+                      ref={importInputRef}
+                      type="file"
+                      accept=".csv,text/csv"
+                      className="hidden"
+                      onChange={handleImportEnrollments}
+                      data-testid="import-enrollments-input"
+                    />
+                    <Button variant="outline" onClick={() => importInputRef.current?.click()} disabled={importing} data-testid="import-enrollments-btn">
+                      {importing ? <Loader2 className="mr-2 h-4 w-4 animate-spin" /> : <Upload className="mr-2 h-4 w-4" />}
+                      Importar CSV
+                    </Button>
+                    <input
+                      ref={gradesInputRef}
+                      type="file"
+                      accept=".csv,.xlsx,text/csv,application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                      className="hidden"
+                      onChange={handleImportGrades}
+                      data-testid="import-grades-input"
+                    />
+                    <Button variant="outline" onClick={() => gradesInputRef.current?.click()} disabled={importingGrades} data-testid="import-grades-btn">
+                      {importingGrades ? <Loader2 className="mr-2 h-4 w-4 animate-spin" /> : <Upload className="mr-2 h-4 w-4" />}
+                      Importar notas
+                    </Button>
+                    <Button variant="outline" onClick={() => handleExport(selectedCourse.id, "xlsx")} data-testid="export-xlsx-btn">
+                      <Download className="mr-2 h-4 w-4" />
+                      Exportar Excel
+                    </Button>
+                    <Button onClick={() => handleExport(selectedCourse.id)} data-testid="export-pdf-btn">
+                      <Download className="mr-2 h-4 w-4" />
+                      Exportar PDF
+                    </Button>
+                  </div>
                 </div>
 
+                {courseStats && courseStats.graded > 0 && (
+                  <Card data-testid="course-stats-card">
+                    <CardHeader>
+                      <CardTitle>Estadísticas del Curso</CardTitle>
+                      <CardDescription>{courseStats.graded} estudiante(s) con nota final</CardDescription>
+                    </CardHeader>
+                    <CardContent className="space-y-4">
+                      <div className="grid grid-cols-2 md:grid-cols-4 gap-4 text-center">
+                        <div>
+                          <p className="text-sm text-gray-500">Promedio</p>
+                          <p className="text-2xl font-bold">{courseStats.final_grade.mean}</p>
+                        </div>
+                        <div>
+                          <p className="text-sm text-gray-500">Mediana</p>
+                          <p className="text-2xl font-bold">{courseStats.final_grade.median}</p>
+                        </div>
+                        <div>
+                          <p className="text-sm text-gray-500">Aprobación</p>
+                          <p className="text-2xl font-bold">{Math.round(courseStats.pass_rate * 100)}%</p>
+                        </div>
+                        <div>
+                          <p className="text-sm text-gray-500">En riesgo</p>
+                          <p className="text-2xl font-bold text-red-600">{courseStats.at_risk_count}</p>
+                        </div>
+                      </div>
+                      <div className="flex items-end gap-1 h-24" data-testid="grade-histogram">
+                        {courseStats.histogram.map((bin) => (
+                          <div
+                            key={bin.from}
+                            className={bin.from >= 3 ? "flex-1 bg-green-500 rounded-t" : "flex-1 bg-red-400 rounded-t"}
+                            style={{ height: `${(bin.count / Math.max(...courseStats.histogram.map((b) => b.count), 1)) * 100}%` }}
+                            title={`${bin.from} - ${bin.to}: ${bin.count}`}
+                          />
+                        ))}
+                      </div>
+                    </CardContent>
+                  </Card>
+                )}
+
                 <Card data-testid="students-grades-card">
                   <CardHeader>
                     <CardTitle className="flex items-center">
@@ -0,0 +1,56 @@
+/*
+  # Single-query views for course and roster lookups
+
+  1. New views
+    - `student_courses`: every course joined with one of its enrollments,
+      exposing `student_id`, `enrollment_id` and `enrolled_at`.
+      Serves GET /api/courses/student and the student branch of
+      GET /api/courses/{id} in one round trip.
+    - `course_roster`: enrolled students joined with their course,
+      exposing `course_id` and `teacher_id`.
+      Serves GET /api/courses/{id}/students in one round trip.
+
+  2. Security
+    - Both views use `security_invoker`, so the RLS policies of the
+      underlying tables still apply to whoever queries them.
+*/
+
+CREATE OR REPLACE VIEW student_courses
+  WITH (security_invoker = true)
+AS
+SELECT
+  c.id,
+  c.name,
+  c.code,
+  c.description,
+  c.teacher_id,
+  c.academic_period,
+  c.access_code,
+  c.created_at,
+  e.student_id,
+  e.id AS enrollment_id,
+  e.enrolled_at
+FROM enrollments e
+JOIN courses c ON c.id = e.course_id;
+
+CREATE OR REPLACE VIEW course_roster
+  WITH (security_invoker = true)
+AS
+SELECT
+  u.id,
+  u.full_name,
+  u.email,
+  u.role,
+  u.created_at,
+  e.id AS enrollment_id,
+  e.course_id,
+  c.teacher_id,
+  e.enrolled_at
+FROM enrollments e
+JOIN users u ON u.id = e.student_id
+JOIN courses c ON c.id = e.course_id;
+
+GRANT SELECT ON student_courses TO anon, authenticated;
+GRANT SELECT ON course_roster TO anon, authenticated;
+
+NOTIFY pgrst, 'reload schema';
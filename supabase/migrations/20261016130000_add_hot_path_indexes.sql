@@ -0,0 +1,60 @@
+/*
+  # Indexes and unique constraints for hot lookup paths
+
+  1. Unique constraints
+    - `users.email`: login, registration and password recovery look users up by email
+    - `courses.code` and `courses.access_code`: course creation and enrollment
+    - `enrollments (student_id, course_id)`: one enrollment per student and course
+    - `grades.enrollment_id`: one grade row per enrollment
+
+  2. Indexes
+    - `users.reset_token` (partial, only rows with a pending reset)
+    - `courses.teacher_id`
+    - `enrollments.course_id`
+    - `grades (course_id, student_id)`
+    - `notifications (user_id, created_at DESC)`
+
+  3. Notes
+    - The constraints let the API replace check-then-insert sequences with a single
+      insert that reports a unique violation (23505) on conflict.
+    - Existing duplicate rows must be resolved before applying this migration.
+*/
+
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'users_email_key') THEN
+    ALTER TABLE users ADD CONSTRAINT users_email_key UNIQUE (email);
+  END IF;
+
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'courses_code_key') THEN
+    ALTER TABLE courses ADD CONSTRAINT courses_code_key UNIQUE (code);
+  END IF;
+
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'courses_access_code_key') THEN
+    ALTER TABLE courses ADD CONSTRAINT courses_access_code_key UNIQUE (access_code);
+  END IF;
+
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'enrollments_student_id_course_id_key') THEN
+    ALTER TABLE enrollments ADD CONSTRAINT enrollments_student_id_course_id_key UNIQUE (student_id, course_id);
+  END IF;
+
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'grades_enrollment_id_key') THEN
+    ALTER TABLE grades ADD CONSTRAINT grades_enrollment_id_key UNIQUE (enrollment_id);
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS users_reset_token_idx
+  ON users (reset_token)
+  WHERE reset_token IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS courses_teacher_id_idx
+  ON courses (teacher_id);
+
+CREATE INDEX IF NOT EXISTS enrollments_course_id_idx
+  ON enrollments (course_id);
+
+CREATE INDEX IF NOT EXISTS grades_course_id_student_id_idx
+  ON grades (course_id, student_id);
+
+CREATE INDEX IF NOT EXISTS notifications_user_id_created_at_idx
+  ON notifications (user_id, created_at DESC);
@@ -0,0 +1,140 @@
+/*
+  # Compute final grades in the database
+
+  1. Course weights
+    - `courses.weight_corte1`, `weight_corte2`, `weight_corte3`: per-course
+      weights of each corte, defaulting to the historical 30/35/35 scheme.
+      Each weight must be between 0 and 1 and the three must add up to 1.
+
+  2. Triggers
+    - `grades_compute_final_grade` (BEFORE INSERT OR UPDATE on grades):
+      sets `final_grade` from the course weights once all three cortes are
+      present, and clears it otherwise. Clients no longer send it, and an
+      UPDATE ... RETURNING already carries the computed value.
+    - `courses_recompute_final_grades` (AFTER UPDATE OF the weights on
+      courses): recomputes every grade of the course when its weights change.
+
+  3. Functions
+    - `recompute_final_grades(p_course_id uuid DEFAULT NULL)`: recomputes
+      `final_grade` for one course, or for every course when called without
+      an argument, and returns the number of grades touched. Used to
+      backfill existing rows (see backend/backfill_final_grades.py).
+
+  4. Views
+    - `student_courses` now also exposes the course weights.
+*/
+
+ALTER TABLE courses
+  ADD COLUMN IF NOT EXISTS weight_corte1 numeric(4, 3) NOT NULL DEFAULT 0.30,
+  ADD COLUMN IF NOT EXISTS weight_corte2 numeric(4, 3) NOT NULL DEFAULT 0.35,
+  ADD COLUMN IF NOT EXISTS weight_corte3 numeric(4, 3) NOT NULL DEFAULT 0.35;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'courses_grade_weights_check') THEN
+    ALTER TABLE courses ADD CONSTRAINT courses_grade_weights_check CHECK (
+      weight_corte1 BETWEEN 0 AND 1
+      AND weight_corte2 BETWEEN 0 AND 1
+      AND weight_corte3 BETWEEN 0 AND 1
+      AND weight_corte1 + weight_corte2 + weight_corte3 = 1
+    );
+  END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION compute_final_grade()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  w1 numeric;
+  w2 numeric;
+  w3 numeric;
+BEGIN
+  IF NEW.corte1 IS NULL OR NEW.corte2 IS NULL OR NEW.corte3 IS NULL THEN
+    NEW.final_grade := NULL;
+    RETURN NEW;
+  END IF;
+
+  SELECT weight_corte1, weight_corte2, weight_corte3
+    INTO w1, w2, w3
+    FROM courses
+   WHERE id = NEW.course_id;
+
+  NEW.final_grade := round(
+    NEW.corte1::numeric * coalesce(w1, 0.30)
+    + NEW.corte2::numeric * coalesce(w2, 0.35)
+    + NEW.corte3::numeric * coalesce(w3, 0.35),
+    2
+  );
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS grades_compute_final_grade ON grades;
+CREATE TRIGGER grades_compute_final_grade
+  BEFORE INSERT OR UPDATE ON grades
+  FOR EACH ROW
+  EXECUTE FUNCTION compute_final_grade();
+
+CREATE OR REPLACE FUNCTION recompute_final_grades(p_course_id uuid DEFAULT NULL)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  touched integer;
+BEGIN
+  UPDATE grades
+     SET final_grade = final_grade
+   WHERE p_course_id IS NULL OR course_id = p_course_id;
+  GET DIAGNOSTICS touched = ROW_COUNT;
+  RETURN touched;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION recompute_course_final_grades()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM recompute_final_grades(NEW.id);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS courses_recompute_final_grades ON courses;
+CREATE TRIGGER courses_recompute_final_grades
+  AFTER UPDATE OF weight_corte1, weight_corte2, weight_corte3 ON courses
+  FOR EACH ROW
+  WHEN (
+    OLD.weight_corte1 IS DISTINCT FROM NEW.weight_corte1
+    OR OLD.weight_corte2 IS DISTINCT FROM NEW.weight_corte2
+    OR OLD.weight_corte3 IS DISTINCT FROM NEW.weight_corte3
+  )
+  EXECUTE FUNCTION recompute_course_final_grades();
+
+SELECT recompute_final_grades();
+
+CREATE OR REPLACE VIEW student_courses
+  WITH (security_invoker = true)
+AS
+SELECT
+  c.id,
+  c.name,
+  c.code,
+  c.description,
+  c.teacher_id,
+  c.academic_period,
+  c.access_code,
+  c.created_at,
+  e.student_id,
+  e.id AS enrollment_id,
+  e.enrolled_at,
+  c.weight_corte1,
+  c.weight_corte2,
+  c.weight_corte3
+FROM enrollments e
+JOIN courses c ON c.id = e.course_id;
+
+GRANT EXECUTE ON FUNCTION recompute_final_grades(uuid) TO authenticated;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,151 @@
+/*
+  # Unread notification counters and archive
+
+  1. New tables
+    - `notification_counters`: one row per user with the number of unread
+      notifications, kept up to date by triggers on `notifications`.
+      GET /api/notifications/unread-count reads a single row by primary key.
+    - `notifications_archive`: same columns as `notifications` plus
+      `archived_at`. Old read notifications are moved here.
+
+  2. Triggers
+    - `notifications_count_unread` (AFTER INSERT, UPDATE OF read/user_id, DELETE
+      on notifications) adjusts the counter of each affected user.
+
+  3. Functions
+    - `mark_notifications_read(p_user_id uuid, p_ids uuid[])`: marks the
+      given unread notifications of a user as read in one statement, or all
+      of them when `p_ids` is NULL, and returns how many changed.
+    - `archive_read_notifications(p_older_than interval, p_batch_size integer)`:
+      moves up to `p_batch_size` notifications that are read and older than
+      `p_older_than` into `notifications_archive` and returns how many moved.
+      Rows are locked with SKIP LOCKED so several workers may run it at once.
+
+  4. Indexes
+    - `notifications (user_id) WHERE NOT read`: bulk mark-read of a user's
+      unread notifications.
+    - `notifications (created_at) WHERE read`: archival scans.
+*/
+
+CREATE TABLE IF NOT EXISTS notification_counters (
+  user_id uuid PRIMARY KEY,
+  unread integer NOT NULL DEFAULT 0 CHECK (unread >= 0)
+);
+
+CREATE TABLE IF NOT EXISTS notifications_archive (
+  LIKE notifications INCLUDING DEFAULTS,
+  archived_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (id)
+);
+
+CREATE INDEX IF NOT EXISTS notifications_archive_user_id_created_at_idx
+  ON notifications_archive (user_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS notifications_user_id_unread_idx
+  ON notifications (user_id)
+  WHERE NOT read;
+
+CREATE INDEX IF NOT EXISTS notifications_read_created_at_idx
+  ON notifications (created_at)
+  WHERE read;
+
+CREATE OR REPLACE FUNCTION bump_notification_counter(p_user_id uuid, p_delta integer)
+RETURNS void
+LANGUAGE sql
+AS $$
+  INSERT INTO notification_counters AS counters (user_id, unread)
+  VALUES (p_user_id, greatest(p_delta, 0))
+  ON CONFLICT (user_id)
+  DO UPDATE SET unread = greatest(counters.unread + p_delta, 0);
+$$;
+
+CREATE OR REPLACE FUNCTION count_unread_notifications()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.read THEN
+    PERFORM bump_notification_counter(OLD.user_id, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.read THEN
+    PERFORM bump_notification_counter(NEW.user_id, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS notifications_count_unread ON notifications;
+CREATE TRIGGER notifications_count_unread
+  AFTER INSERT OR UPDATE OF read, user_id OR DELETE ON notifications
+  FOR EACH ROW
+  EXECUTE FUNCTION count_unread_notifications();
+
+INSERT INTO notification_counters (user_id, unread)
+SELECT user_id, count(*)
+  FROM notifications
+ WHERE NOT read
+ GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET unread = EXCLUDED.unread;
+
+CREATE OR REPLACE FUNCTION mark_notifications_read(p_user_id uuid, p_ids uuid[] DEFAULT NULL)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  updated integer;
+BEGIN
+  UPDATE notifications
+     SET read = true
+   WHERE user_id = p_user_id
+     AND NOT read
+     AND (p_ids IS NULL OR id = ANY (p_ids));
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  RETURN updated;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION archive_read_notifications(
+  p_older_than interval DEFAULT interval '30 days',
+  p_batch_size integer DEFAULT 1000
+)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  moved integer;
+BEGIN
+  WITH candidates AS (
+    SELECT id
+      FROM notifications
+     WHERE read
+       AND created_at < now() - p_older_than
+     ORDER BY created_at
+     LIMIT p_batch_size
+       FOR UPDATE SKIP LOCKED
+  ), deleted AS (
+    DELETE FROM notifications n
+     USING candidates c
+     WHERE n.id = c.id
+    RETURNING n.*
+  )
+  INSERT INTO notifications_archive
+  SELECT deleted.*, now() FROM deleted
+  ON CONFLICT (id) DO NOTHING;
+  GET DIAGNOSTICS moved = ROW_COUNT;
+  RETURN moved;
+END;
+$$;
+
+ALTER TABLE notification_counters ENABLE ROW LEVEL SECURITY;
+ALTER TABLE notifications_archive ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can read own counter" ON notification_counters;
+CREATE POLICY "Users can read own counter"
+  ON notification_counters
+  FOR SELECT
+  TO authenticated
+  USING (auth.uid()::text = user_id::text);
+
+GRANT SELECT ON notification_counters TO authenticated;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,162 @@
+/*
+  # Transactional enrollment and course deletion
+
+  1. Foreign keys
+    - `enrollments.course_id`, `grades.course_id` -> `courses.id` and
+      `grades.enrollment_id` -> `enrollments.id` now cascade on delete, so
+      deleting a course removes its enrollments and grades in the same
+      statement. `enrollments.student_id` -> `users.id` restricts deletes:
+      removing a user with enrollments must be done on purpose.
+    - Orphaned rows left by earlier non-atomic deletes would fail the new
+      constraints. They are moved to `orphaned_enrollments` and
+      `orphaned_grades` (same columns plus `quarantined_at`) instead of being
+      dropped, so they can be inspected or restored.
+
+  2. Functions
+    - `delete_course(p_course_id uuid, p_teacher_id uuid)`: deletes the
+      course if it belongs to the teacher and returns whether it did.
+    - `enroll_student(p_student_id uuid, p_access_code text)`: enrolls the
+      student in the course with that access code and creates the empty
+      grade row in one transaction. Returns the course, or no row when the
+      code is unknown. A repeated enrollment raises the unique violation of
+      `enrollments_student_id_course_id_key`.
+    - `enroll_students(p_course_id uuid, p_student_ids uuid[])`: bulk
+      version used by the CSV import. Students already enrolled are skipped;
+      returns `(student_id, enrollment_id)` for each new enrollment.
+    - `users_by_email(p_emails text[])`: id, email and role of the users
+      whose email matches one of `p_emails` ignoring case, for the CSV
+      import.
+
+  3. Indexes
+    - `users (lower(email))`: case-insensitive email lookups.
+*/
+
+CREATE TABLE IF NOT EXISTS orphaned_enrollments (
+  LIKE enrollments INCLUDING DEFAULTS,
+  quarantined_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS orphaned_grades (
+  LIKE grades INCLUDING DEFAULTS,
+  quarantined_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE orphaned_enrollments ENABLE ROW LEVEL SECURITY;
+ALTER TABLE orphaned_grades ENABLE ROW LEVEL SECURITY;
+
+-- Grades go first: their enrollment may be one of the orphans below.
+WITH orphans AS (
+  DELETE FROM grades g
+   WHERE NOT EXISTS (
+           SELECT 1
+             FROM enrollments e
+             JOIN courses c ON c.id = e.course_id
+             JOIN users u ON u.id = e.student_id
+            WHERE e.id = g.enrollment_id
+         )
+      OR NOT EXISTS (SELECT 1 FROM courses c WHERE c.id = g.course_id)
+  RETURNING g.*
+)
+INSERT INTO orphaned_grades
+SELECT orphans.*, now() FROM orphans;
+
+WITH orphans AS (
+  DELETE FROM enrollments e
+   WHERE NOT EXISTS (SELECT 1 FROM courses c WHERE c.id = e.course_id)
+      OR NOT EXISTS (SELECT 1 FROM users u WHERE u.id = e.student_id)
+  RETURNING e.*
+)
+INSERT INTO orphaned_enrollments
+SELECT orphans.*, now() FROM orphans;
+
+ALTER TABLE enrollments DROP CONSTRAINT IF EXISTS enrollments_course_id_fkey;
+ALTER TABLE enrollments
+  ADD CONSTRAINT enrollments_course_id_fkey
+  FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE;
+
+ALTER TABLE enrollments DROP CONSTRAINT IF EXISTS enrollments_student_id_fkey;
+ALTER TABLE enrollments
+  ADD CONSTRAINT enrollments_student_id_fkey
+  FOREIGN KEY (student_id) REFERENCES users (id) ON DELETE RESTRICT;
+
+ALTER TABLE grades DROP CONSTRAINT IF EXISTS grades_enrollment_id_fkey;
+ALTER TABLE grades
+  ADD CONSTRAINT grades_enrollment_id_fkey
+  FOREIGN KEY (enrollment_id) REFERENCES enrollments (id) ON DELETE CASCADE;
+
+ALTER TABLE grades DROP CONSTRAINT IF EXISTS grades_course_id_fkey;
+ALTER TABLE grades
+  ADD CONSTRAINT grades_course_id_fkey
+  FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS grades_course_id_idx ON grades (course_id);
+CREATE INDEX IF NOT EXISTS users_lower_email_idx ON users (lower(email));
+
+CREATE OR REPLACE FUNCTION delete_course(p_course_id uuid, p_teacher_id uuid)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  DELETE FROM courses
+   WHERE id = p_course_id
+     AND teacher_id = p_teacher_id;
+  RETURN FOUND;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION enroll_student(p_student_id uuid, p_access_code text)
+RETURNS SETOF courses
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  course courses;
+  new_enrollment_id uuid := gen_random_uuid();
+BEGIN
+  SELECT * INTO course FROM courses WHERE access_code = p_access_code;
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO enrollments (id, student_id, course_id, enrolled_at)
+  VALUES (new_enrollment_id, p_student_id, course.id, now());
+
+  INSERT INTO grades (id, enrollment_id, course_id, student_id, student_name, last_updated)
+  SELECT gen_random_uuid(), new_enrollment_id, course.id, u.id, u.full_name, now()
+    FROM users u
+   WHERE u.id = p_student_id;
+
+  RETURN NEXT course;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION enroll_students(p_course_id uuid, p_student_ids uuid[])
+RETURNS TABLE (student_id uuid, enrollment_id uuid)
+LANGUAGE sql
+AS $$
+  WITH inserted AS (
+    INSERT INTO enrollments (id, student_id, course_id, enrolled_at)
+    SELECT gen_random_uuid(), ids.student_id, p_course_id, now()
+      FROM unnest(p_student_ids) AS ids (student_id)
+    ON CONFLICT (student_id, course_id) DO NOTHING
+    RETURNING enrollments.id, enrollments.student_id
+  ), graded AS (
+    INSERT INTO grades (id, enrollment_id, course_id, student_id, student_name, last_updated)
+    SELECT gen_random_uuid(), inserted.id, p_course_id, u.id, u.full_name, now()
+      FROM inserted
+      JOIN users u ON u.id = inserted.student_id
+    RETURNING grades.student_id, grades.enrollment_id
+  )
+  SELECT graded.student_id, graded.enrollment_id FROM graded;
+$$;
+
+CREATE OR REPLACE FUNCTION users_by_email(p_emails text[])
+RETURNS TABLE (id uuid, email text, role text)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT u.id, u.email::text, u.role::text
+    FROM users u
+   WHERE lower(u.email) = ANY (SELECT lower(e) FROM unnest(p_emails) AS e);
+$$;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,148 @@
+/*
+  # Incremental grade statistics per course
+
+  1. New table
+    - `course_grade_stats`: one row per course with, for `corte1`, `corte2`,
+      `corte3` and `final_grade`, an array of 501 counters: element `i + 1`
+      holds how many grades equal `i / 100`. Means, medians, deviations, pass
+      rates and histograms are derived from these counts (see
+      backend/course_stats.py), so statistics endpoints never scan grades.
+
+  2. Triggers
+    - `grades_track_stats` (AFTER INSERT, UPDATE, DELETE on grades) moves
+      one count from the old value's bucket to the new value's bucket for
+      each column that changed. Weight changes recompute `final_grade`
+      through the existing trigger, which keeps the counts in step.
+
+  3. Views
+    - `teacher_course_stats`: every course with its teacher, academic period,
+      weights and counts, so a teacher's rollup is a single query.
+
+  4. Backfill
+    - Counts are rebuilt from the existing grades.
+*/
+
+CREATE TABLE IF NOT EXISTS course_grade_stats (
+  course_id uuid PRIMARY KEY REFERENCES courses (id) ON DELETE CASCADE,
+  corte1 integer[] NOT NULL DEFAULT array_fill(0, ARRAY[501]),
+  corte2 integer[] NOT NULL DEFAULT array_fill(0, ARRAY[501]),
+  corte3 integer[] NOT NULL DEFAULT array_fill(0, ARRAY[501]),
+  final_grade integer[] NOT NULL DEFAULT array_fill(0, ARRAY[501])
+);
+
+CREATE OR REPLACE FUNCTION grade_bucket(p_value numeric)
+RETURNS integer
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT least(greatest(round(p_value * 100), 0), 500)::integer + 1;
+$$;
+
+CREATE OR REPLACE FUNCTION grade_bucket_counts(p_values numeric[])
+RETURNS integer[]
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT array_agg(coalesce(counts.total, 0)::integer ORDER BY buckets.bucket)
+    FROM generate_series(1, 501) AS buckets (bucket)
+    LEFT JOIN (
+      SELECT grade_bucket(value) AS bucket, count(*) AS total
+        FROM unnest(p_values) AS value
+       WHERE value IS NOT NULL
+       GROUP BY 1
+    ) counts ON counts.bucket = buckets.bucket;
+$$;
+
+CREATE OR REPLACE FUNCTION track_grade_stats()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  field text;
+  old_value numeric;
+  new_value numeric;
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO course_grade_stats (course_id) VALUES (NEW.course_id)
+    ON CONFLICT (course_id) DO NOTHING;
+  END IF;
+
+  FOREACH field IN ARRAY ARRAY['corte1', 'corte2', 'corte3', 'final_grade'] LOOP
+    old_value := CASE WHEN TG_OP IN ('UPDATE', 'DELETE') THEN (to_jsonb(OLD) ->> field)::numeric END;
+    new_value := CASE WHEN TG_OP IN ('INSERT', 'UPDATE') THEN (to_jsonb(NEW) ->> field)::numeric END;
+
+    IF TG_OP = 'UPDATE' AND OLD.course_id = NEW.course_id
+       AND grade_bucket(old_value) IS NOT DISTINCT FROM grade_bucket(new_value) THEN
+      CONTINUE;
+    END IF;
+
+    IF old_value IS NOT NULL THEN
+      EXECUTE format('UPDATE course_grade_stats SET %1$I[$2] = %1$I[$2] - 1 WHERE course_id = $1', field)
+        USING OLD.course_id, grade_bucket(old_value);
+    END IF;
+    IF new_value IS NOT NULL THEN
+      EXECUTE format('UPDATE course_grade_stats SET %1$I[$2] = %1$I[$2] + 1 WHERE course_id = $1', field)
+        USING NEW.course_id, grade_bucket(new_value);
+    END IF;
+  END LOOP;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS grades_track_stats ON grades;
+CREATE TRIGGER grades_track_stats
+  AFTER INSERT OR UPDATE OF corte1, corte2, corte3, final_grade, course_id OR DELETE ON grades
+  FOR EACH ROW
+  EXECUTE FUNCTION track_grade_stats();
+
+INSERT INTO course_grade_stats (course_id, corte1, corte2, corte3, final_grade)
+SELECT course_id,
+       grade_bucket_counts(array_agg(corte1::numeric)),
+       grade_bucket_counts(array_agg(corte2::numeric)),
+       grade_bucket_counts(array_agg(corte3::numeric)),
+       grade_bucket_counts(array_agg(final_grade::numeric))
+  FROM grades
+ WHERE course_id IN (SELECT id FROM courses)
+ GROUP BY course_id
+ON CONFLICT (course_id) DO UPDATE
+   SET corte1 = EXCLUDED.corte1,
+       corte2 = EXCLUDED.corte2,
+       corte3 = EXCLUDED.corte3,
+       final_grade = EXCLUDED.final_grade;
+
+CREATE OR REPLACE VIEW teacher_course_stats
+  WITH (security_invoker = true)
+AS
+SELECT
+  c.id AS course_id,
+  c.name,
+  c.code,
+  c.academic_period,
+  c.teacher_id,
+  c.weight_corte1,
+  c.weight_corte2,
+  c.weight_corte3,
+  s.corte1,
+  s.corte2,
+  s.corte3,
+  s.final_grade
+FROM courses c
+LEFT JOIN course_grade_stats s ON s.course_id = c.id;
+
+ALTER TABLE course_grade_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Teachers can read stats of own courses" ON course_grade_stats;
+CREATE POLICY "Teachers can read stats of own courses"
+  ON course_grade_stats
+  FOR SELECT
+  TO authenticated
+  USING (EXISTS (
+    SELECT 1 FROM courses c
+     WHERE c.id = course_grade_stats.course_id
+       AND auth.uid()::text = c.teacher_id::text
+  ));
+
+GRANT SELECT ON course_grade_stats TO authenticated;
+GRANT SELECT ON teacher_course_stats TO anon, authenticated;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,36 @@
+/*
+  # Token revocation
+
+  1. New tables
+    - `revoked_tokens`: ids (`jti`) of revoked access and refresh tokens
+      with their expiry. Rows past `expires_at` are useless and can be
+      deleted at any time.
+    - `user_token_revocations`: per-user cut-off; every token of the user
+      issued before `revoked_before` is rejected (password reset, logout
+      from all devices).
+
+  Each API worker loads both tables at startup and then polls for rows
+  with a recent `revoked_at`, keeping the checks in memory.
+*/
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+  jti text PRIMARY KEY,
+  expires_at timestamptz NOT NULL,
+  revoked_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS revoked_tokens_revoked_at_idx ON revoked_tokens (revoked_at);
+CREATE INDEX IF NOT EXISTS revoked_tokens_expires_at_idx ON revoked_tokens (expires_at);
+
+CREATE TABLE IF NOT EXISTS user_token_revocations (
+  user_id uuid PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+  revoked_before timestamptz NOT NULL,
+  revoked_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS user_token_revocations_revoked_at_idx ON user_token_revocations (revoked_at);
+
+ALTER TABLE revoked_tokens ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_token_revocations ENABLE ROW LEVEL SECURITY;
+
+NOTIFY pgrst, 'reload schema';
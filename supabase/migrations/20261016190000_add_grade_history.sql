@@ -0,0 +1,50 @@
+/*
+  # Grade history
+
+  1. New table
+    - `grade_history`: one row per grade change with who made it, when,
+      and a `changes` object holding only the fields that changed and
+      their new values (e.g. `{"corte2": 4.1, "final_grade": 3.8}`).
+      Rows are written in batches by the API after the grade is saved,
+      with ids generated by the API so a retried batch is not duplicated.
+    - No foreign keys: the log outlives deleted courses and enrollments.
+
+  2. Append-only
+    - A trigger rejects UPDATE and DELETE.
+
+  3. Indexes
+    - `(enrollment_id, changed_at desc, id desc)` and
+      `(course_id, changed_at desc, id desc)` serve the history endpoints,
+      which page newest first within an optional time range.
+*/
+
+CREATE TABLE IF NOT EXISTS grade_history (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  enrollment_id uuid NOT NULL,
+  course_id uuid NOT NULL,
+  student_id uuid NOT NULL,
+  changed_by uuid NOT NULL,
+  changed_at timestamptz NOT NULL DEFAULT now(),
+  changes jsonb NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS grade_history_enrollment_idx ON grade_history (enrollment_id, changed_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS grade_history_course_idx ON grade_history (course_id, changed_at DESC, id DESC);
+
+CREATE OR REPLACE FUNCTION reject_grade_history_changes()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RAISE EXCEPTION 'grade_history is append-only';
+END;
+$$;
+
+DROP TRIGGER IF EXISTS grade_history_append_only ON grade_history;
+CREATE TRIGGER grade_history_append_only
+  BEFORE UPDATE OR DELETE ON grade_history
+  FOR EACH ROW EXECUTE FUNCTION reject_grade_history_changes();
+
+ALTER TABLE grade_history ENABLE ROW LEVEL SECURITY;
+
+NOTIFY pgrst, 'reload schema';
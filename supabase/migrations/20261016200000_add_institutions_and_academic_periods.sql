@@ -0,0 +1,276 @@
+/*
+  # Institutions and academic periods
+
+  1. New tables
+    - `institutions`: tenants of the installation. Existing users and
+      courses are assigned to the `default` institution, which new users
+      also join unless given another one.
+    - `academic_periods`: per-institution periods identified by `code`
+      (the value courses already keep in `academic_period`, e.g. 2026-1)
+      with a `status` of `upcoming`, `active` or `closed`. At most one
+      period per institution is active.
+
+  2. Changes
+    - `users.institution_id`, `courses.institution_id` and
+      `courses.period_id` reference the new tables.
+    - `courses`, `enrollments` and `grades` get `archived`, set when the
+      course's period is closed. Course codes are now unique per period
+      instead of globally, so a course can be offered every semester.
+
+  3. Hot and historical data
+    - Teacher, student and gradebook queries default to rows that are not
+      archived and use partial indexes that only cover those rows, so the
+      indexes serving day-to-day traffic stay the size of the open periods
+      however many semesters accumulate. Full indexes remain for
+      historical queries and cascades.
+    - Declarative partitioning was not used: it would force the period
+      into the primary keys and the unique constraints of enrollments and
+      grades, and into every foreign key pointing at them.
+
+  4. Functions
+    - `academic_period_for(p_institution_id, p_code)`: the period with
+      that code, created on first use (active when the institution has no
+      active period, upcoming otherwise).
+    - `activate_academic_period(p_period_id)`: makes the period active and
+      closes the previously active one.
+    - `close_academic_period(p_period_id)`: closes the period and archives
+      its courses, enrollments and grades. Returns the archived courses.
+    - `enroll_student` and `enroll_students` no longer enroll into
+      archived courses.
+    - `student_courses` exposes the institution, the period and the
+      enrollment's `archived` flag, so a student's current courses are
+      read through the partial enrollments index.
+*/
+
+CREATE TABLE IF NOT EXISTS institutions (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  name text NOT NULL,
+  slug text NOT NULL UNIQUE,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO institutions (id, name, slug)
+VALUES ('00000000-0000-0000-0000-000000000001', 'Institución principal', 'default')
+ON CONFLICT (slug) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS academic_periods (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  institution_id uuid NOT NULL REFERENCES institutions (id) ON DELETE CASCADE,
+  code text NOT NULL,
+  starts_on date,
+  ends_on date,
+  status text NOT NULL DEFAULT 'upcoming' CHECK (status IN ('upcoming', 'active', 'closed')),
+  created_at timestamptz NOT NULL DEFAULT now(),
+  CONSTRAINT academic_periods_institution_id_code_key UNIQUE (institution_id, code)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS academic_periods_one_active_idx
+  ON academic_periods (institution_id)
+  WHERE status = 'active';
+
+ALTER TABLE users
+  ADD COLUMN IF NOT EXISTS institution_id uuid NOT NULL DEFAULT '00000000-0000-0000-0000-000000000001' REFERENCES institutions (id);
+
+ALTER TABLE courses
+  ADD COLUMN IF NOT EXISTS institution_id uuid REFERENCES institutions (id),
+  ADD COLUMN IF NOT EXISTS period_id uuid REFERENCES academic_periods (id),
+  ADD COLUMN IF NOT EXISTS archived boolean NOT NULL DEFAULT false;
+
+ALTER TABLE enrollments ADD COLUMN IF NOT EXISTS archived boolean NOT NULL DEFAULT false;
+ALTER TABLE grades ADD COLUMN IF NOT EXISTS archived boolean NOT NULL DEFAULT false;
+
+-- Backfill: one period per distinct course period, the latest one active.
+UPDATE courses c
+   SET institution_id = u.institution_id
+  FROM users u
+ WHERE u.id = c.teacher_id
+   AND c.institution_id IS NULL;
+
+UPDATE courses
+   SET institution_id = '00000000-0000-0000-0000-000000000001'
+ WHERE institution_id IS NULL;
+
+INSERT INTO academic_periods (institution_id, code, status)
+SELECT DISTINCT institution_id, academic_period, 'closed'
+  FROM courses
+ON CONFLICT (institution_id, code) DO NOTHING;
+
+UPDATE academic_periods p
+   SET status = 'active'
+ WHERE p.code = (SELECT max(code) FROM academic_periods latest WHERE latest.institution_id = p.institution_id)
+   AND NOT EXISTS (SELECT 1 FROM academic_periods a WHERE a.institution_id = p.institution_id AND a.status = 'active');
+
+UPDATE courses c
+   SET period_id = p.id,
+       archived = (p.status = 'closed')
+  FROM academic_periods p
+ WHERE p.institution_id = c.institution_id
+   AND p.code = c.academic_period;
+
+UPDATE enrollments e SET archived = true FROM courses c WHERE c.id = e.course_id AND c.archived;
+UPDATE grades g SET archived = true FROM courses c WHERE c.id = g.course_id AND c.archived;
+
+ALTER TABLE courses ALTER COLUMN institution_id SET NOT NULL;
+ALTER TABLE courses ALTER COLUMN period_id SET NOT NULL;
+
+ALTER TABLE courses DROP CONSTRAINT IF EXISTS courses_code_key;
+ALTER TABLE courses ADD CONSTRAINT courses_period_id_code_key UNIQUE (period_id, code);
+
+-- Hot paths only index rows of open periods.
+DROP INDEX IF EXISTS courses_teacher_id_idx;
+CREATE INDEX IF NOT EXISTS courses_teacher_id_period_id_idx ON courses (teacher_id, period_id);
+CREATE INDEX IF NOT EXISTS courses_teacher_id_current_idx ON courses (teacher_id, created_at, id) WHERE NOT archived;
+CREATE INDEX IF NOT EXISTS enrollments_student_id_current_idx ON enrollments (student_id) WHERE NOT archived;
+CREATE INDEX IF NOT EXISTS grades_course_id_current_idx ON grades (course_id, student_name, id) WHERE NOT archived;
+
+CREATE OR REPLACE VIEW student_courses
+  WITH (security_invoker = true)
+AS
+SELECT
+  c.id,
+  c.name,
+  c.code,
+  c.description,
+  c.teacher_id,
+  c.academic_period,
+  c.access_code,
+  c.created_at,
+  e.student_id,
+  e.id AS enrollment_id,
+  e.enrolled_at,
+  c.weight_corte1,
+  c.weight_corte2,
+  c.weight_corte3,
+  c.institution_id,
+  c.period_id,
+  e.archived
+FROM enrollments e
+JOIN courses c ON c.id = e.course_id;
+
+CREATE OR REPLACE FUNCTION academic_period_for(p_institution_id uuid, p_code text)
+RETURNS SETOF academic_periods
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO academic_periods (institution_id, code, status)
+  VALUES (
+    p_institution_id,
+    p_code,
+    CASE WHEN EXISTS (SELECT 1 FROM academic_periods WHERE institution_id = p_institution_id AND status = 'active')
+         THEN 'upcoming' ELSE 'active' END
+  )
+  ON CONFLICT (institution_id, code) DO NOTHING;
+
+  RETURN QUERY
+  SELECT * FROM academic_periods WHERE institution_id = p_institution_id AND code = p_code;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION close_academic_period(p_period_id uuid)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  archived_courses integer;
+BEGIN
+  UPDATE academic_periods SET status = 'closed' WHERE id = p_period_id;
+
+  UPDATE courses SET archived = true WHERE period_id = p_period_id AND NOT archived;
+  GET DIAGNOSTICS archived_courses = ROW_COUNT;
+
+  UPDATE enrollments e SET archived = true
+    FROM courses c
+   WHERE c.id = e.course_id AND c.period_id = p_period_id AND NOT e.archived;
+
+  UPDATE grades g SET archived = true
+    FROM courses c
+   WHERE c.id = g.course_id AND c.period_id = p_period_id AND NOT g.archived;
+
+  RETURN archived_courses;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION activate_academic_period(p_period_id uuid)
+RETURNS SETOF academic_periods
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  previous uuid;
+BEGIN
+  SELECT a.id INTO previous
+    FROM academic_periods a
+    JOIN academic_periods p ON p.institution_id = a.institution_id
+   WHERE p.id = p_period_id AND a.status = 'active' AND a.id <> p_period_id;
+
+  IF previous IS NOT NULL THEN
+    PERFORM close_academic_period(previous);
+  END IF;
+
+  UPDATE academic_periods SET status = 'active' WHERE id = p_period_id;
+
+  RETURN QUERY SELECT * FROM academic_periods WHERE id = p_period_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION enroll_student(p_student_id uuid, p_access_code text)
+RETURNS SETOF courses
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  course courses;
+  new_enrollment_id uuid := gen_random_uuid();
+BEGIN
+  SELECT * INTO course FROM courses WHERE access_code = p_access_code AND NOT archived;
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO enrollments (id, student_id, course_id, enrolled_at)
+  VALUES (new_enrollment_id, p_student_id, course.id, now());
+
+  INSERT INTO grades (id, enrollment_id, course_id, student_id, student_name, last_updated)
+  SELECT gen_random_uuid(), new_enrollment_id, course.id, u.id, u.full_name, now()
+    FROM users u
+   WHERE u.id = p_student_id;
+
+  RETURN NEXT course;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION enroll_students(p_course_id uuid, p_student_ids uuid[])
+RETURNS TABLE (student_id uuid, enrollment_id uuid)
+LANGUAGE sql
+AS $$
+  WITH inserted AS (
+    INSERT INTO enrollments (id, student_id, course_id, enrolled_at)
+    SELECT gen_random_uuid(), ids.student_id, p_course_id, now()
+      FROM unnest(p_student_ids) AS ids (student_id)
+     WHERE EXISTS (SELECT 1 FROM courses c WHERE c.id = p_course_id AND NOT c.archived)
+    ON CONFLICT (student_id, course_id) DO NOTHING
+    RETURNING enrollments.id, enrollments.student_id
+  ), graded AS (
+    INSERT INTO grades (id, enrollment_id, course_id, student_id, student_name, last_updated)
+    SELECT gen_random_uuid(), inserted.id, p_course_id, u.id, u.full_name, now()
+      FROM inserted
+      JOIN users u ON u.id = inserted.student_id
+    RETURNING grades.student_id, grades.enrollment_id
+  )
+  SELECT graded.student_id, graded.enrollment_id FROM graded;
+$$;
+
+ALTER TABLE institutions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE academic_periods ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Members can read their institution's periods" ON academic_periods;
+CREATE POLICY "Members can read their institution's periods"
+  ON academic_periods
+  FOR SELECT
+  TO authenticated
+  USING (EXISTS (
+    SELECT 1 FROM users u WHERE u.id::text = auth.uid()::text AND u.institution_id = academic_periods.institution_id
+  ));
+
+GRANT SELECT ON student_courses TO anon, authenticated;
+GRANT SELECT ON academic_periods TO authenticated;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,31 @@
+/*
+  # Institution on the course roster
+
+  1. Changes
+    - `course_roster` exposes the student's `institution_id`. The API
+      projects the roster onto the `User` model, which gained that field
+      with institutions; PostgREST rejects a select naming a column the
+      view does not have.
+*/
+
+CREATE OR REPLACE VIEW course_roster
+  WITH (security_invoker = true)
+AS
+SELECT
+  u.id,
+  u.full_name,
+  u.email,
+  u.role,
+  u.created_at,
+  e.id AS enrollment_id,
+  e.course_id,
+  c.teacher_id,
+  e.enrolled_at,
+  u.institution_id
+FROM enrollments e
+JOIN users u ON u.id = e.student_id
+JOIN courses c ON c.id = e.course_id;
+
+GRANT SELECT ON course_roster TO anon, authenticated;
+
+NOTIFY pgrst, 'reload schema';
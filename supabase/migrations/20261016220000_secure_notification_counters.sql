@@ -0,0 +1,34 @@
+/*
+  # Notification counters under RLS
+
+  1. Security
+    - `bump_notification_counter` and the `notifications_count_unread`
+      trigger function run as their owner (`SECURITY DEFINER`) with a fixed
+      `search_path`. `notification_counters` has no write policies, so
+      notification writes made with the API's anon key failed in the
+      trigger.
+    - The API reads counters with the anon key, like the course lookup
+      views, and checks ownership itself: anon gets SELECT on
+      `notification_counters`.
+*/
+
+ALTER FUNCTION bump_notification_counter(uuid, integer)
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+ALTER FUNCTION count_unread_notifications()
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+REVOKE EXECUTE ON FUNCTION bump_notification_counter(uuid, integer) FROM PUBLIC, anon, authenticated;
+
+DROP POLICY IF EXISTS "API can read counters" ON notification_counters;
+CREATE POLICY "API can read counters"
+  ON notification_counters
+  FOR SELECT
+  TO anon
+  USING (true);
+
+GRANT SELECT ON notification_counters TO anon;
+
+NOTIFY pgrst, 'reload schema';
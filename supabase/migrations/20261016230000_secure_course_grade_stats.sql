@@ -0,0 +1,28 @@
+/*
+  # Grade statistics under RLS
+
+  1. Security
+    - The `grades_track_stats` trigger function runs as its owner
+      (`SECURITY DEFINER`) with a fixed `search_path`. `course_grade_stats`
+      has no write policies, so grade writes made with the API's anon key
+      failed in the trigger.
+    - The API reads `teacher_course_stats` with the anon key and checks the
+      teacher itself. The view is `security_invoker`, so anon also needs
+      to read `course_grade_stats`, as it does the other tables behind the
+      course lookup views.
+*/
+
+ALTER FUNCTION track_grade_stats()
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+DROP POLICY IF EXISTS "API can read course stats" ON course_grade_stats;
+CREATE POLICY "API can read course stats"
+  ON course_grade_stats
+  FOR SELECT
+  TO anon
+  USING (true);
+
+GRANT SELECT ON course_grade_stats TO anon;
+
+NOTIFY pgrst, 'reload schema';
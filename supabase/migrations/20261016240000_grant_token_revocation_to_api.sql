@@ -0,0 +1,30 @@
+/*
+  # Token revocation writes from the API
+
+  1. Security
+    - The API records and loads revocations with the anon key, but
+      `revoked_tokens` and `user_token_revocations` had RLS enabled with
+      no policies, so every revocation write failed and syncs read
+      nothing. anon may now read, insert and update both tables; the
+      upserts the API issues need all three. Rows are never deleted
+      through the API.
+*/
+
+DROP POLICY IF EXISTS "API can read revoked tokens" ON revoked_tokens;
+CREATE POLICY "API can read revoked tokens" ON revoked_tokens FOR SELECT TO anon USING (true);
+DROP POLICY IF EXISTS "API can revoke tokens" ON revoked_tokens;
+CREATE POLICY "API can revoke tokens" ON revoked_tokens FOR INSERT TO anon WITH CHECK (true);
+DROP POLICY IF EXISTS "API can extend revoked tokens" ON revoked_tokens;
+CREATE POLICY "API can extend revoked tokens" ON revoked_tokens FOR UPDATE TO anon USING (true) WITH CHECK (true);
+
+DROP POLICY IF EXISTS "API can read user revocations" ON user_token_revocations;
+CREATE POLICY "API can read user revocations" ON user_token_revocations FOR SELECT TO anon USING (true);
+DROP POLICY IF EXISTS "API can revoke user tokens" ON user_token_revocations;
+CREATE POLICY "API can revoke user tokens" ON user_token_revocations FOR INSERT TO anon WITH CHECK (true);
+DROP POLICY IF EXISTS "API can move user revocations" ON user_token_revocations;
+CREATE POLICY "API can move user revocations" ON user_token_revocations FOR UPDATE TO anon USING (true) WITH CHECK (true);
+
+GRANT SELECT, INSERT, UPDATE ON revoked_tokens TO anon;
+GRANT SELECT, INSERT, UPDATE ON user_token_revocations TO anon;
+
+NOTIFY pgrst, 'reload schema';
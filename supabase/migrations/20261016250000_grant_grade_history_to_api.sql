@@ -0,0 +1,19 @@
+/*
+  # Grade history writes from the API
+
+  1. Security
+    - The API appends history rows and serves the history endpoints with
+      the anon key, but `grade_history` had RLS enabled with no policies,
+      so every batch failed and stayed in the spool. anon may now read
+      and insert rows. Updates and deletes remain rejected by the
+      append-only trigger and have no policy.
+*/
+
+DROP POLICY IF EXISTS "API can read grade history" ON grade_history;
+CREATE POLICY "API can read grade history" ON grade_history FOR SELECT TO anon USING (true);
+DROP POLICY IF EXISTS "API can append grade history" ON grade_history;
+CREATE POLICY "API can append grade history" ON grade_history FOR INSERT TO anon WITH CHECK (true);
+
+GRANT SELECT, INSERT ON grade_history TO anon;
+
+NOTIFY pgrst, 'reload schema';
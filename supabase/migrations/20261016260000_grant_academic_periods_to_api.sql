@@ -0,0 +1,42 @@
+/*
+  # Academic periods from the API
+
+  1. Security
+    - The API and manage_periods.py read institutions and periods with the
+      anon key, but both tables only allowed `authenticated` (periods) or
+      nobody (institutions). anon may now read them.
+    - `academic_period_for`, `close_academic_period` and
+      `activate_academic_period` run as their owner (`SECURITY DEFINER`)
+      with a fixed `search_path`: they create periods and archive courses,
+      enrollments and grades, which anon may not write directly. They stay
+      executable by anon, the role the API and the script connect with.
+*/
+
+DROP POLICY IF EXISTS "API can read institutions" ON institutions;
+CREATE POLICY "API can read institutions" ON institutions FOR SELECT TO anon USING (true);
+DROP POLICY IF EXISTS "API can read periods" ON academic_periods;
+CREATE POLICY "API can read periods" ON academic_periods FOR SELECT TO anon USING (true);
+
+GRANT SELECT ON institutions TO anon;
+GRANT SELECT ON academic_periods TO anon;
+
+ALTER FUNCTION academic_period_for(uuid, text)
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+ALTER FUNCTION close_academic_period(uuid)
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+ALTER FUNCTION activate_academic_period(uuid)
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+REVOKE EXECUTE ON FUNCTION academic_period_for(uuid, text) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION close_academic_period(uuid) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION activate_academic_period(uuid) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION academic_period_for(uuid, text) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION close_academic_period(uuid) TO anon;
+GRANT EXECUTE ON FUNCTION activate_academic_period(uuid) TO anon;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,12 @@
+/*
+  # Final grade backfill with the API key
+
+  1. Security
+    - backfill_final_grades.py calls `recompute_final_grades` with the
+      anon key the API uses, but the function was only granted to
+      `authenticated`.
+*/
+
+GRANT EXECUTE ON FUNCTION recompute_final_grades(uuid) TO anon;
+
+NOTIFY pgrst, 'reload schema';
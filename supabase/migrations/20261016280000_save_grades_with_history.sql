@@ -0,0 +1,63 @@
+/*
+  # Save grades and their history in one statement
+
+  1. Functions
+    - `save_grades(p_course_id uuid, p_grades jsonb, p_changed_by uuid)`:
+      applies `[{"enrollment_id": ..., "corte1": ..., "corte2": ..., "corte3": ...}]`
+      to the grades of the course and returns the saved rows. Cortes that
+      are missing or null keep their stored value. Enrollments outside the
+      course are skipped.
+    - Each row is locked and read in the same statement that updates it.
+      A `grade_history` row holding only the fields that changed is then
+      written, so the history can neither miss nor invent a change made by
+      a concurrent write. The API no longer reads the previous grade
+      before writing.
+*/
+
+CREATE OR REPLACE FUNCTION save_grades(p_course_id uuid, p_grades jsonb, p_changed_by uuid)
+RETURNS SETOF grades
+LANGUAGE sql
+AS $$
+  WITH input AS (
+    SELECT *
+      FROM jsonb_to_recordset(p_grades) AS x(enrollment_id uuid, corte1 numeric, corte2 numeric, corte3 numeric)
+  ),
+  previous AS (
+    SELECT g.id, g.corte1, g.corte2, g.corte3, g.final_grade,
+           i.corte1 AS new_corte1, i.corte2 AS new_corte2, i.corte3 AS new_corte3
+      FROM grades g
+      JOIN input i ON i.enrollment_id = g.enrollment_id
+     WHERE g.course_id = p_course_id
+       FOR UPDATE OF g
+  ),
+  saved AS (
+    UPDATE grades g
+       SET corte1 = COALESCE(p.new_corte1, g.corte1),
+           corte2 = COALESCE(p.new_corte2, g.corte2),
+           corte3 = COALESCE(p.new_corte3, g.corte3),
+           last_updated = now()
+      FROM previous p
+     WHERE g.id = p.id
+    RETURNING g AS grade,
+              jsonb_build_object('corte1', p.corte1, 'corte2', p.corte2, 'corte3', p.corte3, 'final_grade', p.final_grade) AS before
+  ),
+  history AS (
+    INSERT INTO grade_history (enrollment_id, course_id, student_id, changed_by, changed_at, changes)
+    SELECT (s.grade).enrollment_id, (s.grade).course_id, (s.grade).student_id, p_changed_by, (s.grade).last_updated, changed.changes
+      FROM saved s
+     CROSS JOIN LATERAL (
+       SELECT jsonb_object_agg(after.key, after.value) AS changes
+         FROM jsonb_each(jsonb_build_object(
+                'corte1', (s.grade).corte1,
+                'corte2', (s.grade).corte2,
+                'corte3', (s.grade).corte3,
+                'final_grade', (s.grade).final_grade
+              )) AS after
+        WHERE after.value IS DISTINCT FROM s.before -> after.key
+     ) changed
+     WHERE changed.changes IS NOT NULL
+  )
+  SELECT (s.grade).* FROM saved s;
+$$;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,21 @@
+/*
+  # Notification archive under RLS
+
+  1. Security
+    - `archive_read_notifications` runs as its owner (`SECURITY DEFINER`)
+      with a fixed `search_path`. `notifications_archive` has RLS enabled and
+      no policies, so the insert into it failed when the API's archiver
+      called the function with the anon key.
+    - Only the API (anon key) may call it; EXECUTE is revoked from PUBLIC and
+      `authenticated` so signed-in users cannot archive other users'
+      notifications.
+*/
+
+ALTER FUNCTION archive_read_notifications(interval, integer)
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+REVOKE EXECUTE ON FUNCTION archive_read_notifications(interval, integer) FROM PUBLIC, authenticated;
+GRANT EXECUTE ON FUNCTION archive_read_notifications(interval, integer) TO anon;
+
+NOTIFY pgrst, 'reload schema';
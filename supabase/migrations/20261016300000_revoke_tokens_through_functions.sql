@@ -0,0 +1,81 @@
+/*
+  # Token revocation writes through functions
+
+  1. Security
+    - anon no longer inserts into or updates `revoked_tokens` and
+      `user_token_revocations`. The UPDATE policies let anyone holding the
+      anon key shorten a revocation or move a user's cut-off back, bringing
+      revoked tokens back to life. anon keeps SELECT for the sync.
+    - Writes go through the functions below. They run as their owner
+      (`SECURITY DEFINER`) with a fixed `search_path`, and only anon may
+      call them.
+
+  2. Functions
+    - `revoke_token(p_jti text, p_expires_at timestamptz)`: records a
+      revoked token. An existing row keeps the later of both expiries.
+    - `consume_token(p_jti text, p_expires_at timestamptz)`: records a
+      single-use token and returns whether this call recorded it, so only
+      one of several concurrent refreshes succeeds.
+    - `revoke_user_tokens(p_user_id uuid, p_revoked_before timestamptz)`:
+      revokes every token of the user issued before `p_revoked_before`. An
+      existing cut-off is only ever moved forward.
+*/
+
+DROP POLICY IF EXISTS "API can revoke tokens" ON revoked_tokens;
+DROP POLICY IF EXISTS "API can extend revoked tokens" ON revoked_tokens;
+DROP POLICY IF EXISTS "API can revoke user tokens" ON user_token_revocations;
+DROP POLICY IF EXISTS "API can move user revocations" ON user_token_revocations;
+
+REVOKE INSERT, UPDATE ON revoked_tokens FROM anon;
+REVOKE INSERT, UPDATE ON user_token_revocations FROM anon;
+
+CREATE OR REPLACE FUNCTION revoke_token(p_jti text, p_expires_at timestamptz)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+  INSERT INTO revoked_tokens AS revoked (jti, expires_at, revoked_at)
+  VALUES (p_jti, p_expires_at, now())
+  ON CONFLICT (jti)
+  DO UPDATE SET expires_at = GREATEST(revoked.expires_at, EXCLUDED.expires_at),
+                revoked_at = now();
+$$;
+
+CREATE OR REPLACE FUNCTION consume_token(p_jti text, p_expires_at timestamptz)
+RETURNS boolean
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+  WITH inserted AS (
+    INSERT INTO revoked_tokens (jti, expires_at, revoked_at)
+    VALUES (p_jti, p_expires_at, now())
+    ON CONFLICT (jti) DO NOTHING
+    RETURNING jti
+  )
+  SELECT EXISTS (SELECT 1 FROM inserted);
+$$;
+
+CREATE OR REPLACE FUNCTION revoke_user_tokens(p_user_id uuid, p_revoked_before timestamptz)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+  INSERT INTO user_token_revocations AS revocations (user_id, revoked_before, revoked_at)
+  VALUES (p_user_id, p_revoked_before, now())
+  ON CONFLICT (user_id)
+  DO UPDATE SET revoked_before = GREATEST(revocations.revoked_before, EXCLUDED.revoked_before),
+                revoked_at = now();
+$$;
+
+REVOKE EXECUTE ON FUNCTION revoke_token(text, timestamptz) FROM PUBLIC, authenticated;
+REVOKE EXECUTE ON FUNCTION consume_token(text, timestamptz) FROM PUBLIC, authenticated;
+REVOKE EXECUTE ON FUNCTION revoke_user_tokens(uuid, timestamptz) FROM PUBLIC, authenticated;
+
+GRANT EXECUTE ON FUNCTION revoke_token(text, timestamptz) TO anon;
+GRANT EXECUTE ON FUNCTION consume_token(text, timestamptz) TO anon;
+GRANT EXECUTE ON FUNCTION revoke_user_tokens(uuid, timestamptz) TO anon;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,22 @@
+/*
+  # Final grade backfill for the service role only
+
+  1. Security
+    - `recompute_final_grades` rewrites every grade and is not part of the
+      API, so anon may no longer execute it; the grant added in
+      20261016270000 let anyone with the anon key run it.
+      backfill_final_grades.py now connects with the service-role key.
+    - `recompute_course_final_grades`, the trigger that recomputes a
+      course's grades when the API changes its weights, runs as its owner
+      (`SECURITY DEFINER`) with a fixed `search_path`, so it can still call
+      `recompute_final_grades` for the course being updated.
+*/
+
+ALTER FUNCTION recompute_course_final_grades()
+  SECURITY DEFINER
+  SET search_path = public, pg_temp;
+
+REVOKE EXECUTE ON FUNCTION recompute_final_grades(uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION recompute_final_grades(uuid) TO service_role;
+
+NOTIFY pgrst, 'reload schema';
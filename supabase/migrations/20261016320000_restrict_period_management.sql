@@ -0,0 +1,19 @@
+/*
+  # Period management for the service role only
+
+  1. Security
+    - `close_academic_period` and `activate_academic_period` archive whole
+      periods and are not part of the API, so anon may no longer execute
+      them; the grants added in 20261016260000 let anyone with the anon key
+      close a period. manage_periods.py now connects with the service-role
+      key.
+    - `academic_period_for` stays executable by anon and `authenticated`;
+      the API calls it when creating courses.
+*/
+
+REVOKE EXECUTE ON FUNCTION close_academic_period(uuid) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION activate_academic_period(uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION close_academic_period(uuid) TO service_role;
+GRANT EXECUTE ON FUNCTION activate_academic_period(uuid) TO service_role;
+
+NOTIFY pgrst, 'reload schema';
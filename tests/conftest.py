@@ -0,0 +1,73 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_BACKEND", "memory")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("REPORT_EXECUTOR", "thread")
+os.environ.setdefault("NOTIFICATION_SPOOL_PATH", "")
+os.environ.setdefault("TOKEN_REVOCATION_SYNC_INTERVAL", "0")
+os.environ.setdefault("NOTIFICATION_ARCHIVE_INTERVAL", "0")
+os.environ.setdefault("PERIOD_SYNC_INTERVAL", "0")
+
+PASSWORD = "secret-password"
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    from fastapi.testclient import TestClient
+
+    import server
+
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(app_client):
+    """The API over an emptied memory database; the app itself starts once per session."""
+    from database import memory_store
+
+    memory_store().clear()
+    return app_client
+
+
+def register(client, role: str) -> dict:
+    """Register a new user and return its auth headers, with the user under ``"user"``."""
+    email = f"{role}-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post("/api/auth/register", json={"full_name": f"{role.title()} {email[:12]}", "email": email, "password": PASSWORD, "role": role})
+    assert response.status_code == 200, response.text
+    tokens = response.json()
+    return {"Authorization": f"Bearer {tokens['access_token']}", "user": tokens["user"], "refresh_token": tokens["refresh_token"]}
+
+
+def auth(user: dict) -> dict:
+    return {"Authorization": user["Authorization"]}
+
+
+@pytest.fixture
+def teacher(client):
+    return register(client, "teacher")
+
+
+@pytest.fixture
+def student(client):
+    return register(client, "student")
+
+
+@pytest.fixture
+def course(client, teacher, student):
+    """A course of ``teacher`` in period 2026-1 with ``student`` enrolled."""
+    response = client.post("/api/courses", json={"name": "Cálculo", "code": f"MAT-{uuid.uuid4().hex[:6]}", "description": "d", "academic_period": "2026-1"}, headers=auth(teacher))
+    assert response.status_code == 200, response.text
+    course = response.json()
+    enrolled = client.post("/api/courses/enroll", json={"access_code": course["access_code"]}, headers=auth(student))
+    assert enrolled.status_code == 200, enrolled.text
+    return course
@@ -0,0 +1,192 @@
+import asyncio
+import fcntl
+import json
+import os
+
+import pytest
+from postgrest import APIError
+
+from batch_writer import BatchWriter, rows_rejected
+
+
+class FakeTable:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    async def execute(self):
+        self.client.calls += 1
+        if self.client.down:
+            raise APIError({"message": "upstream unavailable", "code": "PGRST000", "hint": None, "details": None})
+        if any(row.get("bad") for row in self.rows):
+            raise APIError({"message": "violates foreign key constraint", "code": "23503", "hint": None, "details": None})
+        self.client.written.extend(self.rows)
+
+
+class FakeClient:
+    def __init__(self, down=False):
+        self.down = down
+        self.calls = 0
+        self.written = []
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def upsert(self, rows, **kwargs):
+                return FakeTable(client, rows)
+        return Query()
+
+
+class Writer(BatchWriter):
+    table = "events"
+
+
+def _rows(*ids, bad=()):
+    return [{"id": row_id, "bad": row_id in bad} for row_id in ids]
+
+
+def _ids(rows):
+    return [row["id"] for row in rows]
+
+
+def _read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_rejected_rows_are_dead_lettered_and_the_rest_written(tmp_path):
+    writer = Writer(batch_size=8, spool_path=tmp_path / "events.spool")
+    client = FakeClient()
+
+    async def run():
+        await writer.start(client)
+        await writer.append(_rows(*"abcdefgh", bad=("c", "h")))
+        await writer.stop()
+    asyncio.run(run())
+
+    assert _ids(client.written) == list("abdefg")
+    assert writer.queue_depth == 0
+    assert writer.dead_lettered_total == 2
+    assert [line["row"]["id"] for line in _read_lines(tmp_path / "events.dead")] == ["c", "h"]
+    assert _read_lines(tmp_path / "events.dead")[0]["reason"].startswith("23503")
+
+
+def test_transient_failures_keep_rows_spooled_until_the_database_is_back(tmp_path):
+    writer = Writer(batch_size=2, spool_path=tmp_path / "events.spool")
+    client = FakeClient(down=True)
+
+    async def run():
+        await writer.start(client)
+        await writer.append(_rows("a", "b", "c"))
+        assert await writer.flush() == 0
+        spooled = _ids(_read_lines(writer._own_spool))
+        client.down = False
+        written = await writer.flush()
+        await writer.stop()
+        return spooled, written
+    spooled, written = asyncio.run(run())
+
+    assert spooled == ["a", "b", "c"]
+    assert written == 3
+    assert writer.flush_failures == 1
+    assert writer.dead_lettered_total == 0
+    assert _ids(client.written) == ["a", "b", "c"]
+    assert list(tmp_path.glob("*.spool")) == []
+
+
+def test_pending_rows_are_capped():
+    writer = Writer(max_pending=3)
+
+    assert _ids(asyncio.run(writer.append(_rows("a", "b")))) == ["a", "b"]
+    assert _ids(asyncio.run(writer.append(_rows("c", "d", "e")))) == ["c"]
+
+    assert writer.queue_depth == 3
+    assert writer.dropped_total == 2
+    assert writer.enqueued_total == 3
+
+
+def test_appended_rows_are_spooled_before_any_flush(tmp_path):
+    writer = Writer(flush_interval=3600, spool_path=tmp_path / "events.spool")
+
+    async def run():
+        await writer.start(FakeClient())
+        await writer.append(_rows("a", "b"))
+        await writer.append(_rows("c"))
+        spooled = _ids(_read_lines(writer._own_spool))
+        await writer.stop()
+        return spooled
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+    assert list(tmp_path.glob("*.spool")) == []
+
+
+def test_concurrent_appends_share_one_spool_write(tmp_path, monkeypatch):
+    writer = Writer(flush_interval=3600, spool_path=tmp_path / "events.spool")
+    writes = []
+    append_spool = writer._append_spool
+    monkeypatch.setattr(writer, "_append_spool", lambda rows: (writes.append(_ids(rows)), append_spool(rows)))
+
+    async def run():
+        await writer.start(FakeClient())
+        await asyncio.gather(*(writer.append(_rows(row_id)) for row_id in "abc"))
+        spooled = _ids(_read_lines(writer._own_spool))
+        await writer.stop()
+        return spooled
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+    assert writes == [["a", "b", "c"]]
+
+
+def test_spools_of_stopped_processes_are_adopted(tmp_path):
+    orphan = tmp_path / "events.999999.spool"
+    orphan.write_text(json.dumps({"id": "a"}) + "\n" + json.dumps({"id": "b"}) + "\n")
+    (tmp_path / "events.spool").write_text(json.dumps({"id": "b"}) + "\n" + json.dumps({"id": "c"}) + "\n")
+    writer = Writer(spool_path=tmp_path / "events.spool")
+    client = FakeClient(down=True)
+
+    async def run():
+        await writer.start(client)
+        await writer.flush()
+    asyncio.run(run())
+
+    assert sorted(_ids(writer._pending)) == ["a", "b", "c"]
+    assert not orphan.exists()
+    assert not (tmp_path / "events.spool").exists()
+    assert writer._own_spool.name == f"events.{os.getpid()}.spool"
+    assert sorted(_ids(_read_lines(writer._own_spool))) == ["a", "b", "c"]
+
+
+def test_spools_of_running_processes_are_left_alone(tmp_path):
+    live = tmp_path / "events.999998.spool"
+    live.write_text(json.dumps({"id": "a"}) + "\n")
+    lock = open(tmp_path / "events.999998.spool.lock", "a")
+    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    writer = Writer(spool_path=tmp_path / "events.spool")
+
+    try:
+        asyncio.run(writer.start(FakeClient(down=True)))
+    finally:
+        lock.close()
+
+    assert writer.queue_depth == 0
+    assert live.exists()
+
+
+def test_writer_restarts_on_a_new_event_loop():
+    writer = Writer(flush_interval=0.01)
+    client = FakeClient()
+
+    for row_id in ("a", "b"):
+        async def run():
+            await writer.start(client)
+            await writer.append(_rows(row_id))
+            await asyncio.sleep(0.05)
+            await writer.stop()
+        asyncio.run(run())
+
+    assert _ids(client.written) == ["a", "b"]
+
+
+@pytest.mark.parametrize("code, rejected", [("23505", True), ("22P02", True), ("42501", False), ("PGRST000", False), (None, False)])
+def test_only_data_errors_are_dead_lettered(code, rejected):
+    assert rows_rejected(APIError({"message": "m", "code": code, "hint": None, "details": None})) is rejected
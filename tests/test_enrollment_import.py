@@ -0,0 +1,80 @@
+import pytest
+
+from tests.conftest import auth, register
+from enrollment_import import InvalidImport, read_emails
+
+
+def test_email_column_is_found_by_header():
+    content = "nombre;Correo Electrónico\nAna;ana@example.com\n\nLuis;luis@example.com\n".encode("utf-8-sig")
+
+    assert read_emails(content, 10) == [(2, "ana@example.com"), (4, "luis@example.com")]
+
+
+def test_first_column_is_used_without_a_header():
+    assert read_emails(b"ana@example.com,x\n luis@example.com ,y\n", 10) == [(1, "ana@example.com"), (2, "luis@example.com")]
+
+
+def test_short_rows_yield_empty_emails():
+    assert read_emails(b"id,email\n1\n2,b@example.com\n", 10) == [(2, ""), (3, "b@example.com")]
+
+
+@pytest.mark.parametrize("content, message", [
+    (b"ana@example.com\xe9\n", "UTF-8"),
+    (b"email\n" + b"a@example.com\n" * 4, "Máximo 3"),
+])
+def test_unreadable_or_oversized_files_are_rejected(content, message):
+    with pytest.raises(InvalidImport, match=message):
+        read_emails(content, 3)
+
+
+def test_import_enrolls_students_and_reports_each_row(client, teacher, course, student):
+    other_teacher = register(client, "teacher")
+    new_student = register(client, "student")
+    rows = [
+        "nombre,email",
+        f"Nueva,{new_student['user']['email']}",
+        f"Inscrita,{student['user']['email']}",
+        f"Repetida,{new_student['user']['email']}",
+        "Nadie,missing@example.com",
+        f"Docente,{other_teacher['user']['email']}",
+        "",
+        "Sin correo,",
+    ]
+    files = {"file": ("roster.csv", ("\n".join(rows) + "\n").encode(), "text/csv")}
+
+    response = client.post(f"/api/courses/{course['id']}/enrollments/import", files=files, headers=auth(teacher))
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["enrolled"], body["failed"]) == (1, 5)
+    assert [(result["line"], result["success"], result["error"]) for result in body["results"]] == [
+        (2, True, None),
+        (3, False, "Ya está inscrito en este curso"),
+        (4, False, "Correo repetido en el archivo"),
+        (5, False, "Usuario no encontrado"),
+        (6, False, "El usuario no es estudiante"),
+        (8, False, "Fila sin correo"),
+    ]
+    students = client.get(f"/api/courses/{course['id']}/students", headers=auth(teacher)).json()
+    assert {user["id"] for user in students} == {student["user"]["id"], new_student["user"]["id"]}
+
+
+def test_import_of_another_teachers_course_is_not_found(client, course):
+    other_teacher = register(client, "teacher")
+    files = {"file": ("roster.csv", b"email\na@example.com\n", "text/csv")}
+
+    assert client.post(f"/api/courses/{course['id']}/enrollments/import", files=files, headers=auth(other_teacher)).status_code == 404
+
+
+def test_import_matches_emails_ignoring_case(client, teacher, course):
+    new_student = register(client, "student")
+    email = new_student["user"]["email"]
+    files = {"file": ("roster.csv", f"email\n{email.upper()}\n{email}\n".encode(), "text/csv")}
+
+    response = client.post(f"/api/courses/{course['id']}/enrollments/import", files=files, headers=auth(teacher))
+
+    assert response.status_code == 200, response.text
+    assert [(result["email"], result["success"], result["error"]) for result in response.json()["results"]] == [
+        (email.upper(), True, None),
+        (email, False, "Correo repetido en el archivo"),
+    ]
@@ -0,0 +1,30 @@
+from tests.conftest import auth
+from grade_history import changed_fields
+
+
+def test_changed_fields_keeps_only_changed_values():
+    before = {"corte1": 4.0, "corte2": None, "corte3": None, "final_grade": None}
+
+    assert changed_fields(before, {**before, "corte2": 3.5}) == {"corte2": 3.5}
+    assert changed_fields(before, dict(before)) == {}
+
+
+def _history(client, teacher, enrollment_id):
+    response = client.get(f"/api/grades/history/enrollment/{enrollment_id}", headers=auth(teacher))
+    assert response.status_code == 200, response.text
+    return [entry["changes"] for entry in reversed(response.json())]
+
+
+def test_grade_entry_records_only_what_changed(client, teacher, course):
+    [grade] = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()
+    enrollment_id = grade["enrollment_id"]
+
+    for body in ({"corte1": 4.0}, {"corte1": 4.0, "corte2": 3.0}, {"corte1": 4.0, "corte2": 3.0}, {"corte3": 5.0}):
+        response = client.post("/api/grades", json={"enrollment_id": enrollment_id, **body}, headers=auth(teacher))
+        assert response.status_code == 200, response.text
+
+    assert _history(client, teacher, enrollment_id) == [
+        {"corte1": 4.0},
+        {"corte2": 3.0},
+        {"corte3": 5.0, "final_grade": 4.0},
+    ]
@@ -0,0 +1,108 @@
+import asyncio
+import csv
+import io
+import zipfile
+
+import pytest
+
+from tests.conftest import auth
+from enrollment_import import InvalidImport
+from gradebook import csv_chunks, read_grades, xlsx_chunks
+
+
+async def _pages(*pages):
+    for page in pages:
+        yield page
+
+
+def _collect(chunks) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in chunks])
+    return asyncio.run(run())
+
+
+def _grade(enrollment_id="e1", student_name="Ana", corte1=4.0, corte2=None, corte3=None, final_grade=None):
+    return {"enrollment_id": enrollment_id, "student_name": student_name, "corte1": corte1, "corte2": corte2, "corte3": corte3, "final_grade": final_grade}
+
+
+def _read(content: bytes, filename="notas.csv", max_rows=100):
+    return read_grades(io.BytesIO(content), filename, max_rows)
+
+
+def test_csv_import_reads_grades_by_header():
+    rows = _read(b"estudiante;enrollment_id;corte2;corte1\nAna;e1;3,5;4\nLuis;e2;;\n")
+
+    assert rows == [
+        (2, "e1", {"corte1": 4.0, "corte2": 3.5, "corte3": None}, None),
+        (3, "e2", {"corte1": None, "corte2": None, "corte3": None}, None),
+    ]
+
+
+@pytest.mark.parametrize("value", ["nan", "NaN", "inf", "-inf", "1e999", "abc"])
+def test_csv_import_rejects_non_numeric_and_non_finite_grades(value):
+    [(line, enrollment_id, _, error)] = _read(f"enrollment_id,corte1\ne1,{value}\n".encode())
+
+    assert (line, enrollment_id, error) == (2, "e1", "Valor inválido en corte1")
+
+
+def test_import_requires_an_enrollment_id_column():
+    with pytest.raises(InvalidImport, match="enrollment_id"):
+        _read(b"estudiante,corte1\nAna,4\n")
+
+
+def test_import_limits_rows():
+    with pytest.raises(InvalidImport, match="Máximo 2"):
+        _read(b"enrollment_id,corte1\ne1,1\ne2,2\ne3,3\n", max_rows=2)
+
+
+def test_xlsx_export_reads_back():
+    content = _collect(xlsx_chunks(_pages([_grade("e1", "Ana", 4.5)], [_grade("e2", "<Luis & co>", None, 3.0)])))
+
+    assert _read(content, "notas.xlsx") == [
+        (2, "e1", {"corte1": 4.5, "corte2": None, "corte3": None}, None),
+        (3, "e2", {"corte1": None, "corte2": 3.0, "corte3": None}, None),
+    ]
+
+
+def _xlsx(sheet_data: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("xl/worksheets/sheet1.xml", f'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>{sheet_data}</sheetData></worksheet>')
+    return buffer.getvalue()
+
+
+def test_xlsx_import_rejects_cells_beyond_the_last_column():
+    content = _xlsx('<row r="1"><c r="A1" t="inlineStr"><is><t>enrollment_id</t></is></c><c r="ZZZZZZZ1"><v>1</v></c></row>')
+
+    with pytest.raises(InvalidImport, match="XLSX"):
+        _read(content, "notas.xlsx")
+
+
+def test_csv_export_neutralizes_formulas():
+    content = _collect(csv_chunks(_pages([_grade("e1", "=HYPERLINK(\"http://x\")", -1.0), _grade("e2", "@SUM(A1)"), _grade("e3", "Ana")])))
+    rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+
+    assert [row[1] for row in rows[1:]] == ["'=HYPERLINK(\"http://x\")", "'@SUM(A1)", "Ana"]
+    assert rows[1][2] == "-1.0"
+
+
+def test_grade_import_rejects_nan_and_keeps_grades_readable(client, teacher, course):
+    [grade] = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()
+    content = f"enrollment_id,corte1,corte2\n{grade['enrollment_id']},nan,4\n".encode()
+
+    response = client.post(f"/api/grades/import/{course['id']}", files={"file": ("notas.csv", content, "text/csv")}, headers=auth(teacher))
+
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][0]["error"] == "Valor inválido en corte1"
+    grades = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher))
+    assert grades.status_code == 200
+    assert grades.json()[0]["corte1"] is None
+
+
+def test_grade_entry_rejects_nan(client, teacher, course):
+    [grade] = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()
+    body = '{"enrollment_id": "%s", "corte1": NaN}' % grade["enrollment_id"]
+
+    response = client.post("/api/grades", content=body, headers={**auth(teacher), "Content-Type": "application/json"})
+
+    assert response.status_code == 400
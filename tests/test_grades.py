@@ -0,0 +1,45 @@
+from tests.conftest import auth, register
+
+
+def test_bulk_grades_with_different_cortes_keep_the_others(client, teacher, student, course):
+    other = register(client, "student")
+    client.post("/api/courses/enroll", json={"access_code": course["access_code"]}, headers=auth(other))
+    grades = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()
+    first, second = (grade["enrollment_id"] for grade in grades)
+    client.post("/api/grades/bulk", json={"course_id": course["id"], "grades": [
+        {"enrollment_id": first, "corte1": 4.0, "corte2": 3.0, "corte3": 2.0},
+        {"enrollment_id": second, "corte1": 1.0, "corte2": 2.0, "corte3": 3.0},
+    ]}, headers=auth(teacher))
+
+    response = client.post("/api/grades/bulk", json={"course_id": course["id"], "grades": [
+        {"enrollment_id": first, "corte3": 5.0},
+        {"enrollment_id": second, "corte1": 4.5},
+    ]}, headers=auth(teacher))
+
+    assert response.status_code == 200, response.text
+    assert response.json()["updated"] == 2
+    saved = {grade["enrollment_id"]: grade for grade in client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()}
+    assert [saved[first][field] for field in ("corte1", "corte2", "corte3", "final_grade")] == [4.0, 3.0, 5.0, 4.0]
+    assert [saved[second][field] for field in ("corte1", "corte2", "corte3")] == [4.5, 2.0, 3.0]
+
+
+def test_bulk_save_reports_rejected_rows_and_records_history(client, teacher, student, course):
+    [grade] = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()
+    enrollment_id = grade["enrollment_id"]
+
+    response = client.post("/api/grades/bulk", json={"course_id": course["id"], "grades": [
+        {"enrollment_id": enrollment_id, "corte1": 4.0},
+        {"enrollment_id": enrollment_id, "corte1": 1.0},
+        {"enrollment_id": "00000000-0000-0000-0000-000000000000", "corte1": 3.0},
+        {"enrollment_id": "11111111-1111-1111-1111-111111111111", "corte2": 7.0},
+    ]}, headers=auth(teacher))
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["updated"], body["failed"]) == (1, 3)
+    assert [result["error"] for result in body["results"]] == [
+        None, "Inscripción repetida en la solicitud", "Inscripción no encontrada en este curso", "Las notas deben estar entre 0.0 y 5.0",
+    ]
+    assert body["results"][0]["grade"]["corte1"] == 4.0
+    history = client.get(f"/api/grades/history/enrollment/{enrollment_id}", headers=auth(teacher)).json()
+    assert [entry["changes"] for entry in history] == [{"corte1": 4.0}]
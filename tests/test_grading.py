@@ -0,0 +1,58 @@
+import pytest
+
+from tests.conftest import auth
+from grading import DEFAULT_GRADE_WEIGHTS, calculate_final_grade, course_weights, weights_valid
+
+
+def test_final_grade_needs_all_three_cortes():
+    assert calculate_final_grade(4.0, 3.0, None) is None
+    assert calculate_final_grade(4.0, 3.0, 5.0) == 4.0
+    assert calculate_final_grade(4.0, 3.0, 5.0, (0.2, 0.3, 0.5)) == 4.2
+
+
+def test_course_weights_default_missing_values():
+    assert course_weights({}) == DEFAULT_GRADE_WEIGHTS
+    assert course_weights({"weight_corte1": 0.5, "weight_corte2": None, "weight_corte3": 0.2}) == (0.5, DEFAULT_GRADE_WEIGHTS[1], 0.2)
+
+
+@pytest.mark.parametrize("weights", [DEFAULT_GRADE_WEIGHTS, (0.333, 0.333, 0.334), (1, 0, 0), (0.1, 0.2, 0.7)])
+def test_weights_valid_accepts_thousandths_adding_up_to_one(weights):
+    assert weights_valid(weights)
+
+
+@pytest.mark.parametrize("weights", [
+    (0.3333, 0.3333, 0.3334),
+    (0.3, 0.3, 0.3),
+    (0.5, 0.6, -0.1),
+    (1.5, -0.25, -0.25),
+    (float("nan"), 0.5, 0.5),
+    (float("inf"), 0.5, 0.5),
+])
+def test_weights_valid_rejects_what_the_database_would(weights):
+    assert not weights_valid(weights)
+
+
+def _create_course(client, teacher, body: str):
+    return client.post("/api/courses", content=body, headers={**auth(teacher), "Content-Type": "application/json"})
+
+
+@pytest.mark.parametrize("weights", ["0.3333, 0.3333, 0.3334", "NaN, 0.5, 0.5", "0.5, 0.5, null"])
+def test_course_creation_rejects_invalid_weights(client, teacher, weights):
+    first, second, third = weights.split(", ")
+    body = '{"name": "C", "code": "W-1", "description": "d", "academic_period": "2026-1", "weight_corte1": %s, "weight_corte2": %s, "weight_corte3": %s}' % (first, second, third)
+
+    response = _create_course(client, teacher, body)
+
+    assert response.status_code == 400
+
+
+def test_course_weights_drive_final_grades(client, teacher, student):
+    body = '{"name": "C", "code": "W-2", "description": "d", "academic_period": "2026-1", "weight_corte1": 0.2, "weight_corte2": 0.3, "weight_corte3": 0.5}'
+    course = _create_course(client, teacher, body).json()
+    client.post("/api/courses/enroll", json={"access_code": course["access_code"]}, headers=auth(student))
+    [grade] = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()
+
+    saved = client.post("/api/grades", json={"enrollment_id": grade["enrollment_id"], "corte1": 4.0, "corte2": 3.0, "corte3": 5.0}, headers=auth(teacher))
+
+    assert saved.status_code == 200, saved.text
+    assert saved.json()["final_grade"] == 4.2
@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+
+import server
+from metrics import DatabaseInstrumentation, Registry, RequestStats, current_request, query_shape
+
+
+def test_query_shape_keeps_names_and_drops_values():
+    assert query_shape("select=id%2Cemail&reset_token=eq.abc123&email=eq.ana%40example.com&limit=1") == "select&reset_token&email&limit"
+    assert query_shape("or=(email.eq.a%40b.co,id.eq.1)&or=(x.eq.1)") == "or"
+    assert query_shape("") == ""
+
+
+def test_request_stats_record_queries_without_filter_values():
+    instrumentation = DatabaseInstrumentation(Registry())
+    request = httpx.Request("GET", "http://db/rest/v1/users?select=id&reset_token=eq.secret-token")
+    request.extensions["metrics_started"] = 0.0
+    stats = RequestStats()
+
+    async def record():
+        current_request.set(stats)
+        await instrumentation._on_response(httpx.Response(200, request=request))
+    asyncio.run(record())
+
+    [(method, resource, status, _)] = stats.queries
+    assert (method, resource, status) == ("GET", "users?select&reset_token", 200)
+
+
+def test_metrics_need_the_configured_token(client, monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "")
+    assert client.get("/metrics", headers={"Authorization": "Bearer anything"}).status_code == 404
+
+    monkeypatch.setattr(server, "METRICS_TOKEN", "scrape-token")
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
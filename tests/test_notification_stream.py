@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import Request
+
+import server
+from database import memory_store
+from notification_stream import NotificationHub
+
+
+async def _never_disconnects():
+    await asyncio.sleep(3600)
+
+
+def _events(user, last_event_id=None):
+    """The events a stream sends until it goes idle, as (id, event) pairs.
+
+    A stream sends its backlog and a heartbeat, then the replayed and live
+    events; the next heartbeat means nothing else is queued.
+    """
+    headers = [(b"last-event-id", last_event_id.encode())] if last_event_id is not None else []
+    request = Request({"type": "http", "method": "GET", "path": "/api/notifications/stream", "headers": headers}, _never_disconnects)
+
+    async def read():
+        response = await server.stream_notifications(request, None, user["user"])
+        chunks, heartbeats = [], 0
+        async for chunk in response.body_iterator:
+            if chunk.startswith(":"):
+                heartbeats += 1
+                if heartbeats == 2:
+                    break
+            else:
+                chunks.append(chunk)
+        await response.body_iterator.aclose()
+        return chunks
+
+    events = []
+    for chunk in asyncio.run(read()):
+        fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+        events.append((fields["id"], fields["event"]))
+    return events
+
+
+@pytest.fixture(autouse=True)
+def fast_heartbeat(monkeypatch):
+    monkeypatch.setattr(server.notification_hub, "heartbeat_interval", 0.02)
+
+
+def _publish(user: dict, count: int) -> list:
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+
+    async def publish():
+        for event_id in ids:
+            await server.notification_hub.publish(user["user"]["id"], "notification", {"id": event_id}, event_id=event_id)
+
+    asyncio.run(publish())
+    return ids
+
+
+def test_hub_replays_only_buffered_events():
+    hub = NotificationHub(history_size=2)
+
+    async def publish_three():
+        await hub.start()
+        for event_id in ("a", "b", "c"):
+            await hub.publish("u1", "notification", {}, event_id=event_id)
+
+    asyncio.run(publish_three())
+
+    assert [event["id"] for event in hub.replay("u1", "b")] == ["c"]
+    assert hub.replay("u1", "c") == []
+    assert hub.replay("u1", "a") is None
+    assert hub.replay("u2", "a") is None
+
+
+def test_stream_resumes_after_a_buffered_last_event_id(client, student):
+    first, second, third = _publish(student, 3)
+
+    assert _events(student, first) == [(second, "notification"), (third, "notification")]
+    assert _events(student, third) == []
+
+
+def test_stream_catches_up_from_the_database_when_the_event_left_the_buffer(client, student):
+    now = datetime.now(timezone.utc)
+    ids = [str(uuid.uuid4()) for _ in range(3)]
+    memory_store().seed("notifications", [
+        {"id": notification_id, "user_id": student["user"]["id"], "message": "m", "type": "grade_update", "read": False,
+         "created_at": (now - timedelta(minutes=3 - index)).isoformat()}
+        for index, notification_id in enumerate(ids)
+    ])
+
+    assert _events(student, ids[0]) == [(ids[1], "notification"), (ids[2], "notification")]
+
+
+def test_stream_asks_for_a_resync_when_the_last_event_is_unknown(client, student):
+    unknown = str(uuid.uuid4())
+
+    assert _events(student, unknown) == [(unknown, "resync")]
+    assert _events(student) == []
@@ -0,0 +1,78 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import server
+from tests.conftest import auth
+from database import memory_store
+from notifications import NotificationArchiver, NotificationPipeline
+
+
+def _notify(user: dict, read=False, age=timedelta(0)) -> str:
+    notification_id = str(uuid.uuid4())
+    created_at = (datetime.now(timezone.utc) - age).isoformat()
+    memory_store().seed("notifications", [{"id": notification_id, "user_id": user["user"]["id"], "message": "m", "type": "grade", "read": read, "created_at": created_at}])
+    return notification_id
+
+
+def _unread(client, user) -> int:
+    response = client.get("/api/notifications/unread-count", headers=auth(user))
+    assert response.status_code == 200, response.text
+    return response.json()["unread"]
+
+
+def test_unread_count_follows_bulk_mark_read(client, teacher, student):
+    first, second, _ = (_notify(student) for _ in range(3))
+    _notify(student, read=True)
+    _notify(teacher)
+
+    assert _unread(client, student) == 3
+
+    response = client.put("/api/notifications/read", json={"ids": [first, second, first]}, headers=auth(student))
+    assert response.json() == {"updated": 2}
+    assert _unread(client, student) == 1
+
+    assert client.put("/api/notifications/read", json={}, headers=auth(student)).json() == {"updated": 1}
+    assert _unread(client, student) == 0
+    assert _unread(client, teacher) == 1
+
+
+def test_bulk_mark_read_ignores_other_users_notifications(client, teacher, student):
+    others = _notify(teacher)
+
+    assert client.put("/api/notifications/read", json={"ids": [others]}, headers=auth(student)).json() == {"updated": 0}
+    assert _unread(client, teacher) == 1
+
+
+def test_bulk_mark_read_rejects_empty_id_lists(client, student):
+    assert client.put("/api/notifications/read", json={"ids": []}, headers=auth(student)).status_code == 400
+
+
+def test_archiver_moves_only_old_read_notifications(client, student):
+    old_read = [_notify(student, read=True, age=timedelta(days=40)) for _ in range(3)]
+    recent_read = _notify(student, read=True)
+    old_unread = _notify(student, age=timedelta(days=40))
+    archiver = NotificationArchiver(older_than=30 * 24 * 3600, batch_size=2, interval=0)
+
+    assert asyncio.run(archiver.run_once(server.db)) == 3
+
+    store = memory_store()
+    assert {row["id"] for row in store.tables["notifications"]} == {recent_read, old_unread}
+    assert sorted(row["id"] for row in store.tables["notifications_archive"]) == sorted(old_read)
+    assert all(row["archived_at"] for row in store.tables["notifications_archive"])
+    assert _unread(client, student) == 1
+
+
+def test_pipeline_coalesces_only_kept_notifications():
+    pipeline = NotificationPipeline(max_pending=2)
+
+    async def enqueue(user_ids):
+        return [notification["user_id"] for notification in await pipeline.enqueue(user_ids, "m", "grade_update", coalesce_key="grades:c1")]
+
+    assert asyncio.run(enqueue(["u1", "u2", "u3"])) == ["u1", "u2"]
+    assert (pipeline.dropped_total, pipeline.coalesced_total) == (1, 0)
+    assert asyncio.run(enqueue(["u1", "u3"])) == []
+    assert (pipeline.dropped_total, pipeline.coalesced_total) == (2, 1)
+
+    pipeline._pending.clear()
+    assert asyncio.run(enqueue(["u3"])) == ["u3"]
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+
+from tests.conftest import auth
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_condition, parse_fields
+
+
+def test_cursor_round_trip():
+    values = ["2026-01-01T00:00:00+00:00", "a7c2"]
+
+    assert decode_cursor(encode_cursor(values), 2) == values
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor(["only-one"]), encode_cursor({"a": 1}), "e30"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as rejected:
+        decode_cursor(cursor, 2)
+
+    assert rejected.value.status_code == 400
+
+
+def test_keyset_condition_selects_rows_after_the_cursor():
+    condition = keyset_condition([("full_name", False), ("id", True)], ['Ana "A", B', "u-1"])
+
+    assert condition == 'full_name.gt."Ana \\"A\\", B",and(full_name.eq."Ana \\"A\\", B",id.lt."u-1")'
+
+
+def test_parse_fields_rejects_unknown_and_deduplicates():
+    assert parse_fields(None, ["id", "name"]) == ["id", "name"]
+    assert parse_fields("name, id, name", ["id", "name"]) == ["name", "id"]
+    with pytest.raises(HTTPException):
+        parse_fields("id,password_hash", ["id", "name"])
+
+
+def _walk(client, teacher, url):
+    pages, cursor = [], None
+    while True:
+        response = client.get(url, params={"cursor": cursor} if cursor else None, headers=auth(teacher))
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_row_once(client, teacher):
+    for index in range(5):
+        response = client.post("/api/courses", json={"name": f"C{index}", "code": f"P-{index}", "description": "d", "academic_period": "2026-1"}, headers=auth(teacher))
+        assert response.status_code == 200, response.text
+    everything = client.get("/api/courses/teacher", headers=auth(teacher)).json()
+
+    pages = _walk(client, teacher, "/api/courses/teacher?limit=2&fields=id,name")
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [course["id"] for page in pages for course in page] == [course["id"] for course in everything]
+    assert all(set(course) == {"id", "name"} for page in pages for course in page)
+
+
+def test_invalid_cursor_and_fields_are_rejected(client, teacher):
+    assert client.get("/api/courses/teacher", params={"cursor": "bogus"}, headers=auth(teacher)).status_code == 400
+    assert client.get("/api/courses/teacher", params={"fields": "id,secret"}, headers=auth(teacher)).status_code == 400
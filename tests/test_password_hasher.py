@@ -0,0 +1,59 @@
+import asyncio
+
+import server
+from tests.conftest import PASSWORD
+from database import memory_store
+from password_hasher import HasherBusy, PasswordHasher, _hash
+
+
+def test_calls_beyond_max_pending_fail_fast():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+
+    async def two_at_once():
+        return await asyncio.gather(hasher.hash("a"), hasher.hash("b"), return_exceptions=True)
+
+    try:
+        first, second = asyncio.run(two_at_once())
+    finally:
+        hasher.shutdown()
+
+    assert first.startswith("$2b$04$")
+    assert isinstance(second, HasherBusy)
+    assert hasher.pending == 0
+
+
+def test_verify_returns_a_new_hash_only_when_the_cost_differs():
+    hasher = PasswordHasher(workers=1, rounds=4)
+    try:
+        assert asyncio.run(hasher.verify("secret", _hash("secret", 4))) == (True, None)
+        assert asyncio.run(hasher.verify("wrong", _hash("secret", 5))) == (False, None)
+        valid, new_hash = asyncio.run(hasher.verify("secret", _hash("secret", 5)))
+    finally:
+        hasher.shutdown()
+
+    assert valid
+    assert new_hash.startswith("$2b$04$")
+
+
+def _login(client, user):
+    return client.post("/api/auth/login", json={"email": user["user"]["email"], "password": PASSWORD})
+
+
+def test_login_rehashes_passwords_with_an_outdated_cost(client, student):
+    [row] = [row for row in memory_store().tables["users"] if row["id"] == student["user"]["id"]]
+    row["password_hash"] = _hash(PASSWORD, 5)
+
+    assert _login(client, student).status_code == 200
+
+    assert row["password_hash"].startswith("$2b$04$")
+    assert _login(client, student).status_code == 200
+
+
+def test_busy_hasher_answers_503_with_retry_after(client, student, monkeypatch):
+    monkeypatch.setattr(server.password_hasher, "max_pending", 0)
+
+    response = _login(client, student)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["detail"] == "Servidor ocupado, intenta de nuevo en unos segundos"
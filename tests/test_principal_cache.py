@@ -0,0 +1,96 @@
+import asyncio
+
+import server
+from tests.conftest import auth
+from principal_cache import PrincipalCache
+
+
+def _loader(results, calls, delay=0.01):
+    async def load(user_id):
+        calls.append(user_id)
+        await asyncio.sleep(delay)
+        result = results[user_id]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return load
+
+
+def test_concurrent_misses_share_one_load():
+    cache, calls = PrincipalCache(), []
+    load = _loader({"u1": {"id": "u1"}}, calls)
+
+    async def burst():
+        return await asyncio.gather(*(cache.get("u1", load) for _ in range(5)))
+
+    assert asyncio.run(burst()) == [{"id": "u1"}] * 5
+    assert calls == ["u1"]
+    assert asyncio.run(cache.get("u1", load)) == {"id": "u1"}
+    assert calls == ["u1"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_failed_and_missing_loads_are_not_cached():
+    cache, calls = PrincipalCache(), []
+    load = _loader({"broken": ConnectionError("down"), "gone": None}, calls)
+
+    async def burst():
+        return await asyncio.gather(cache.get("broken", load), cache.get("broken", load), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(burst())] == [ConnectionError, ConnectionError]
+    assert asyncio.run(cache.get("gone", load)) is None
+    assert asyncio.run(cache.get("gone", load)) is None
+    assert calls == ["broken", "gone", "gone"]
+
+
+def test_invalidate_drops_the_entry_and_any_load_in_flight():
+    cache, calls = PrincipalCache(), []
+    users = {"u1": {"id": "u1", "role": "student"}}
+    load = _loader(users, calls)
+
+    async def invalidated_while_loading():
+        pending = asyncio.ensure_future(cache.get("u1", load))
+        await asyncio.sleep(0)
+        cache.invalidate("u1")
+        return await pending
+
+    assert asyncio.run(invalidated_while_loading()) == {"id": "u1", "role": "student"}
+    assert cache.peek("u1") is None
+
+    asyncio.run(cache.get("u1", load))
+    users["u1"] = {"id": "u1", "role": "teacher"}
+    cache.invalidate("u1")
+    assert asyncio.run(cache.get("u1", load)) == {"id": "u1", "role": "teacher"}
+    assert len(calls) == 3
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("principal_cache.time.monotonic", lambda: now[0])
+    cache = PrincipalCache(ttl=60)
+    cache.put("u1", {"id": "u1"})
+
+    now[0] += 59
+    assert cache.peek("u1") == {"id": "u1"}
+    now[0] += 2
+    assert cache.peek("u1") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PrincipalCache(maxsize=2)
+    cache.put("u1", {"id": "u1"})
+    cache.put("u2", {"id": "u2"})
+    cache.peek("u1")
+    cache.put("u3", {"id": "u3"})
+
+    assert [user_id for user_id in ("u1", "u2", "u3") if cache.peek(user_id)] == ["u1", "u3"]
+
+
+def test_requests_reuse_the_cached_principal(client, student):
+    misses = server.principal_cache.misses
+
+    for _ in range(3):
+        assert client.get("/api/auth/me", headers=auth(student)).status_code == 200
+
+    assert server.principal_cache.misses - misses <= 1
+    assert server.principal_cache.peek(student["user"]["id"])["email"] == student["user"]["email"]
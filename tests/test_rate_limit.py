@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import server
+from rate_limit import Limit, MemoryRateLimitBackend, RateLimited, RateLimiter, client_address, parse_networks
+
+
+def test_limit_parse():
+    limit = Limit.parse("10/minute burst 20")
+    assert (limit.rate, limit.burst) == (10 / 60, 20)
+    assert Limit.parse("3/hour").burst == 3
+    assert Limit.parse("off") is None
+    assert Limit.parse("") is None
+    with pytest.raises(ValueError):
+        Limit.parse("10/fortnight")
+
+
+def test_bucket_allows_the_burst_then_limits_until_refilled(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("rate_limit.time.monotonic", lambda: now[0])
+    limiter = RateLimiter(MemoryRateLimitBackend())
+    limiter.add("login", "2/minute")
+
+    async def attempt(key="1.2.3.4"):
+        await limiter.check("login", key)
+
+    asyncio.run(attempt())
+    asyncio.run(attempt())
+    with pytest.raises(RateLimited) as limited:
+        asyncio.run(attempt())
+    assert limited.value.retry_after == pytest.approx(30)
+    asyncio.run(attempt("5.6.7.8"))
+
+    now[0] += 30
+    asyncio.run(attempt())
+    assert (limiter.allowed, limiter.limited) == (4, 1)
+
+
+def test_disabled_and_unknown_rules_always_pass():
+    limiter = RateLimiter(MemoryRateLimitBackend(), enabled=False)
+    limiter.add("login", "1/minute")
+
+    for _ in range(3):
+        asyncio.run(limiter.check("login", "1.2.3.4"))
+        asyncio.run(limiter.check("other", "1.2.3.4"))
+
+
+def test_backend_errors_let_requests_through():
+    class Broken(MemoryRateLimitBackend):
+        async def take(self, key, limit, cost=1.0):
+            raise ConnectionError("store unavailable")
+    limiter = RateLimiter(Broken())
+    limiter.add("login", "1/minute")
+
+    asyncio.run(limiter.check("login", "1.2.3.4"))
+    assert limiter.errors == 1
+
+
+def test_full_backend_prunes_refilled_buckets_first(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("rate_limit.time.monotonic", lambda: now[0])
+    backend = MemoryRateLimitBackend(maxsize=2)
+    slow, fast = Limit(1 / 3600, 1), Limit(1.0, 1)
+
+    asyncio.run(backend.take("slow", slow))
+    asyncio.run(backend.take("fast", fast))
+    now[0] += 5
+    asyncio.run(backend.take("new", fast))
+
+    assert asyncio.run(backend.take("slow", slow)) > 0
+    assert len(backend) == 2
+
+
+def _scope(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return {"client": (peer, 50000), "headers": headers}
+
+
+def test_client_address_trusts_forwarded_for_only_from_trusted_proxies():
+    proxies = parse_networks("10.0.0.0/8, 127.0.0.1")
+
+    assert client_address(_scope("203.0.113.9", "1.1.1.1")) == "203.0.113.9"
+    assert client_address(_scope("203.0.113.9", "1.1.1.1"), proxies) == "203.0.113.9"
+    assert client_address(_scope("10.0.0.2", "198.51.100.7"), proxies) == "198.51.100.7"
+    assert client_address(_scope("10.0.0.2", "6.6.6.6, 198.51.100.7, 10.0.0.1"), proxies) == "198.51.100.7"
+    assert client_address(_scope("127.0.0.1"), proxies) == "127.0.0.1"
+    assert client_address({"headers": []}, proxies) is None
+
+
+@pytest.fixture
+def limited_login(monkeypatch):
+    monkeypatch.setattr(server.rate_limiter, "enabled", True)
+    monkeypatch.setattr(server.rate_limiter, "backend", MemoryRateLimitBackend())
+    monkeypatch.setitem(server.rate_limiter.rules, "login_ip", Limit.parse("2/minute"))
+
+
+def _login(client):
+    return client.post("/api/auth/login", json={"email": "nobody@example.com", "password": "wrong-password"})
+
+
+def test_login_route_is_limited_per_ip(client, limited_login):
+    assert [_login(client).status_code for _ in range(2)] == [401, 401]
+
+    response = _login(client)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["detail"] == server.RATE_LIMIT_DETAIL
@@ -0,0 +1,41 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from reports import ReportRenderer
+
+
+def crash_once(marker: str) -> int:
+    """Kill the worker process the first time, then succeed."""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return os.getpid()
+
+
+def crash(marker: str) -> int:
+    os._exit(1)
+
+
+def test_broken_pool_is_replaced_and_the_job_retried(tmp_path):
+    renderer = ReportRenderer(workers=1, use_processes=True)
+    try:
+        pid = asyncio.run(renderer.run(crash_once, str(tmp_path / "crashed")))
+    finally:
+        renderer.shutdown()
+
+    assert pid != os.getpid()
+    assert renderer.pool_restarts == 1
+
+
+def test_job_that_keeps_breaking_the_pool_fails(tmp_path):
+    renderer = ReportRenderer(workers=1, use_processes=True)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            asyncio.run(renderer.run(crash, str(tmp_path / "unused")))
+    finally:
+        renderer.shutdown()
+
+    assert renderer.pool_restarts == 1
@@ -0,0 +1,98 @@
+import asyncio
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+import response_cache
+import server
+from tests.conftest import auth
+from database import memory_store
+from memory_schema import close_academic_period
+from response_cache import ResponseCache
+
+
+def _request(if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def _respond(cache: ResponseCache, if_none_match=None, scopes=("course:1",)):
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return JSONResponse({"value": 1})
+
+    response = asyncio.run(cache.respond(_request(if_none_match), "user:/path", list(scopes), load))
+    return response, len(loads)
+
+
+def test_matching_etag_gets_304_without_loading():
+    cache = ResponseCache(ttl=300)
+    first, loads = _respond(cache)
+
+    second, more_loads = _respond(cache, first.headers["ETag"])
+
+    assert (first.status_code, loads) == (200, 1)
+    assert (second.status_code, more_loads) == (304, 0)
+
+
+def test_bump_invalidates_etag_and_cached_body():
+    cache = ResponseCache(ttl=300)
+    first, _ = _respond(cache)
+
+    asyncio.run(cache.bump("course:1"))
+    response, loads = _respond(cache, first.headers["ETag"])
+
+    assert (response.status_code, loads) == (200, 1)
+    assert response.headers["ETag"] != first.headers["ETag"]
+
+
+def test_bumping_another_scope_keeps_etag():
+    cache = ResponseCache(ttl=300)
+    first, _ = _respond(cache)
+
+    asyncio.run(cache.bump("course:2"))
+    response, loads = _respond(cache, first.headers["ETag"])
+
+    assert (response.status_code, loads) == (304, 0)
+
+
+def test_etags_expire_with_the_ttl(monkeypatch):
+    cache = ResponseCache(ttl=300)
+    monkeypatch.setattr(response_cache.time, "time", lambda: 1000.0)
+    first, _ = _respond(cache)
+    assert _respond(cache, first.headers["ETag"])[0].status_code == 304
+
+    monkeypatch.setattr(response_cache.time, "time", lambda: 1300.0)
+    response, _ = _respond(cache, first.headers["ETag"])
+
+    assert response.status_code == 200
+
+
+def test_grade_update_revalidates_course_grades(client, teacher, course):
+    first = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher))
+    etag = first.headers["ETag"]
+    assert client.get(f"/api/grades/course/{course['id']}", headers={**auth(teacher), "If-None-Match": etag}).status_code == 304
+
+    saved = client.post("/api/grades", json={"enrollment_id": first.json()[0]["enrollment_id"], "corte1": 4.5}, headers=auth(teacher))
+    assert saved.status_code == 200, saved.text
+
+    response = client.get(f"/api/grades/course/{course['id']}", headers={**auth(teacher), "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["corte1"] == 4.5
+
+
+def test_teacher_courses_revalidate_after_a_period_is_closed_outside_the_api(client, teacher, course):
+    client.portal.call(server.period_watcher.check)
+    first = client.get("/api/courses/teacher", headers=auth(teacher))
+    etag = first.headers["ETag"]
+    assert [listed["id"] for listed in first.json()] == [course["id"]]
+    assert client.get("/api/courses/teacher", headers={**auth(teacher), "If-None-Match": etag}).status_code == 304
+
+    close_academic_period(memory_store(), {"p_period_id": course["period_id"]})
+    assert client.portal.call(server.period_watcher.check)
+
+    response = client.get("/api/courses/teacher", headers={**auth(teacher), "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,114 @@
+import asyncio
+import re
+from pathlib import Path
+
+import pytest
+from postgrest import APIError
+
+from tests.conftest import auth
+from database import create_memory_client
+from memory_schema import COLUMNS, DEFAULT_INSTITUTION_ID
+from principal_cache import PRINCIPAL_FIELDS
+from server import GRADEBOOK_COLUMNS, STATS_COLUMNS, AcademicPeriod, Course, Grade, Notification, User
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "supabase" / "migrations"
+TABLE_CONSTRAINTS = {"CONSTRAINT", "PRIMARY", "UNIQUE", "CHECK", "FOREIGN", "EXCLUDE"}
+
+
+def _split(text: str):
+    items, depth, current = [], 0, ""
+    for char in text:
+        depth += char == "("
+        depth -= char == ")"
+        if char == "," and depth == 0:
+            items.append(current.strip())
+            current = ""
+        else:
+            current += char
+    return [item for item in items + [current.strip()] if item]
+
+
+def _output_name(expression: str) -> str:
+    alias = re.search(r"\bAS\s+(\w+)\s*$", expression, re.IGNORECASE)
+    return alias.group(1) if alias else re.findall(r"\w+", expression)[-1]
+
+
+def migration_schema():
+    """Columns of the views, created tables and added columns after applying every migration in order."""
+    views, tables, added = {}, {}, {}
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        sql = re.sub(r"/\*.*?\*/|--[^\n]*", "", path.read_text(), flags=re.DOTALL)
+        for name, select in re.findall(r"CREATE (?:OR REPLACE )?VIEW (\w+).*?\bAS\s+SELECT\b(.*?)\bFROM\b", sql, re.DOTALL | re.IGNORECASE):
+            views[name] = tuple(_output_name(item) for item in _split(select))
+        for name, body in re.findall(r"CREATE TABLE (?:IF NOT EXISTS )?(\w+) \((.*?)\n\);", sql, re.DOTALL | re.IGNORECASE):
+            columns = []
+            for item in _split(body):
+                first = item.split()[0]
+                if first.upper() == "LIKE":
+                    columns.extend(COLUMNS[item.split()[1]])
+                elif first.upper() not in TABLE_CONSTRAINTS:
+                    columns.append(first)
+            tables[name] = tuple(columns)
+        for name, body in re.findall(r"ALTER TABLE (\w+)\s+(ADD COLUMN.*?);", sql, re.DOTALL | re.IGNORECASE):
+            added.setdefault(name, []).extend(re.findall(r"ADD COLUMN (?:IF NOT EXISTS )?(\w+)", body, re.IGNORECASE))
+    return views, tables, added
+
+
+VIEWS, TABLES, ADDED_COLUMNS = migration_schema()
+
+
+@pytest.mark.parametrize("view", sorted(VIEWS))
+def test_memory_views_match_the_migrations(view):
+    assert COLUMNS[view] == VIEWS[view]
+
+
+@pytest.mark.parametrize("table", sorted(TABLES))
+def test_memory_tables_match_the_migrations(table):
+    assert set(COLUMNS[table]) == set(TABLES[table])
+
+
+@pytest.mark.parametrize("table", sorted(ADDED_COLUMNS))
+def test_memory_tables_have_the_added_columns(table):
+    assert set(ADDED_COLUMNS[table]) <= set(COLUMNS[table])
+
+
+def _names(columns: str):
+    return [column.strip() for column in columns.split(",")]
+
+
+@pytest.mark.parametrize("relation, fields", [
+    ("courses", list(Course.model_fields)),
+    ("student_courses", list(Course.model_fields)),
+    ("users", list(User.model_fields)),
+    ("users", list(PRINCIPAL_FIELDS)),
+    ("course_roster", list(User.model_fields)),
+    ("grades", list(Grade.model_fields)),
+    ("grades", _names(GRADEBOOK_COLUMNS)),
+    ("notifications", list(Notification.model_fields)),
+    ("academic_periods", list(AcademicPeriod.model_fields)),
+    ("teacher_course_stats", _names(STATS_COLUMNS)),
+])
+def test_models_project_onto_the_migration_schema(relation, fields):
+    columns = VIEWS.get(relation) or TABLES.get(relation) or COLUMNS[relation]
+    assert set(fields) <= set(columns)
+
+
+def test_memory_backend_rejects_unknown_columns():
+    client = create_memory_client()
+
+    async def select(columns):
+        return await client.table("course_roster").select(columns).execute()
+
+    with pytest.raises(APIError) as error:
+        asyncio.run(select("id, nickname"))
+    assert error.value.code == "42703"
+    assert asyncio.run(select("id, institution_id")).data == []
+
+
+def test_course_roster_lists_students_with_their_institution(client, teacher, student, course):
+    response = client.get(f"/api/courses/{course['id']}/students", headers=auth(teacher))
+
+    assert response.status_code == 200, response.text
+    [roster_entry] = response.json()
+    assert roster_entry["id"] == student["user"]["id"]
+    assert roster_entry["institution_id"] == DEFAULT_INSTITUTION_ID
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from tests.conftest import BACKEND_DIR, auth
+
+
+def test_importing_the_app_does_not_load_numpy():
+    env = {**os.environ, "DATABASE_BACKEND": "memory"}
+    script = "import sys, server; print(sorted({'numpy', 'course_stats', 'memory_backend'} & set(sys.modules)))"
+
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_statistics_summarize_course_and_teacher(client, teacher, course):
+    [grade] = client.get(f"/api/grades/course/{course['id']}", headers=auth(teacher)).json()
+    saved = client.post("/api/grades", json={"enrollment_id": grade["enrollment_id"], "corte1": 2.0, "corte2": 2.5}, headers=auth(teacher))
+    assert saved.status_code == 200, saved.text
+
+    response = client.get(f"/api/statistics/courses/{course['id']}", headers=auth(teacher))
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    assert stats["at_risk_count"] == 1
+    assert stats["at_risk"][0]["enrollment_id"] == grade["enrollment_id"]
+
+    response = client.get("/api/statistics/teacher", headers=auth(teacher))
+    assert response.status_code == 200, response.text
+    teacher_stats = response.json()
+    assert [row["course_id"] for row in teacher_stats["courses"]] == [course["id"]]
+    assert [period["academic_period"] for period in teacher_stats["periods"]] == ["2026-1"]
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from datetime import datetime
+
+import jwt
+import pytest
+
+from tests.conftest import auth
+from database import create_memory_client
+from tokens import ACCESS, DEFAULT_SECRET, REFRESH, BloomFilter, ClaimsCache, ExpiredToken, InvalidToken, RevocationList, SigningKeys, TokenService
+
+
+def _service(keys=None, **kwargs) -> TokenService:
+    keys = keys or SigningKeys({"k1": "first-secret"}, "k1")
+    return TokenService(keys, RevocationList(sync_interval=0), ClaimsCache(), **kwargs)
+
+
+def test_issued_tokens_verify_by_type():
+    service = _service()
+    tokens = service.issue("user-1", {"role": "teacher"})
+
+    assert service.verify(tokens["access_token"])["role"] == "teacher"
+    assert service.verify(tokens["refresh_token"], REFRESH)["sub"] == "user-1"
+    with pytest.raises(InvalidToken):
+        service.verify(tokens["refresh_token"], ACCESS)
+    with pytest.raises(InvalidToken):
+        service.verify(tokens["access_token"], REFRESH)
+
+
+def test_expired_and_tampered_tokens_are_rejected():
+    service = _service(access_ttl=-1)
+    token = service.issue("user-1")["access_token"]
+
+    with pytest.raises(ExpiredToken):
+        service.verify(token)
+    with pytest.raises(InvalidToken):
+        _service().verify(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+
+
+def test_rotated_keys_keep_verifying_until_removed():
+    old = _service(SigningKeys({"k1": "first-secret"}, "k1"))
+    token = old.issue("user-1")["access_token"]
+
+    rotated = _service(SigningKeys({"k1": "first-secret", "k2": "second-secret"}, "k2"))
+    assert rotated.verify(token)["sub"] == "user-1"
+    assert jwt.get_unverified_header(rotated.issue("user-1")["access_token"])["kid"] == "k2"
+    with pytest.raises(InvalidToken):
+        _service(SigningKeys({"k2": "second-secret"}, "k2")).verify(token)
+
+
+def _legacy_token(secret: str) -> str:
+    return jwt.encode({"sub": "user-1", "exp": int(time.time()) + 60}, secret, algorithm="HS256")
+
+
+def test_tokens_without_kid_need_legacy_opt_in():
+    token = _legacy_token("legacy-secret")
+
+    with pytest.raises(InvalidToken):
+        _service(SigningKeys.parse("k1:first-secret", None, "legacy-secret")).verify(token)
+    assert _service(SigningKeys.parse("k1:first-secret", None, "legacy-secret", accept_legacy=True)).verify(token)["sub"] == "user-1"
+
+
+def test_legacy_tokens_are_never_accepted_with_the_default_secret():
+    with pytest.raises(ValueError, match="JWT_ACCEPT_LEGACY"):
+        SigningKeys.parse("", None, DEFAULT_SECRET, accept_legacy=True)
+
+    keys = SigningKeys.parse("", None, DEFAULT_SECRET)
+    with pytest.raises(InvalidToken):
+        _service(keys).verify(_legacy_token(DEFAULT_SECRET))
+
+
+def test_revoked_tokens_and_users_are_rejected():
+    service = _service()
+    first, second = service.issue("user-1"), service.issue("user-2")
+
+    asyncio.run(service.revoke(service.verify(first["access_token"])))
+    with pytest.raises(InvalidToken, match="revoked"):
+        service.verify(first["access_token"])
+    assert service.verify(first["refresh_token"], REFRESH)
+
+    asyncio.run(service.revocations.revoke_user("user-2"))
+    with pytest.raises(InvalidToken, match="revoked"):
+        service.verify(second["refresh_token"], REFRESH)
+    assert service.verify(service.issue("user-2")["access_token"])["sub"] == "user-2"
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert sum(f"other-{i}" in bloom for i in range(1000)) < 20
+
+
+def test_refresh_tokens_are_consumed_once_across_workers():
+    client = create_memory_client()
+    expires_at = time.time() + 60
+
+    async def consume_twice():
+        first, second = RevocationList(sync_interval=0), RevocationList(sync_interval=0)
+        await first.start(client)
+        await second.start(client)
+        return await asyncio.gather(first.consume("jti-1", expires_at), second.consume("jti-1", expires_at), first.consume("jti-1", expires_at))
+
+    assert asyncio.run(consume_twice()) == [True, False, False]
+
+
+def test_refresh_endpoint_rejects_reused_tokens(client, student):
+    refreshed = client.post("/api/auth/refresh", json={"refresh_token": student["refresh_token"]})
+    assert refreshed.status_code == 200, refreshed.text
+
+    reused = client.post("/api/auth/refresh", json={"refresh_token": student["refresh_token"]})
+    assert reused.status_code == 401
+
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {refreshed.json()['access_token']}"}).status_code == 200
+
+
+def test_logout_revokes_the_access_token(client, teacher):
+    assert client.post("/api/auth/logout", headers=auth(teacher)).status_code == 200
+
+    assert client.get("/api/auth/me", headers=auth(teacher)).status_code == 401
+
+
+def test_revocation_writes_only_move_forward():
+    client = create_memory_client()
+    revocations = RevocationList(sync_interval=0)
+    now = time.time()
+
+    async def revoke_then_shorten():
+        await revocations.start(client)
+        await revocations.revoke("jti-1", now + 600)
+        await revocations.revoke("jti-1", now + 60)
+        await revocations.revoke_user("user-1", now)
+        await revocations.revoke_user("user-1", now - 3600)
+        tokens = await client.table("revoked_tokens").select("expires_at").execute()
+        users = await client.table("user_token_revocations").select("revoked_before").execute()
+        return tokens.data, users.data
+
+    tokens, users = asyncio.run(revoke_then_shorten())
+
+    assert datetime.fromisoformat(tokens[0]["expires_at"]).timestamp() == pytest.approx(now + 600)
+    assert datetime.fromisoformat(users[0]["revoked_before"]).timestamp() == pytest.approx(now)